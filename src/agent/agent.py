@@ -1,10 +1,13 @@
 """
 Tender Agent using PydanticAI Agent and RunContext.
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional
 from pydantic_ai import Agent, RunContext
+from src.retrieval.cache import TenderVersion
+from src.retrieval.context import ContextStats
 from src.retrieval.search import SearchEngine
-from .prompts import SYSTEM_PROMPT
+from .prompts import SYSTEM_PROMPT, CONTEXT_SYSTEM_PROMPT
 from .tools import (
     lookup_clause_tool,
     search_tender_tool,
@@ -19,6 +22,14 @@ class AgentDependencies:
     tender_id: str
     strategy: str
     search_engine: SearchEngine
+    # Set by the controller when the tender is known; enables the retrieval cache
+    tender_version: Optional[TenderVersion] = None
+    # Ids of every chunk/clause the tools returned, for the audit log
+    retrieved_ids: List[str] = field(default_factory=list)
+    # Clause numbers of the retrieved results, in order (streamed to the client)
+    retrieved_clauses: List[str] = field(default_factory=list)
+    # Token use of each packed tool result
+    context_stats: List[ContextStats] = field(default_factory=list)
 
 # --- Agent Definition ---
 
@@ -28,6 +39,12 @@ tender_agent = Agent(
     system_prompt=SYSTEM_PROMPT,
 )
 
+# Answers from context the controller supplies; it has no tools, so a run is a single model call
+context_agent = Agent(
+    'openai:gpt-4o-mini',
+    system_prompt=CONTEXT_SYSTEM_PROMPT,
+)
+
 # --- Tools Registration ---
 
 @tender_agent.tool
@@ -35,6 +52,7 @@ async def lookup_clause(ctx: RunContext[AgentDependencies], clause_number: str)
     """
     Look up a specific contractual clause by its number.
     Use this when the user asks about a specific clause like 'Clause 5.1' or 'Section 3.2'.
+    Several clauses can be looked up at once, e.g. '5.1, 6.2'. Sub-clauses are included.
     """
     # Adapter to use the structured tool function
     return await lookup_clause_tool(ctx, ClauseLookupInput(clause_number=clause_number))
@@ -51,20 +69,86 @@ async def search_tender(ctx: RunContext[AgentDependencies], query: str) -> str:
 
 # --- Agent Wrapper for Controller Integration ---
 
+def clause_prompt(query: str, context: str) -> str:
+    return f"{query}\n\nTender clauses:\n{context}"
+
+def with_context(query: str, context: str) -> str:
+    """
+    Prompt for a question whose retrieval already ran (batch queries): the agent can
+    answer in one model call and only needs its tools when the context falls short.
+    """
+    return (
+        f"{query}\n\n"
+        "Retrieved tender context for this question (search the tender only if it does not contain the answer):\n"
+        f"{context}"
+    )
+
 class TenderAgentWrapper:
     def __init__(self):
         self.search_engine = SearchEngine()
 
-    async def ask_with_strategy(self, query: str, tender_id: str, strategy: str) -> str:
+    async def ask_with_strategy(
+        self,
+        query: str,
+        tender_id: str,
+        strategy: str,
+        tender_version: Optional[TenderVersion] = None,
+        retrieved_ids: Optional[List[str]] = None,
+        context: Optional[str] = None,
+        context_stats: Optional[List[ContextStats]] = None
+    ) -> str:
         dependencies = AgentDependencies(
             tender_id = tender_id,
             strategy = strategy,
-            search_engine = self.search_engine
+            search_engine = self.search_engine,
+            tender_version = tender_version,
+            # The caller's lists are filled in place
+            retrieved_ids = retrieved_ids if retrieved_ids is not None else [],
+            context_stats = context_stats if context_stats is not None else []
         )
         
-        result = await tender_agent.run(query, deps = dependencies)
+        prompt = with_context(query, context) if context else query
+        result = await tender_agent.run(prompt, deps = dependencies)
+        return result.data
+
+    async def ask_with_context(self, query: str, context: str) -> str:
+        """Single-turn answer from clauses already fetched by the caller."""
+        result = await context_agent.run(clause_prompt(query, context))
         return result.data
 
+    async def stream_with_context(self, query: str, context: str) -> AsyncIterator[str]:
+        async with context_agent.run_stream(clause_prompt(query, context)) as result:
+            async for delta in result.stream_text(delta = True):
+                yield delta
+
+    async def stream_with_strategy(
+        self,
+        query: str,
+        tender_id: str,
+        strategy: str,
+        tender_version: Optional[TenderVersion] = None,
+        retrieved_ids: Optional[List[str]] = None,
+        retrieved_clauses: Optional[List[str]] = None,
+        context_stats: Optional[List[ContextStats]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yields the answer as text deltas. Tool calls complete before the first delta,
+        so the retrieved lists are filled by then.
+        """
+        dependencies = AgentDependencies(
+            tender_id = tender_id,
+            strategy = strategy,
+            search_engine = self.search_engine,
+            tender_version = tender_version,
+            retrieved_ids = retrieved_ids if retrieved_ids is not None else [],
+            retrieved_clauses = retrieved_clauses if retrieved_clauses is not None else [],
+            context_stats = context_stats if context_stats is not None else []
+        )
+
+        async with tender_agent.run_stream(query, deps = dependencies) as result:
+            async for delta in result.stream_text(delta = True):
+                yield delta
+
     async def ask(self, query: str) -> str:
         return await self.ask_with_strategy(query, "default_tender", "HYBRID")
 
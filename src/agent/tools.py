@@ -2,8 +2,12 @@
 Tools for the Tender RAG agent.
 """
 from typing import List, Dict, Any, Optional
+from uuid import UUID
 from pydantic import BaseModel, Field
 from pydantic_ai import RunContext
+from src.retrieval.cache import query_key, retrieval_cache
+from src.retrieval.clause_keys import extract_clause_references
+from src.retrieval.context import Citation, PackedContext, clause_of, pack_context
 
 # We need to import AgentDependencies, but it is defined in agent.py usually to avoid circular imports if agent imports tools.
 # However, PydanticAI tools usually take a generic context. 
@@ -16,9 +20,14 @@ from pydantic_ai import RunContext
 # Let's try to keep it simple: We will NOT import AgentDependencies here to avoid circular dep with agent.py (which imports this).
 # We will just assume ctx.deps has the attributes we need.
 
+NO_RESULTS = "No relevant information found in the tender documents."
+
 class ClauseLookupInput(BaseModel):
     """Input for looking up a specific clause."""
-    clause_number: str = Field(..., description="The specific clause number to look up (e.g., '5.1', '10.2.3').")
+    clause_number: str = Field(
+        ...,
+        description="The clause number(s) to look up (e.g., '5.1', '10.2.3', or '5.1, 6.2'). Sub-clauses are included."
+    )
 
 class TenderSearchInput(BaseModel):
     """Input for semantic search of tender documents."""
@@ -31,15 +40,33 @@ async def lookup_clause_tool(ctx: RunContext, input_data: ClauseLookupInput) ->
     # Access dependencies dynamically to avoid circular imports
     search_engine = ctx.deps.search_engine
     
-    clauses = await search_engine.search_clause(input_data.clause_number)
-    
-    if not clauses:
-        return f"No clause found with number '{input_data.clause_number}'."
-    
-    results = []
-    for c in clauses:
-        results.append(f"Clause {c.clause_number}: {c.content}")
-    return "\n---\n".join(results)
+    # Every reference in the input is resolved in one round trip
+    references = extract_clause_references(input_data.clause_number, require_prefix=False)
+    if not references:
+        references = [input_data.clause_number.strip()]
+    packed = await lookup_clauses(search_engine, references, ctx.deps.tender_id)
+    _record_retrieved(ctx.deps, packed)
+    return packed.text
+
+async def lookup_clauses(search_engine, references: List[str], tender_id) -> PackedContext:
+    """
+    The clause lookup tool's output for clause references (no ids: none of the clauses
+    exist). Also used by the controller's EXACT fast path.
+    """
+    found = await search_engine.search_clauses_batch(references, tender_id=tender_id)
+    missing = [f"No clause found with number '{reference}'." for reference in references if not found.get(reference)]
+
+    # Clauses the found ones point to ("see Clause 12.3"), from the cached reference graph
+    found_clauses = list({c.id: c for clauses in found.values() for c in clauses}.values())
+    referenced = await search_engine.expand_references(found_clauses, tender_id=tender_id)
+    citations = await search_engine.get_citations([clause_of(c) for c in [*found_clauses, *referenced]])
+    return pack_context(found_clauses, citations, referenced, notes=missing)
+
+def _record_retrieved(dependencies, packed: PackedContext):
+    # Collected by the controller for the audit log and the streaming retrieval event
+    dependencies.retrieved_ids.extend(packed.ids)
+    dependencies.retrieved_clauses.extend(packed.clause_numbers)
+    dependencies.context_stats.append(packed.stats)
 
 async def search_tender_tool(ctx: RunContext, input_data: TenderSearchInput) -> str:
     """
@@ -49,19 +76,45 @@ async def search_tender_tool(ctx: RunContext, input_data: TenderSearchInput) ->
     strategy = dependencies.strategy.upper()
     search_engine = dependencies.search_engine
     
+    tender_id = dependencies.tender_id
+
+    # Estimators ask the same questions repeatedly; results are reused until the tender changes
+    tender_version = dependencies.tender_version
+    key = query_key(tender_version, input_data.query, strategy) if tender_version else None
+    cached = retrieval_cache.get(key) if key else None
+    if cached is not None:
+        _record_retrieved(dependencies, cached)
+        return cached.text
+
     if strategy == "HYBRID":
-        chunks = await search_engine.hybrid_search(input_data.query)
+        chunks = await search_engine.hybrid_search(input_data.query, tender_id=tender_id)
     elif strategy == "BM25":
-         # Fallback to hybrid or vector since pure BM25 isn't fully implemented yet
-        chunks = await search_engine.hybrid_search(input_data.query)
+        chunks = await search_engine.bm25_search(input_data.query, tender_id=tender_id)
     else: 
         # Default to VECTOR
-        chunks = await search_engine.search_vector(input_data.query)
+        chunks = await search_engine.search_vector(input_data.query, tender_id=tender_id)
 
     if not chunks:
-        return "No relevant information found in the tender documents."
+        return NO_RESULTS
     
-    results = []
-    for chunk in chunks:
-        results.append(f"Content: {chunk.content}")
-    return "\n---\n".join(results)
+    referenced = await search_engine.expand_references(chunks, tender_id=tender_id)
+    packed = await format_search_results(search_engine, chunks, referenced)
+    _record_retrieved(dependencies, packed)
+    if key:
+        retrieval_cache.put(key, packed)
+    return packed.text
+
+async def format_search_results(
+    search_engine,
+    chunks,
+    referenced,
+    citations: Optional[Dict[UUID, Citation]] = None
+) -> PackedContext:
+    """
+    The search tool's output for ranked chunks and the clauses they reference, packed
+    into the context token budget. Also used to prefetch batch retrieval, which passes
+    the citations of the whole batch.
+    """
+    if citations is None:
+        citations = await search_engine.get_citations([clause_of(item) for item in [*chunks, *referenced]])
+    return pack_context(chunks, citations, referenced)
@@ -0,0 +1,110 @@
+"""
+Asynchronous, batched audit log.
+The request path only puts a record on a bounded in-memory queue; a background task
+batch-inserts queued records into the audit_log table, so /query never waits on the database.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from src.db.database import get_session
+from src.db.models import AuditLog
+from src.ingestion.stages import DONE, drain_batch
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+# Seconds the writer waits for more records before inserting a partial batch
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+
+@dataclass
+class AuditStats:
+    enqueued: int = 0
+    written: int = 0
+    # Records lost to a full queue or a failed insert
+    dropped: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+class AuditLogger:
+    """
+    Call start() once the event loop runs (app startup) and stop() on shutdown;
+    stop() writes everything still queued. Records logged while the writer is not
+    running stay queued until it starts.
+    """
+    def __init__(
+        self,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = AuditStats()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def log(self, record: Dict[str, Any]):
+        """
+        Never blocks: when the writer falls this far behind, the record is dropped
+        (and counted) rather than slowing down the request.
+        """
+        try:
+            self._queue.put_nowait(record)
+            self.stats.enqueued += 1
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            print(f"[AUDIT LOG] Queue full, dropped record {record.get('query_id')}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # Queued after everything already logged, so those records are written first
+        await self._queue.put(DONE)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        done = False
+        while not done:
+            first = await self._queue.get()
+            if first is DONE:
+                break
+            batch, done = drain_batch(self._queue, first, self.batch_size)
+            if len(batch) < self.batch_size and not done:
+                # Quiet period: give a burst a moment to fill the batch
+                await asyncio.sleep(self.flush_interval)
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is DONE:
+                        done = True
+                        break
+                    batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        session_gen = get_session()
+        session = await anext(session_gen)
+        try:
+            await session.execute(insert(AuditLog), rows)
+            await session.commit()
+            self.stats.written += len(rows)
+        except Exception as e:
+            # Audit failures must never take the API down
+            await session.rollback()
+            self.stats.dropped += len(rows)
+            print(f"[AUDIT LOG] Could not write {len(rows)} records: {e}")
+        finally:
+            await session.close()
+        self.stats.seconds += time.perf_counter() - start
+        self.stats.batches += 1
+
+# Global instance, started and stopped with the API
+audit_logger = AuditLogger()
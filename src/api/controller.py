@@ -1,11 +1,22 @@
+import asyncio
+import os
 import re
+import time
 import uuid
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
 from pydantic import BaseModel, Field
 from src.agent.agent import agent
+from src.agent.tools import format_search_results, lookup_clauses
+from src.api.audit import audit_logger
 from src.db.models import Clause
+from src.retrieval.cache import TenderVersion, answer_cache, query_key, retrieval_cache, tender_versions
+from src.retrieval.clause_keys import extract_clause_references
+from src.retrieval.context import ContextStats, clause_of
+
+# Agent runs in flight per /query/batch request
+QUERY_BATCH_CONCURRENCY = int(os.getenv("QUERY_BATCH_CONCURRENCY", "8"))
 
 # --- Enums & Models ---
 class QueryClassification(str, Enum):
@@ -29,6 +40,14 @@ class QueryContext(BaseModel):
     log_status: str = "OPEN"
     refusal_reason: Optional[str] = None
     agent_response: Optional[str] = None
+    # Answered from the answer cache, without an agent run
+    cached: bool = False
+    # Chunk/clause ids retrieved by the agent's tools
+    retrieved_ids: List[str] = Field(default_factory=list)
+    # Token use of each packed retrieval result
+    context_stats: List[ContextStats] = Field(default_factory=list)
+    # Milliseconds per step
+    timings: Dict[str, float] = Field(default_factory=dict)
 
 class ControllerResponse(BaseModel):
     query_id: str
@@ -36,8 +55,7 @@ class ControllerResponse(BaseModel):
     classification: str
     strategy: str
     status: str
-
-mock_log_count = 0
+    cached: bool = False
 
 # --- Controller Implementation ---
 
@@ -90,12 +108,33 @@ class QueryController:
         else:
             return RetrievalStrategy.HYBRID
 
-    def _create_log_record(self, ctx: QueryContext): # TODO: Implement logging
+    def _create_log_record(self, ctx: QueryContext):
         """
-        Mock logging function but will write to a db in production
+        Queues the audit record; the audit logger writes it to Postgres in the background.
         """
-        mock_log_count += 1
-        print(f"[AUDIT LOG] LOG Count: {mock_log_count}.) ID={ctx.query_id} TENDER={ctx.tender_id} TYPE={ctx.classification} STRAT={ctx.strategy} QUERY='{ctx.raw_query}'")
+        audit_logger.log({
+            "query_id": ctx.query_id,
+            "tender_id": ctx.tender_id,
+            "interface_source": ctx.interface_source,
+            "raw_query": ctx.raw_query,
+            "classification": ctx.classification.value if ctx.classification else None,
+            "strategy": ctx.strategy.value if ctx.strategy else None,
+            "status": ctx.log_status,
+            "cached": ctx.cached,
+            "refusal_reason": ctx.refusal_reason,
+            "agent_response": ctx.agent_response,
+            # Prefetched results the agent searched for again appear once
+            "retrieved_ids": list(dict.fromkeys(ctx.retrieved_ids)),
+            "context_tokens": self._context_tokens(ctx),
+            "timings": ctx.timings,
+            "created_at": ctx.timestamp,
+        })
+
+    def _context_tokens(self, ctx: QueryContext) -> Dict[str, int]:
+        """Tokens of retrieved text the model was given, against the unpacked results."""
+        tokens = sum(stats.tokens for stats in ctx.context_stats)
+        raw_tokens = sum(stats.raw_tokens for stats in ctx.context_stats)
+        return {"tokens": tokens, "raw_tokens": raw_tokens, "saved": max(0, raw_tokens - tokens)}
 
     def _validate_response(self, response: str, ctx: QueryContext): # TODO: Implement validation as in references
         """
@@ -107,18 +146,20 @@ class QueryController:
         # We can enforce "Clause X" appears in text if strategy was EXACT.
         pass
 
-    async def execute(self, tender_id: str, query: str, interface: str = "API") -> ControllerResponse:
-        # 1. Validate query preconditions
-        if not self._validate_preconditions(tender_id, query): 
-            return ControllerResponse(
-                query_id="N/A",
-                answer="Invalid Request: Missing tender_id or empty query.",
-                classification="REJECTED",
-                strategy="NONE",
-                status="REFUSED"
-            )
+    def _invalid_response(self) -> ControllerResponse:
+        return ControllerResponse(
+            query_id="N/A",
+            answer="Invalid Request: Missing tender_id or empty query.",
+            classification="REJECTED",
+            strategy="NONE",
+            status="REFUSED"
+        )
 
-        # 2. Context & Classification
+    async def _prepare(self, tender_id: str, query: str, interface: str) -> Tuple[QueryContext, Optional[TenderVersion], Optional[tuple]]:
+        """
+        Classification and the answer cache lookup; a hit leaves ctx answered and cached.
+        """
+        started = time.perf_counter()
         ctx = QueryContext(
             tender_id = tender_id,
             raw_query = query,
@@ -126,36 +167,319 @@ class QueryController:
         )
         ctx.classification = self._classify_query(query)
         ctx.strategy = self._select_strategy(ctx.classification)
-        
-        # 3. Log Start
-        self._create_log_record(ctx)
 
-        # 4. Invoke Agent
-        # Agent implementation needs to handle explicit strategy strategies
-        try:
-            answer = await agent.ask_with_strategy(
-                query = query, 
-                tender_id = tender_id, 
-                strategy = ctx.strategy.value
-            )
-            ctx.agent_response = answer
+        # Repeated questions on an unchanged tender are answered from the cache;
+        # unknown tenders (no version) are never cached
+        tender_version = await tender_versions.get(tender_id)
+        cache_key = query_key(tender_version, query, ctx.strategy.value) if tender_version else None
+        cached_answer = answer_cache.get(cache_key) if cache_key else None
+        if cached_answer is not None:
+            ctx.agent_response = cached_answer
             ctx.log_status = "ANSWERED"
+            ctx.cached = True
+        ctx.timings["prepare"] = (time.perf_counter() - started) * 1000
+        return ctx, tender_version, cache_key
 
+    async def _exact_context(self, ctx: QueryContext) -> Optional[Tuple[str, List[str]]]:
+        """
+        EXACT fast path: fetches the clauses the query names up front, so the answer takes
+        one model call instead of a tool-choosing turn plus an answering turn.
+        Returns (clause context, clause numbers), or None when the agent should run as usual.
+        If none of the named clauses exist, ctx is refused without calling the LLM.
+        """
+        references = extract_clause_references(ctx.raw_query)
+        if not references:
+            return None
+        started = time.perf_counter()
+        try:
+            packed = await lookup_clauses(agent.search_engine, references, ctx.tender_id)
         except Exception as e:
-            ctx.refusal_reason = str(e)
-            ctx.log_status = "ERROR"
-            ctx.agent_response = "I encountered an error processing your request."
-            print(f"[ERROR] {e}")
+            # The agent's lookup tool gets another chance
+            print(f"[WARNING] Clause prefetch failed, falling back to the agent: {e}")
+            return None
+        finally:
+            ctx.timings["retrieval"] = (time.perf_counter() - started) * 1000
 
-        # 5. Finalize and give the response
-        
+        if not packed.ids:
+            listed = ", ".join(references)
+            ctx.log_status = "REFUSED"
+            ctx.refusal_reason = f"Clause not found: {listed}"
+            ctx.agent_response = (
+                f"{'Clause' if len(references) == 1 else 'Clauses'} {listed} could not be found "
+                f"in the documents of tender {ctx.tender_id}, so I can't answer this question."
+            )
+            return None
+        ctx.retrieved_ids.extend(packed.ids)
+        ctx.context_stats.append(packed.stats)
+        return packed.text, packed.clause_numbers
+
+    def _answered(self, ctx: QueryContext, answer: str, cache_key: Optional[tuple]):
+        ctx.agent_response = answer
+        ctx.log_status = "ANSWERED"
+        if cache_key:
+            answer_cache.put(cache_key, answer)
+
+    def _failed(self, ctx: QueryContext, error: Exception):
+        ctx.refusal_reason = str(error)
+        ctx.log_status = "ERROR"
+        ctx.agent_response = "I encountered an error processing your request."
+        print(f"[ERROR] {error}")
+
+    def _finalize(self, ctx: QueryContext) -> ControllerResponse:
+        # Validation and audit run on the completed text, cache hits included
+        # (the audit record is queued and written in the background)
+        self._validate_response(ctx.agent_response, ctx)
+        ctx.timings["total"] = sum(ctx.timings.values())
+        # Context token use goes to the audit record (context_tokens), not stdout
+        self._create_log_record(ctx)
         return ControllerResponse(
             query_id = ctx.query_id,
             answer = ctx.agent_response,
             classification = ctx.classification.value,
             strategy = ctx.strategy.value,
-            status = ctx.log_status
+            status = ctx.log_status,
+            cached = ctx.cached
         )
 
+    async def execute(self, tender_id: str, query: str, interface: str = "API") -> ControllerResponse:
+        # 1. Validate query preconditions
+        if not self._validate_preconditions(tender_id, query): 
+            return self._invalid_response()
+
+        # 2. Context, Classification & Cache
+        ctx, tender_version, cache_key = await self._prepare(tender_id, query, interface)
+
+        # 3. EXACT fast path: clauses are fetched here, not through an agent tool turn
+        exact = None
+        if not ctx.cached and ctx.classification == QueryClassification.EXACT:
+            exact = await self._exact_context(ctx)
+
+        # 4. Invoke Agent (unless cached or refused)
+        # Agent implementation needs to handle explicit strategy strategies
+        if not ctx.cached and ctx.log_status != "REFUSED":
+            agent_started = time.perf_counter()
+            try:
+                if exact is not None:
+                    answer = await agent.ask_with_context(query, exact[0])
+                else:
+                    answer = await agent.ask_with_strategy(
+                        query = query, 
+                        tender_id = tender_id, 
+                        strategy = ctx.strategy.value,
+                        tender_version = tender_version,
+                        retrieved_ids = ctx.retrieved_ids,
+                        context_stats = ctx.context_stats
+                    )
+                self._answered(ctx, answer, cache_key)
+            except Exception as e:
+                self._failed(ctx, e)
+            ctx.timings["agent"] = (time.perf_counter() - agent_started) * 1000
+
+        # 5. Validate, audit and give the response
+        return self._finalize(ctx)
+
+    async def execute_stream(
+        self,
+        tender_id: str,
+        query: str,
+        interface: str = "API"
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of execute(). Yields (event, data) pairs:
+        "retrieval" with the clause numbers the agent retrieved, "token" text deltas,
+        then "final" with the ControllerResponse once the answer is complete.
+        """
+        if not self._validate_preconditions(tender_id, query):
+            yield "final", self._invalid_response().model_dump()
+            return
+
+        ctx, tender_version, cache_key = await self._prepare(tender_id, query, interface)
+
+        parts: List[str] = []
+        finished = False
+        try:
+            if ctx.cached:
+                # No retrieval ran; report the clauses the cached answer cites
+                yield "retrieval", {"clauses": extract_clause_references(ctx.agent_response)}
+                yield "token", {"delta": ctx.agent_response}
+            else:
+                exact = None
+                if ctx.classification == QueryClassification.EXACT:
+                    exact = await self._exact_context(ctx)
+                clauses: List[str] = list(exact[1]) if exact is not None else []
+                retrieval_sent = False
+                if exact is not None or ctx.log_status == "REFUSED":
+                    # Fast path: the clauses are known before the model is called
+                    yield "retrieval", {"clauses": list(dict.fromkeys(clauses))}
+                    retrieval_sent = True
+                if ctx.log_status == "REFUSED":
+                    yield "token", {"delta": ctx.agent_response}
+                    finished = True
+                    yield "final", self._finalize(ctx).model_dump()
+                    return
+
+                if exact is not None:
+                    stream = agent.stream_with_context(query, exact[0])
+                else:
+                    stream = agent.stream_with_strategy(
+                        query = query,
+                        tender_id = tender_id,
+                        strategy = ctx.strategy.value,
+                        tender_version = tender_version,
+                        retrieved_ids = ctx.retrieved_ids,
+                        retrieved_clauses = clauses,
+                        context_stats = ctx.context_stats
+                    )
+                agent_started = time.perf_counter()
+                try:
+                    async for delta in stream:
+                        # The answer only starts streaming once the tools have run
+                        if not retrieval_sent:
+                            yield "retrieval", {"clauses": list(dict.fromkeys(clauses))}
+                            retrieval_sent = True
+                        parts.append(delta)
+                        yield "token", {"delta": delta}
+                    self._answered(ctx, "".join(parts), cache_key)
+                except Exception as e:
+                    self._failed(ctx, e)
+                ctx.timings["agent"] = (time.perf_counter() - agent_started) * 1000
+                if not retrieval_sent:
+                    yield "retrieval", {"clauses": list(dict.fromkeys(clauses))}
+            finished = True
+        finally:
+            if not finished:
+                # The client disconnected mid-stream: audit the answer as far as it got
+                if ctx.log_status == "OPEN":
+                    ctx.log_status = "CANCELLED"
+                    ctx.refusal_reason = "Client disconnected"
+                    ctx.agent_response = "".join(parts)
+                self._finalize(ctx)
+
+        yield "final", self._finalize(ctx).model_dump()
+
+    async def execute_batch(
+        self,
+        tender_id: str,
+        queries: List[str],
+        interface: str = "API",
+        concurrency: int = QUERY_BATCH_CONCURRENCY
+    ) -> AsyncIterator[Tuple[int, ControllerResponse]]:
+        """
+        Answers a checklist of questions against one tender. EXACT questions get their named
+        clauses up front, as in execute(); retrieval for the rest runs once for the whole set
+        (one batched embedding request per strategy, one fetch of referenced clauses). The
+        agent then answers each question from its prefetched context, at most `concurrency`
+        at a time. Yields (index into queries, response) as each completes.
+        """
+        pending: Dict[int, Tuple[QueryContext, Optional[TenderVersion], Optional[tuple]]] = {}
+        for index, query in enumerate(queries):
+            if not self._validate_preconditions(tender_id, query):
+                yield index, self._invalid_response()
+                continue
+            ctx, tender_version, cache_key = await self._prepare(tender_id, query, interface)
+            if ctx.cached:
+                yield index, self._finalize(ctx)
+            else:
+                pending[index] = (ctx, tender_version, cache_key)
+
+        # EXACT questions take the same fast path as execute(), so single and batched answers agree
+        exact: Dict[int, str] = {}
+        for index, (ctx, _, _) in list(pending.items()):
+            if ctx.classification != QueryClassification.EXACT:
+                continue
+            prefetched = await self._exact_context(ctx)
+            if ctx.log_status == "REFUSED":
+                del pending[index]
+                yield index, self._finalize(ctx)
+            elif prefetched is not None:
+                exact[index] = prefetched[0]
+        if not pending:
+            return
+
+        retrieval_started = time.perf_counter()
+        searched = {index: item for index, item in pending.items() if index not in exact}
+        contexts = await self._retrieve_batch(tender_id, searched) if searched else {}
+        retrieval_ms = (time.perf_counter() - retrieval_started) * 1000
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def answer(index: int) -> Tuple[int, ControllerResponse]:
+            ctx, tender_version, cache_key = pending[index]
+            if index not in exact:
+                # Shared by the whole batch
+                ctx.timings["retrieval"] = retrieval_ms
+            async with semaphore:
+                agent_started = time.perf_counter()
+                try:
+                    if index in exact:
+                        answer = await agent.ask_with_context(ctx.raw_query, exact[index])
+                    else:
+                        answer = await agent.ask_with_strategy(
+                            query = ctx.raw_query,
+                            tender_id = tender_id,
+                            strategy = ctx.strategy.value,
+                            tender_version = tender_version,
+                            retrieved_ids = ctx.retrieved_ids,
+                            context = contexts.get(index),
+                            context_stats = ctx.context_stats
+                        )
+                    self._answered(ctx, answer, cache_key)
+                except Exception as e:
+                    self._failed(ctx, e)
+                ctx.timings["agent"] = (time.perf_counter() - agent_started) * 1000
+            return index, self._finalize(ctx)
+
+        tasks = [asyncio.create_task(answer(index)) for index in pending]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            # The client went away: don't keep paying for answers nobody reads
+            for task in tasks:
+                task.cancel()
+
+    async def _retrieve_batch(
+        self,
+        tender_id: str,
+        pending: Dict[int, Tuple[QueryContext, Optional[TenderVersion], Optional[tuple]]]
+    ) -> Dict[int, str]:
+        """
+        Search results per question, formatted as the search tool returns them.
+        They are also put in the retrieval cache, so an agent that still searches for
+        its question gets them without another search.
+        """
+        search_engine = agent.search_engine
+        by_strategy: Dict[str, List[int]] = {}
+        for index, (ctx, _, _) in pending.items():
+            by_strategy.setdefault(ctx.strategy.value, []).append(index)
+        try:
+            groups = await asyncio.gather(*(
+                search_engine.search_batch([pending[i][0].raw_query for i in group], strategy, tender_id=tender_id)
+                for strategy, group in by_strategy.items()
+            ))
+            indexes = [index for group in by_strategy.values() for index in group]
+            results = [items for group in groups for items in group]
+            # A clause referenced from many questions' results is fetched once
+            referenced = await search_engine.expand_references_batch(results, tender_id)
+            citations = await search_engine.get_citations([
+                clause_of(item) for items, clauses in zip(results, referenced) for item in [*items, *clauses]
+            ])
+        except Exception as e:
+            # The agent's tools can still retrieve per question
+            print(f"[WARNING] Batch retrieval failed, answering without prefetched context: {e}")
+            return {}
+
+        contexts = {}
+        for index, items, clauses in zip(indexes, results, referenced):
+            if not items:
+                continue
+            ctx, tender_version, _ = pending[index]
+            packed = await format_search_results(search_engine, items, clauses, citations)
+            ctx.retrieved_ids.extend(packed.ids)
+            ctx.context_stats.append(packed.stats)
+            contexts[index] = packed.text
+            if tender_version:
+                retrieval_cache.put(query_key(tender_version, ctx.raw_query, ctx.strategy.value), packed)
+        return contexts
+
 # Global instance
 controller = QueryController()
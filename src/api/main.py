@@ -1,13 +1,18 @@
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
-import shutil
+from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import HTMLResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import json
 import os
 import asyncio
+from contextlib import aclosing
 from pathlib import Path
-from src.ingestion.pipeline import run_ingestion
+from uuid import UUID
+from src.ingestion.jobs import enqueue_job, get_job, job_status
+from src.ingestion.storage import store_upload
 from src.agent.agent import agent
 from src.db.database import init_db
+from src.api.audit import audit_logger
 
 from fastapi.staticfiles import StaticFiles
 
@@ -21,6 +26,16 @@ class QueryRequest(BaseModel):
     tender_id: str = "default_tender"
     interface: str = "API"
 
+# Questions accepted per /query/batch request
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "500"))
+
+class BatchQueryRequest(BaseModel):
+    messages: List[str] = Field(..., min_length=1, max_length=QUERY_BATCH_MAX_SIZE)
+    tender_id: str = "default_tender"
+    interface: str = "API"
+    # Agent runs in flight; defaults to QUERY_BATCH_CONCURRENCY
+    concurrency: Optional[int] = Field(default=None, ge=1, le=64)
+
 class QueryResponse(BaseModel):
     response: str
     query_id: str
@@ -31,6 +46,12 @@ class QueryResponse(BaseModel):
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    audit_logger.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Writes audit records still queued
+    await audit_logger.stop()
 
 # ... (ingest remains)
 
@@ -39,18 +60,31 @@ async def root():
     return HTMLResponse(open("src/api/static/index.html").read())
 
 @app.post("/ingest")
-async def ingest_document(tender_name: str, file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
-    # Save uploaded file
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
-    file_path = upload_dir / file.filename
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    background_tasks.add_task(run_ingestion, str(file_path), tender_name)
+async def ingest_document(tender_name: str, file: UploadFile = File(...), reingest: bool = False):
+    # Streamed to content-addressed storage in chunks, hashed on the way
+    stored = await store_upload(file)
+
+    # Picked up by an ingestion worker process (python -m src.ingestion.jobs), not this API process
+    job, created = await enqueue_job(str(stored.path.resolve()), tender_name, reingest=reingest, file_hash=stored.sha256)
+    if not created:
+        return {
+            "message": f"{file.filename} was already uploaded for tender {tender_name}; not ingesting it again",
+            "job_id": str(job.id),
+            "duplicate": True
+        }
     
-    return {"message": f"Ingestion started for {file.filename} under tender {tender_name}"}
+    return {
+        "message": f"Ingestion queued for {file.filename} under tender {tender_name}",
+        "job_id": str(job.id),
+        "duplicate": False
+    }
+
+@app.get("/ingest/{job_id}")
+async def ingestion_status(job_id: UUID):
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job {job_id}")
+    return job_status(job)
 
 @app.post("/query", response_model=QueryResponse)
 async def query_agent(full_query_request: QueryRequest):
@@ -73,3 +107,55 @@ async def query_agent(full_query_request: QueryRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/query/stream")
+async def query_agent_stream(full_query_request: QueryRequest):
+    """
+    Server-sent events: "retrieval" (clause numbers), "token" (text deltas),
+    then "final" (the ControllerResponse fields).
+    """
+    async def events():
+        stream = controller.execute_stream(
+            tender_id = full_query_request.tender_id,
+            query = full_query_request.message,
+            interface = full_query_request.interface
+        )
+        # Closed right away when the client disconnects, so the cut-off answer is audited
+        async with aclosing(stream):
+            async for event, data in stream:
+                yield _sse(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type = "text/event-stream",
+        # Proxies (nginx) must not buffer the stream
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/query/batch")
+async def query_agent_batch(batch_request: BatchQueryRequest):
+    """
+    Server-sent events: one "result" per question as it completes ("index" is its
+    position in `messages`), then "done".
+    """
+    options = {"concurrency": batch_request.concurrency} if batch_request.concurrency else {}
+
+    async def events():
+        answered = 0
+        async for index, result in controller.execute_batch(
+            tender_id = batch_request.tender_id,
+            queries = batch_request.messages,
+            interface = batch_request.interface,
+            **options
+        ):
+            answered += 1
+            yield _sse("result", {"index": index, **result.model_dump()})
+        yield _sse("done", {"count": answered})
+
+    return StreamingResponse(
+        events(),
+        media_type = "text/event-stream",
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
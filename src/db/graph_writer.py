@@ -0,0 +1,178 @@
+"""
+Batched async writer for the Neo4j clause graph.
+Clause nodes and REFERENCES edges are buffered and written with one UNWIND query per
+batch over the async driver, so ingestion never blocks the event loop on Neo4j.
+When the graph DB is unavailable every call is a no-op.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Iterable
+from uuid import UUID
+
+from neo4j import AsyncGraphDatabase
+from src.db.graph_db import graph_db, URI, AUTH
+from src.db.models import Clause
+
+MERGE_CLAUSES = """
+UNWIND $rows AS row
+MERGE (c:Clause {id: row.id})
+SET c.number = row.number, c.content = row.content,
+    c.tender_id = row.tender_id, c.document_id = row.document_id
+"""
+
+MERGE_REFERENCES = """
+UNWIND $rows AS row
+MATCH (source:Clause {id: row.source})
+MATCH (target:Clause {id: row.target})
+MERGE (source)-[:REFERENCES]->(target)
+"""
+
+# MERGE on an unindexed property scans every Clause node; the adjacency cache
+# (src.retrieval.clause_graph) loads edges by tender
+SCHEMA = [
+    "CREATE CONSTRAINT clause_id IF NOT EXISTS FOR (c:Clause) REQUIRE c.id IS UNIQUE",
+    "CREATE INDEX clause_tender IF NOT EXISTS FOR (c:Clause) ON (c.tender_id)",
+]
+
+DELETE_REFERENCES = """
+UNWIND $ids AS id
+MATCH (:Clause {id: id})-[r:REFERENCES]->()
+DELETE r
+"""
+
+DELETE_CLAUSES = """
+UNWIND $ids AS id
+MATCH (c:Clause {id: id})
+DETACH DELETE c
+"""
+
+# One async driver (and connection pool) per process, shared by every GraphWriter
+_driver = None
+_driver_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def graph_driver():
+    """
+    The process's async Neo4j driver, created on first use. An async driver is bound to
+    the loop it was created on, so a new loop (e.g. another asyncio.run) gets a new one.
+    """
+    global _driver, _driver_loop
+    loop = asyncio.get_running_loop()
+    if _driver is None or _driver_loop is not loop:
+        _driver = AsyncGraphDatabase.driver(URI, auth=AUTH)
+        _driver_loop = loop
+    return _driver
+
+async def close_graph_driver():
+    """Closes the shared driver; called when the ingesting process shuts down."""
+    global _driver, _driver_loop
+    if _driver is not None:
+        await _driver.close()
+        _driver, _driver_loop = None, None
+
+@dataclass
+class GraphWriteStats:
+    nodes: int = 0
+    edges: int = 0
+    deleted: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.nodes} nodes, {self.edges} edges, {self.deleted} deleted "
+            f"in {self.batches} batches, {self.seconds:.2f}s"
+        )
+
+class GraphWriter:
+    """
+    Buffers graph writes and flushes them in UNWIND batches.
+    Nodes are always flushed before edges, since edges MATCH both endpoints.
+    Each writer opens a session on the shared driver on first use; flush() and then
+    close() it before the loop ends.
+    """
+    _schema_ready = False
+
+    def __init__(self, batch_size: int = 500, available: Optional[bool] = None):
+        self.batch_size = batch_size
+        self.available = graph_db.is_available() if available is None else available
+        self.stats = GraphWriteStats()
+        self._session = None
+        self._nodes: List[Dict[str, Any]] = []
+        self._edges: List[Dict[str, str]] = []
+
+    async def add_clause(self, clause: Clause):
+        if not self.available:
+            return
+        self._nodes.append({
+            "id": str(clause.id),
+            "number": clause.clause_number,
+            "content": clause.content,
+            "tender_id": str(clause.tender_id) if clause.tender_id else None,
+            "document_id": str(clause.document_id) if clause.document_id else None,
+        })
+        if len(self._nodes) >= self.batch_size:
+            await self._flush_nodes()
+
+    async def add_reference(self, source_id: UUID, target_id: UUID):
+        if not self.available:
+            return
+        self._edges.append({"source": str(source_id), "target": str(target_id)})
+        if len(self._edges) >= self.batch_size:
+            await self.flush()
+
+    async def delete_clauses(self, clause_ids: Iterable[UUID]):
+        if not self.available:
+            return
+        ids = [str(i) for i in clause_ids]
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            await self._run(DELETE_CLAUSES, ids=batch)
+            self.stats.deleted += len(batch)
+
+    async def delete_references(self, source_ids: Iterable[UUID]):
+        """Drops outgoing REFERENCES edges, e.g. of clauses whose text changed."""
+        if not self.available:
+            return
+        ids = [str(i) for i in source_ids]
+        for start in range(0, len(ids), self.batch_size):
+            await self._run(DELETE_REFERENCES, ids=ids[start:start + self.batch_size])
+
+    async def flush(self):
+        await self._flush_nodes()
+        await self._flush_edges()
+
+    async def close(self):
+        """Releases the session (the driver stays open). Buffered writes that weren't flushed are dropped."""
+        self._nodes, self._edges = [], []
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _flush_nodes(self):
+        if not self._nodes:
+            return
+        rows, self._nodes = self._nodes, []
+        await self._run(MERGE_CLAUSES, rows=rows)
+        self.stats.nodes += len(rows)
+
+    async def _flush_edges(self):
+        if not self._edges:
+            return
+        # Edge endpoints may still be sitting in the node buffer
+        await self._flush_nodes()
+        rows, self._edges = self._edges, []
+        await self._run(MERGE_REFERENCES, rows=rows)
+        self.stats.edges += len(rows)
+
+    async def _run(self, query: str, **params):
+        if self._session is None:
+            self._session = graph_driver().session()
+            if not GraphWriter._schema_ready:
+                for statement in SCHEMA:
+                    await (await self._session.run(statement)).consume()
+                GraphWriter._schema_ready = True
+        start = time.perf_counter()
+        await (await self._session.run(query, params)).consume()
+        self.stats.seconds += time.perf_counter() - start
+        self.stats.batches += 1
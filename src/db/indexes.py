@@ -0,0 +1,275 @@
+"""
+ANN index management for Chunk.embedding.
+
+Usage:
+    python -m src.db.indexes create hnsw [--m 16] [--ef-construction 64] [--tender <tender_id>]
+    python -m src.db.indexes create ivfflat [--lists 100]
+    python -m src.db.indexes create halfvec|binary|subvector [--tender <tender_id>]
+    python -m src.db.indexes rebuild [hnsw|ivfflat]
+    python -m src.db.indexes drop hnsw|ivfflat|halfvec|binary|subvector [--tender <tender_id>]
+    python -m src.db.indexes list
+"""
+import argparse
+import asyncio
+import math
+import os
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any
+from uuid import UUID
+
+from sqlalchemy import text
+from src.db.database import engine
+from src.db.models import EMBEDDING_DIMENSIONS
+
+# Index names are fixed so rebuild/drop can find them again
+VECTOR_INDEXES = {
+    "hnsw": "ix_chunk_embedding_hnsw",
+    "ivfflat": "ix_chunk_embedding_ivfflat",
+}
+
+# SearchEngine.search_vector orders by cosine_distance, so the indexes must use the cosine opclass
+OPCLASS = "vector_cosine_ops"
+
+# Dimensions kept by the "subvector" index (text-embedding-3 vectors are Matryoshka-style,
+# so a prefix is a usable lower-dimensional embedding)
+QUANTIZED_DIMENSIONS = int(os.getenv("QUANTIZED_DIMENSIONS", "512"))
+
+@dataclass(frozen=True)
+class Quantization:
+    """
+    A compact HNSW expression index used as the first stage of a two-stage search.
+    `query` is the same expression applied to the :query parameter; it must mirror
+    `expression` exactly or Postgres won't use the index.
+    """
+    index_name: str
+    expression: str
+    opclass: str
+    operator: str
+    query: str
+
+_D = EMBEDDING_DIMENSIONS
+_Q = QUANTIZED_DIMENSIONS
+QUANTIZATIONS = {
+    # 2 bytes per dimension instead of 4
+    "halfvec": Quantization(
+        "ix_chunk_embedding_halfvec",
+        f"(embedding::halfvec({_D}))", "halfvec_cosine_ops", "<=>",
+        f"CAST(:query AS vector)::halfvec({_D})"
+    ),
+    # 1 bit per dimension, Hamming distance
+    "binary": Quantization(
+        "ix_chunk_embedding_binary",
+        f"(binary_quantize(embedding)::bit({_D}))", "bit_hamming_ops", "<~>",
+        f"binary_quantize(CAST(:query AS vector))::bit({_D})"
+    ),
+    # Reduced dimension, half precision
+    "subvector": Quantization(
+        "ix_chunk_embedding_subvector",
+        f"(subvector(embedding, 1, {_Q})::halfvec({_Q}))", "halfvec_cosine_ops", "<=>",
+        f"subvector(CAST(:query AS vector), 1, {_Q})::halfvec({_Q})"
+    ),
+}
+
+def tender_index_name(tender_id: UUID, prefix: str = VECTOR_INDEXES["hnsw"]) -> str:
+    # At most 31 + 32 chars, within Postgres' 63 character identifier limit
+    return f"{prefix}_{UUID(str(tender_id)).hex}"
+
+def index_name(kind: str, tender_id: Optional[UUID] = None) -> str:
+    """Name of the `kind` index, or of its partial index for one tender."""
+    name = VECTOR_INDEXES[kind] if kind in VECTOR_INDEXES else QUANTIZATIONS[kind].index_name
+    return tender_index_name(tender_id, name) if tender_id else name
+
+def hnsw_index_sql(
+    name: str,
+    m: int = 16,
+    ef_construction: int = 64,
+    tender_id: Optional[UUID] = None,
+    expression: str = "embedding",
+    opclass: str = OPCLASS
+) -> str:
+    sql = (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON chunk "
+        f"USING hnsw ({expression} {opclass}) WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+    )
+    if tender_id is not None:
+        # Partial index: a tender-scoped query walks a graph containing only that tender's
+        # chunks, so top-k is not lost to post-filtering and latency tracks the tender's size.
+        sql += f" WHERE tender_id = '{UUID(str(tender_id))}'"
+    return sql
+
+def ivfflat_index_sql(name: str, lists: int) -> str:
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON chunk "
+        f"USING ivfflat (embedding {OPCLASS}) WITH (lists = {int(lists)})"
+    )
+
+def ivfflat_lists_for(row_count: int) -> int:
+    """
+    pgvector's recommendation: rows / 1000 up to 1M rows, sqrt(rows) above that.
+    """
+    if row_count <= 1000000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+async def _execute_autocommit(statements: List[str], settings: Optional[Dict[str, str]] = None):
+    # CREATE/REINDEX ... CONCURRENTLY cannot run inside a transaction block, so SET LOCAL
+    # is not an option: settings are SET on the connection and RESET before it goes back
+    # to the pool, where they would otherwise leak to its next user
+    settings = settings or {}
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            for name, value in settings.items():
+                await conn.execute(text(f"SET {name} = '{value}'"))
+            for statement in statements:
+                print(f"[INDEX] {statement}")
+                await conn.execute(text(statement))
+        finally:
+            for name in settings:
+                await conn.execute(text(f"RESET {name}"))
+
+async def _drop_invalid_index(name: str):
+    """
+    A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which IF NOT EXISTS
+    then takes for a finished one. Drops it, so the build that follows starts over.
+    """
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            """
+            SELECT NOT i.indisvalid FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = :name
+            """
+        ), {"name": name})
+        invalid = result.scalar()
+    if invalid:
+        await _execute_autocommit([f"DROP INDEX CONCURRENTLY IF EXISTS {name}"])
+
+async def _chunk_count() -> int:
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT count(*) FROM chunk"))
+        return result.scalar_one()
+
+async def create_vector_index(
+    kind: str = "hnsw",
+    m: int = 16,
+    ef_construction: int = 64,
+    lists: Optional[int] = None,
+    maintenance_work_mem: str = "1GB"
+):
+    """
+    Creates the HNSW or IVFFlat index on chunk.embedding without locking out writes.
+    IVFFlat should be (re)built after the bulk of the data is loaded, since its lists
+    are trained on the rows present at build time.
+    """
+    name = VECTOR_INDEXES[kind]
+    if kind == "hnsw":
+        create = hnsw_index_sql(name, m, ef_construction)
+    else:
+        if lists is None:
+            lists = ivfflat_lists_for(await _chunk_count())
+        create = ivfflat_index_sql(name, lists)
+
+    await _drop_invalid_index(name)
+    await _execute_autocommit([create], {"maintenance_work_mem": maintenance_work_mem})
+
+async def create_quantized_index(
+    quantization: str,
+    tender_id: Optional[UUID] = None,
+    m: int = 16,
+    ef_construction: int = 64,
+    maintenance_work_mem: str = "1GB"
+):
+    """
+    Creates the compact first-stage index for SearchEngine's two-stage (oversample + rescore) search.
+    The full-precision embedding column is kept for the exact rescoring step.
+    """
+    q = QUANTIZATIONS[quantization]
+    name = index_name(quantization, tender_id)
+    await _drop_invalid_index(name)
+    await _execute_autocommit(
+        [hnsw_index_sql(name, m, ef_construction, tender_id, q.expression, q.opclass)],
+        {"maintenance_work_mem": maintenance_work_mem}
+    )
+
+async def create_tender_vector_index(tender_id: UUID, m: int = 16, ef_construction: int = 64):
+    """
+    Creates the partial HNSW index for one tender. A no-op if a valid one already exists;
+    new chunks for the tender are added to it incrementally on insert.
+    """
+    name = tender_index_name(tender_id)
+    await _drop_invalid_index(name)
+    await _execute_autocommit([hnsw_index_sql(name, m, ef_construction, tender_id=tender_id)])
+
+async def drop_tender_vector_index(tender_id: UUID, kind: str = "hnsw"):
+    await _execute_autocommit([f"DROP INDEX CONCURRENTLY IF EXISTS {index_name(kind, tender_id)}"])
+
+async def rebuild_vector_indexes(kind: Optional[str] = None):
+    """
+    Rebuilds the vector indexes in place (e.g. after large loads or deletes).
+    Without `kind`, every embedding index is rebuilt, including the per-tender ones.
+    """
+    existing = [row["name"] for row in await list_vector_indexes()]
+    if kind:
+        existing = [name for name in existing if name == VECTOR_INDEXES[kind]]
+    statements = [f"REINDEX INDEX CONCURRENTLY {name}" for name in existing]
+    if statements:
+        await _execute_autocommit(statements)
+
+async def drop_vector_index(kind: str):
+    await _execute_autocommit([f"DROP INDEX CONCURRENTLY IF EXISTS {index_name(kind)}"])
+
+async def list_vector_indexes() -> List[Dict[str, Any]]:
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            """
+            SELECT indexname AS name, indexdef AS definition,
+                   pg_size_pretty(pg_relation_size(format('%I', indexname)::regclass)) AS size
+            FROM pg_indexes
+            WHERE tablename = 'chunk' AND indexdef ILIKE '%embedding%'
+            """
+        ))
+        return [dict(row._mapping) for row in result]
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Manage ANN indexes on chunk.embedding")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create")
+    create.add_argument("kind", choices=list(VECTOR_INDEXES) + list(QUANTIZATIONS))
+    create.add_argument("--m", type=int, default=16)
+    create.add_argument("--ef-construction", type=int, default=64)
+    create.add_argument("--lists", type=int, default=None)
+    create.add_argument("--tender", type=UUID, default=None, help="Create the partial index for one tender (not ivfflat)")
+
+    rebuild = sub.add_parser("rebuild")
+    rebuild.add_argument("kind", nargs="?", choices=list(VECTOR_INDEXES))
+
+    drop = sub.add_parser("drop")
+    drop.add_argument("kind", choices=list(VECTOR_INDEXES) + list(QUANTIZATIONS))
+    drop.add_argument("--tender", type=UUID, default=None)
+
+    sub.add_parser("list")
+
+    args = parser.parse_args(argv)
+    if getattr(args, "tender", None) and args.kind == "ivfflat":
+        # IVFFlat lists are trained table-wide; there is no per-tender IVFFlat index
+        parser.error("--tender is not supported for ivfflat")
+    if args.command == "create" and args.kind in QUANTIZATIONS:
+        await create_quantized_index(args.kind, args.tender, args.m, args.ef_construction)
+    elif args.command == "create" and args.tender:
+        await create_tender_vector_index(args.tender, args.m, args.ef_construction)
+    elif args.command == "create":
+        await create_vector_index(args.kind, args.m, args.ef_construction, args.lists)
+    elif args.command == "rebuild":
+        await rebuild_vector_indexes(args.kind)
+    elif args.command == "drop" and args.tender:
+        await drop_tender_vector_index(args.tender, args.kind)
+    elif args.command == "drop":
+        await drop_vector_index(args.kind)
+
+    for index in await list_vector_indexes():
+        print(f"{index['name']} ({index['size']}): {index['definition']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,22 @@
+import os
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from uuid import UUID, uuid4
 from sqlmodel import Field, SQLModel, Relationship
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import Column
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, Computed, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+
+# text-embedding-3 models can return shortened vectors via the `dimensions` parameter.
+# Changing this requires re-creating the chunk table and re-embedding.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
 
 class Tender(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     name: str
     client: Optional[str] = None
+    # Bumped by every committed ingestion; query caches (src.retrieval.cache) key on it
+    version: int = Field(default=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     metadata_: Dict[str, Any] = Field(default_factory=dict, sa_column=Column("metadata", JSONB))
     
@@ -19,6 +26,8 @@ class Document(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     filename: str
     tender_id: UUID = Field(foreign_key="tender.id")
+    # SHA-256 of the parsed content; an identical re-upload is skipped entirely
+    content_hash: Optional[str] = Field(default=None, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     metadata_: Dict[str, Any] = Field(default_factory=dict, sa_column=Column("metadata", JSONB))
     
@@ -26,11 +35,25 @@ class Document(SQLModel, table=True):
     clauses: List["Clause"] = Relationship(back_populates="document")
 
 class Clause(SQLModel, table=True):
+    __table_args__ = (
+        # Exact and sub-clause (LIKE 'key.%') lookups within a tender
+        Index(
+            "ix_clause_tender_key", "tender_id", "clause_key",
+            postgresql_ops={"clause_key": "text_pattern_ops"}
+        ),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     document_id: UUID = Field(foreign_key="document.id")
+    # Denormalized from Document so retrieval can filter by tender without a join
+    tender_id: UUID = Field(foreign_key="tender.id", index=True)
     clause_number: str
+    # Normalized, sortable form of clause_number (see src.retrieval.clause_keys), e.g. "0005.0001"
+    clause_key: Optional[str] = None
     title: Optional[str] = None
     content: str
+    # SHA-256 of `content`; re-ingestion keeps the chunks/embeddings of clauses whose hash is unchanged
+    content_hash: Optional[str] = None
     page_number: Optional[int] = None
     metadata_: Dict[str, Any] = Field(default_factory=dict, sa_column=Column("metadata", JSONB))
     
@@ -38,11 +61,22 @@ class Clause(SQLModel, table=True):
     chunks: List["Chunk"] = Relationship(back_populates="clause")
 
 class Chunk(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_chunk_content_tsv", "content_tsv", postgresql_using="gin"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     clause_id: UUID = Field(foreign_key="clause.id")
+    # Denormalized from Document; per-tender partial vector indexes are keyed on it
+    tender_id: UUID = Field(foreign_key="tender.id", index=True)
     content: str
     chunk_index: int
-    embedding: List[float] = Field(sa_type=Vector(1536))
+    embedding: List[float] = Field(sa_type=Vector(EMBEDDING_DIMENSIONS))
+    # Keyword index for BM25-style retrieval, maintained by Postgres from `content`
+    content_tsv: Optional[str] = Field(
+        default=None,
+        sa_column=Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True))
+    )
     metadata_: Dict[str, Any] = Field(default_factory=dict, sa_column=Column("metadata", JSONB))
     
     clause: Clause = Relationship(back_populates="chunks")
@@ -73,3 +107,59 @@ class Message(SQLModel, table=True):
     metadata_: Dict[str, Any] = Field(default_factory=dict, sa_column=Column("metadata", JSONB))
     
     session: Session = Relationship(back_populates="messages")
+
+class AuditLog(SQLModel, table=True):
+    """One row per /query request: what was asked, how it was answered and how long it took."""
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    query_id: str = Field(index=True)
+    tender_id: str = Field(index=True)
+    interface_source: str
+    raw_query: str
+    classification: Optional[str] = None
+    strategy: Optional[str] = None
+    status: str
+    cached: bool = False
+    refusal_reason: Optional[str] = None
+    agent_response: Optional[str] = None
+    # Chunk/clause ids the agent's tools retrieved, in order
+    retrieved_ids: List[str] = Field(default_factory=list, sa_column=Column(JSONB))
+    # Retrieved text given to the model, e.g. {"tokens": 1450, "raw_tokens": 3900, "saved": 2450}
+    context_tokens: Dict[str, int] = Field(default_factory=dict, sa_column=Column(JSONB))
+    # Milliseconds per step, e.g. {"cache": 0.4, "agent": 2310.5, "total": 2311.2}
+    timings: Dict[str, float] = Field(default_factory=dict, sa_column=Column(JSONB))
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class IngestionJob(SQLModel, table=True):
+    """
+    A queued /ingest upload. Worker processes (src.ingestion.jobs) claim jobs with
+    FOR UPDATE SKIP LOCKED and report progress here while they run.
+    """
+    __table_args__ = (
+        # Claim query: oldest queued job first
+        Index("ix_ingestionjob_status_created", "status", "created_at"),
+        # The same bytes are ingested once per tender; a failed job doesn't block a retry
+        Index(
+            "ux_ingestionjob_tender_file", "tender_name", "file_hash",
+            unique=True, postgresql_where=text("status <> 'failed'")
+        ),
+    )
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    tender_name: str = Field(index=True)
+    # File or folder/.zip path, readable by the worker processes
+    file_path: str
+    # SHA-256 of the uploaded bytes (src.ingestion.storage)
+    file_hash: Optional[str] = None
+    reingest: bool = False
+    # queued -> running -> succeeded | failed
+    status: str = Field(default="queued")
+    attempts: int = 0
+    worker: Optional[str] = None
+    error: Optional[str] = None
+    # IngestionProgress.as_dict(): files done and per-stage items and items/s
+    progress: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONB))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    # Refreshed while running; a stale heartbeat means the worker died and the job is requeued
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,131 @@
+"""
+Chunker benchmark: the previous split("\\n\\n") chunker against the offset-based chunker,
+on a synthetic specification of the requested size.
+
+Usage:
+    python -m src.ingestion.benchmark [--size-mb 300] [--memory] [--file spec.md]
+
+--memory also reports peak Python heap allocations (tracemalloc, noticeably slower).
+Pages of a memory-mapped file live in the OS page cache and don't count towards it.
+"""
+import argparse
+import mmap
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from src.ingestion.chunker import ClauseChunker, DocumentChunk
+
+WORDS = (
+    "contractor shall provide all labour plant materials and supervision necessary to complete "
+    "the works in accordance with the drawings specification and bill of quantities retention "
+    "payment certificate engineer employer defects liability period insurance concrete steel"
+).split()
+
+def legacy_chunk_document(content: str, base_metadata: Dict[str, Any]) -> List[DocumentChunk]:
+    """The chunker before offsets: one str copy per paragraph and one metadata copy per chunk."""
+    chunks = []
+    chunk_index = 0
+    for raw in content.split("\n\n"):
+        cleaned_text = raw.strip()
+        if not cleaned_text or len(cleaned_text) < 5:
+            continue
+        chunk_metadata = base_metadata.copy()
+        chunk_metadata["chunk_method"] = "clause_heuristic"
+        chunk_metadata["clause_number"] = f"GEN-{chunk_index+1}"
+        chunks.append(DocumentChunk(
+            content=cleaned_text,
+            index=chunk_index,
+            metadata=chunk_metadata,
+            token_count=len(cleaned_text) // 4
+        ))
+        chunk_index += 1
+    return chunks
+
+def write_specification(path: Path, size_mb: int, seed: int = 0):
+    """Writes numbered sections/clauses of random tender prose until the file reaches size_mb."""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    section = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            section += 1
+            block = [f"{section}. SECTION {section}\n"]
+            for clause in range(1, 21):
+                paragraphs = [
+                    " ".join(rng.choices(WORDS, k=rng.randint(40, 120))) + "."
+                    for _ in range(rng.randint(1, 3))
+                ]
+                block.append(f"{section}.{clause} Clause heading\n" + "\n\n".join(paragraphs) + "\n\n")
+            text = "".join(block)
+            f.write(text)
+            written += len(text)
+
+def _measure(label: str, run: Callable[[], int], memory: bool) -> Dict[str, Any]:
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    count = run()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"label": label, "chunks": count, "seconds": seconds, "peak_mb": peak / 2**20 if peak else None}
+
+def run_benchmark(path: Path, memory: bool = False) -> List[Dict[str, Any]]:
+    chunker = ClauseChunker()
+    metadata = {"filename": path.name, "document_id": "benchmark"}
+
+    def legacy():
+        content = path.read_text(encoding="utf-8")
+        return len(legacy_chunk_document(content, metadata))
+
+    def offsets_str():
+        content = path.read_text(encoding="utf-8")
+        # Consume as the pipeline does: one chunk at a time
+        return sum(1 for _ in chunker.iter_chunks(content, metadata))
+
+    def offsets_mmap():
+        return sum(1 for _ in chunker.iter_file_chunks(path, metadata))
+
+    def spans_only():
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return sum(1 for _ in chunker.iter_spans(mapped))
+
+    return [
+        _measure("legacy split", legacy, memory),
+        _measure("offsets (str)", offsets_str, memory),
+        _measure("offsets (mmap)", offsets_mmap, memory),
+        _measure("spans only (mmap)", spans_only, memory),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the clause chunker")
+    parser.add_argument("--size-mb", type=int, default=300)
+    parser.add_argument("--file", type=Path, help="Benchmark an existing text/markdown file instead")
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = Path(tmp) / "specification.md"
+            write_specification(path, args.size_mb)
+        size_mb = path.stat().st_size / 2**20
+        print(f"{path.name}: {size_mb:.0f} MB")
+        print(f"{'chunker':<20} {'chunks':>9} {'seconds':>9} {'MB/s':>8} {'peak MB':>9}")
+        for row in run_benchmark(path, args.memory):
+            peak = f"{row['peak_mb']:>9.0f}" if row["peak_mb"] is not None else f"{'-':>9}"
+            print(
+                f"{row['label']:<20} {row['chunks']:>9} {row['seconds']:>9.2f} "
+                f"{size_mb / row['seconds']:>8.0f} {peak}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Content hashing and clause diffing for incremental re-ingestion.
+A new revision of a document (e.g. after an addendum) is matched clause by clause
+against the stored one, so only changed clauses are re-embedded and rewritten.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Sequence
+from uuid import UUID
+
+def content_hash(text) -> str:
+    # Exact text: a whitespace-only edit still updates the stored content, but the
+    # embedding cache (which normalizes whitespace) makes its re-embedding free.
+    # A memory-mapped UTF-8 file hashes the same as its decoded str
+    return hashlib.sha256(text.encode("utf-8") if isinstance(text, str) else text).hexdigest()
+
+@dataclass
+class StoredClause:
+    id: UUID
+    clause_number: str
+    content_hash: str
+    # Index of the clause's first chunk in the document
+    chunk_index: int
+
+@dataclass
+class ClausePlan:
+    """
+    What to do with each clause of the new revision. Positions index into the new
+    revision's clause list; ids are stored clause ids.
+    """
+    unchanged: Dict[int, UUID] = field(default_factory=dict)
+    # Same content, different clause number or position: metadata-only update
+    moved: Dict[int, UUID] = field(default_factory=dict)
+    # Same clause number, new content: rewrite in place and re-embed
+    updated: Dict[int, UUID] = field(default_factory=dict)
+    inserted: List[int] = field(default_factory=list)
+    deleted: List[UUID] = field(default_factory=list)
+
+def plan_clauses(
+    stored: Sequence[StoredClause],
+    revision: Sequence[Tuple[str, str, int]]
+) -> ClausePlan:
+    """
+    Matches the new revision's (clause_number, content_hash, first chunk index) entries
+    against stored clauses.
+    Identical content is matched first (preferring the same clause number), so a clause
+    that only moved keeps its embedding; remaining clauses pair up by clause number.
+    """
+    plan = ClausePlan()
+    remaining = list(stored)
+    by_hash: Dict[str, List[StoredClause]] = {}
+    for clause in remaining:
+        by_hash.setdefault(clause.content_hash, []).append(clause)
+
+    unmatched: List[int] = []
+    for position, (number, digest, chunk_index) in enumerate(revision):
+        candidates = by_hash.get(digest)
+        if not candidates:
+            unmatched.append(position)
+            continue
+        match = next((c for c in candidates if c.clause_number == number), candidates[0])
+        candidates.remove(match)
+        remaining.remove(match)
+        if match.clause_number == number and match.chunk_index == chunk_index:
+            plan.unchanged[position] = match.id
+        else:
+            plan.moved[position] = match.id
+
+    by_number = {c.clause_number: c for c in remaining}
+    for position in unmatched:
+        match = by_number.pop(revision[position][0], None)
+        if match is None:
+            plan.inserted.append(position)
+        else:
+            plan.updated[position] = match.id
+            remaining.remove(match)
+
+    plan.deleted = [c.id for c in remaining]
+    return plan
+
+@dataclass
+class ReingestReport:
+    """How much of a re-ingest was skipped because content was unchanged."""
+    unchanged: int = 0
+    moved: int = 0
+    updated: int = 0
+    inserted: int = 0
+    deleted: int = 0
+    # Counted in clauses; a clause can be embedded as several chunks
+    embeddings_reused: int = 0
+    embeddings_computed: int = 0
+    document_unchanged: bool = False
+
+    @classmethod
+    def from_plan(cls, plan: ClausePlan) -> "ReingestReport":
+        return cls(
+            unchanged=len(plan.unchanged),
+            moved=len(plan.moved),
+            updated=len(plan.updated),
+            inserted=len(plan.inserted),
+            deleted=len(plan.deleted),
+            embeddings_reused=len(plan.unchanged) + len(plan.moved),
+            embeddings_computed=len(plan.updated) + len(plan.inserted),
+        )
+
+    @property
+    def skipped_fraction(self) -> float:
+        total = self.embeddings_reused + self.embeddings_computed
+        return self.embeddings_reused / total if total else 1.0
+
+    def __str__(self) -> str:
+        if self.document_unchanged:
+            return f"document unchanged, skipped {self.unchanged} clauses"
+        return (
+            f"{self.unchanged} unchanged, {self.moved} moved, {self.updated} updated, "
+            f"{self.inserted} inserted, {self.deleted} deleted; "
+            f"kept embeddings of {self.embeddings_reused} clauses, re-embedded {self.embeddings_computed} "
+            f"({self.skipped_fraction:.0%} skipped)"
+        )
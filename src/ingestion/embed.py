@@ -1,13 +1,133 @@
-from typing import List
+from typing import List, Dict
+import asyncio
 import os
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from src.ingestion.embed_cache import embedding_cache, cache_key
+from src.db.models import EMBEDDING_DIMENSIONS
+
 client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# Only sent when shortened embeddings are configured (older models reject the parameter)
+_dimension_args = {"dimensions": EMBEDDING_DIMENSIONS} if EMBEDDING_DIMENSIONS != 1536 else {}
+
+# Batch limits for the embeddings endpoint.
+# OpenAI accepts up to 2048 inputs and ~300k tokens per request; we stay well below both
+# so a single slow batch doesn't hold up the rest of the document.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "100000"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+def _prepare(text: str) -> str:
+    return text.replace("\n", " ")
+
+def _cache_model(model: str) -> str:
+    # Shortened embeddings are a different vector space; keep their cache entries apart
+    return f"{model}:{EMBEDDING_DIMENSIONS}" if _dimension_args else model
+
+def _estimate_tokens(text: str) -> int:
+    # Rough approx: only used to bound request size; chunks are already sized with
+    # exact tiktoken counts by the chunker (src.ingestion.tokens)
+    return max(1, len(text) // 4)
+
 async def get_embedding(text: str, model: str = "text-embedding-3-small") -> List[float]:
-    text = text.replace("\n", " ")
-    response = await client.embeddings.create(input=[text], model=model)
-    return response.data[0].embedding
+    key = cache_key(text, _cache_model(model))
+    cached = (await embedding_cache.get_many([key])).get(key)
+    if cached is not None:
+        return cached
+
+    text = _prepare(text)
+    response = await client.embeddings.create(input=[text], model=model, **_dimension_args)
+    embedding = response.data[0].embedding
+    await embedding_cache.put_many([(key, embedding)])
+    return embedding
+
+def batch_texts(
+    texts: List[str],
+    max_items: int = EMBED_BATCH_SIZE,
+    max_tokens: int = EMBED_BATCH_TOKENS
+) -> List[List[int]]:
+    """
+    Groups text positions into batches bounded by item count and estimated tokens.
+    Returns lists of indexes into `texts` so results can be mapped back in order.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+
+    for i, text in enumerate(texts):
+        tokens = _estimate_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+async def get_embeddings(
+    texts: List[str],
+    model: str = "text-embedding-3-small",
+    max_items: int = EMBED_BATCH_SIZE,
+    max_tokens: int = EMBED_BATCH_TOKENS,
+    concurrency: int = EMBED_CONCURRENCY
+) -> List[List[float]]:
+    """
+    Embeds many texts using batched requests with bounded concurrency.
+    Cached texts are served from the embedding cache and duplicates are only sent once.
+    The returned list is aligned with `texts`.
+    """
+    if not texts:
+        return []
+
+    results: List[List[float]] = [None] * len(texts)
+
+    # Resolve cache hits (one disk lookup for the batch) and collapse duplicate texts
+    # onto one request slot
+    text_keys = [cache_key(text, _cache_model(model)) for text in texts]
+    cached = await embedding_cache.get_many(text_keys)
+    pending: Dict[str, List[int]] = {}
+    prepared: List[str] = []
+    keys: List[str] = []
+    for i, (text, key) in enumerate(zip(texts, text_keys)):
+        if key in cached:
+            results[i] = cached[key]
+            continue
+        if key in pending:
+            pending[key].append(i)
+            continue
+        pending[key] = [i]
+        keys.append(key)
+        prepared.append(_prepare(text))
+
+    if not prepared:
+        return results
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def embed_batch(indexes: List[int]):
+        async with semaphore:
+            response = await client.embeddings.create(
+                input=[prepared[i] for i in indexes],
+                model=model,
+                **_dimension_args
+            )
+        # response.data[n].index refers to the position within this batch
+        embedded = []
+        for item in response.data:
+            key = keys[indexes[item.index]]
+            embedded.append((key, item.embedding))
+            for i in pending[key]:
+                results[i] = item.embedding
+        await embedding_cache.put_many(embedded)
+
+    await asyncio.gather(*(
+        embed_batch(indexes) for indexes in batch_texts(prepared, max_items, max_tokens)
+    ))
+    return results
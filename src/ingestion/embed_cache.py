@@ -0,0 +1,207 @@
+"""
+Content-addressed embedding cache.
+Two tiers: an in-memory LRU in front of a SQLite file on disk.
+Entries are keyed by a hash of the normalized text plus the model name, so identical
+boilerplate (e.g. standard GCC conditions) is only embedded once across tenders.
+The SQLite file is opened on first use, and the async get_many/put_many used by the
+embedding calls run disk reads and writes in a thread, off the event loop.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    # Per tier, for sizing memory_entries and disk_entries separately
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+def normalize_text(text: str) -> str:
+    # Whitespace differences (line wrapping, double spaces) must not produce a new entry
+    return " ".join(text.split())
+
+def cache_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_entries: int = 10000,
+        disk_entries: int = 1000000
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.stats = CacheStats()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._writes_since_evict = 0
+        self._db = None
+        # One connection shared by the threads disk I/O runs in
+        self._db_lock = threading.Lock()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        # Opened lazily: importing the module must not touch the disk
+        if self._db is None and self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_used ON embedding_cache (last_used)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Cached vectors for `keys`. Memory hits are served inline; the rest are read from
+        disk in one query, in a thread.
+        """
+        found, missing = self._get_memory(keys)
+        from_disk = await asyncio.to_thread(self._read_disk, missing) if missing and self.path else {}
+        found.update(self._record_disk(missing, from_disk))
+        return found
+
+    def _get_memory(self, keys: Iterable[str]) -> Tuple[Dict[str, List[float]], List[str]]:
+        found: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        for key in dict.fromkeys(keys):
+            vector = self._memory.get(key)
+            if vector is None:
+                missing.append(key)
+                continue
+            self._memory.move_to_end(key)
+            self.stats.memory_hits += 1
+            found[key] = vector
+        return found, missing
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, List[float]]:
+        # Only touches SQLite, so it is safe to run in a thread
+        found: Dict[str, List[float]] = {}
+        with self._db_lock:
+            db = self._connection()
+            # Stays under SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = db.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                db.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                db.commit()
+        return found
+
+    def _record_disk(self, keys: List[str], found: Dict[str, List[float]]) -> Dict[str, List[float]]:
+        # Memory tier and stats are only updated on the caller's thread
+        for key, vector in found.items():
+            self._remember(key, vector)
+        self.stats.disk_hits += len(found)
+        self.stats.misses += len(keys) - len(found)
+        return found
+
+    async def put_many(self, items: List[Tuple[str, List[float]]]):
+        """Stores vectors in memory at once and writes (and commits) them to disk in a thread."""
+        for key, vector in items:
+            self._remember(key, vector)
+        if items and self.path:
+            self.stats.disk_evictions += await asyncio.to_thread(self._write_disk, items)
+
+    def _write_disk(self, items: List[Tuple[str, List[float]]]) -> int:
+        """Returns the rows evicted to make room."""
+        now = time.time()
+        with self._db_lock:
+            db = self._connection()
+            db.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items]
+            )
+            db.commit()
+            self._writes_since_evict += len(items)
+            # Eviction scans the table, so only check periodically
+            if self._writes_since_evict >= 1000:
+                return self._evict()
+        return 0
+
+    def evict(self):
+        """
+        Trims the disk tier back to `disk_entries`, dropping the least recently used rows.
+        """
+        if not self.path:
+            return
+        with self._db_lock:
+            self.stats.disk_evictions += self._evict()
+
+    def _evict(self) -> int:
+        self._writes_since_evict = 0
+        db = self._connection()
+        (count,) = db.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+        excess = count - self.disk_entries
+        if excess > 0:
+            db.execute(
+                """
+                DELETE FROM embedding_cache WHERE key IN (
+                    SELECT key FROM embedding_cache ORDER BY last_used LIMIT ?
+                )
+                """,
+                (excess,)
+            )
+        db.commit()
+        return max(0, excess)
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats.memory_evictions += 1
+
+# Global instance shared by ingestion and search.
+# Set EMBEDDING_CACHE_PATH="" to keep the cache in memory only.
+embedding_cache = EmbeddingCache(
+    path=os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3") or None,
+    memory_entries=int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "10000")),
+    disk_entries=int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "1000000"))
+)
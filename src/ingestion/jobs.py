@@ -0,0 +1,271 @@
+"""
+Durable ingestion jobs.
+/ingest only inserts an IngestionJob row; separate worker processes claim queued jobs
+with FOR UPDATE SKIP LOCKED and run the pipeline, so ingestion never competes with
+queries for the API's event loop and survives API restarts.
+
+Run the workers with:
+    python -m src.ingestion.jobs --workers 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import IntegrityError
+from src.db.database import get_session
+from src.db.graph_writer import close_graph_driver
+from src.db.models import IngestionJob
+from src.ingestion.parser import shutdown_parse_pool
+from src.ingestion.pipeline import IngestionPipeline, get_or_create_tender, ingest_path
+from src.ingestion.stages import IngestionProgress
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# Jobs of one tender running at the same time, across all workers
+INGEST_TENDER_CONCURRENCY = int(os.getenv("INGEST_TENDER_CONCURRENCY", "1"))
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "2"))
+INGEST_HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", "5"))
+# A running job without a heartbeat for this long belonged to a worker that died
+INGEST_STALE_SECONDS = float(os.getenv("INGEST_STALE_SECONDS", "120"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+
+# Serializes claims, so two workers can't both pass the per-tender limit check
+CLAIM_LOCK = 0x1A6E57
+
+REQUEUE_STALE = text(
+    """
+    UPDATE ingestionjob
+    SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END,
+        error = 'Worker stopped responding',
+        finished_at = CASE WHEN attempts >= :max_attempts THEN :now ELSE NULL END
+    WHERE status = 'running' AND heartbeat_at < :stale_before
+    """
+)
+
+CLAIM_JOB = text(
+    """
+    UPDATE ingestionjob
+    SET status = 'running', attempts = attempts + 1, worker = :worker,
+        started_at = :now, heartbeat_at = :now, error = NULL
+    WHERE id = (
+        SELECT j.id FROM ingestionjob j
+        WHERE j.status = 'queued'
+          AND (
+              SELECT count(*) FROM ingestionjob r
+              WHERE r.tender_name = j.tender_name AND r.status = 'running'
+          ) < :per_tender
+        ORDER BY j.created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, tender_name, file_path, reingest, attempts
+    """
+)
+
+async def enqueue_job(
+    file_path: str,
+    tender_name: str,
+    reingest: bool = False,
+    file_hash: Optional[str] = None
+) -> Tuple[IngestionJob, bool]:
+    """
+    Returns (job, created). A file with the same hash already queued, running or
+    ingested for the tender is not queued again; its existing job is returned instead.
+    """
+    session_gen = get_session()
+    session = await anext(session_gen)
+    try:
+        if file_hash is not None:
+            existing = await _find_duplicate(session, tender_name, file_hash)
+            if existing is not None:
+                return existing, False
+        job = IngestionJob(file_path=file_path, tender_name=tender_name, reingest=reingest, file_hash=file_hash)
+        session.add(job)
+        try:
+            await session.commit()
+        except IntegrityError:
+            # A concurrent upload of the same file won the unique index
+            await session.rollback()
+            return await _find_duplicate(session, tender_name, file_hash), False
+        return job, True
+    finally:
+        await session.close()
+
+async def _find_duplicate(session, tender_name: str, file_hash: str) -> Optional[IngestionJob]:
+    result = await session.execute(
+        select(IngestionJob).where(
+            IngestionJob.tender_name == tender_name,
+            IngestionJob.file_hash == file_hash,
+            IngestionJob.status != "failed"
+        )
+    )
+    return result.scalars().first()
+
+async def get_job(job_id: UUID) -> Optional[IngestionJob]:
+    session_gen = get_session()
+    session = await anext(session_gen)
+    try:
+        result = await session.execute(select(IngestionJob).where(IngestionJob.id == job_id))
+        return result.scalar_one_or_none()
+    finally:
+        await session.close()
+
+def job_status(job: IngestionJob) -> Dict[str, Any]:
+    """The /ingest/{job_id} view of a job."""
+    end = job.finished_at or datetime.utcnow()
+    return {
+        "job_id": str(job.id),
+        "tender_name": job.tender_name,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "elapsed_seconds": round((end - job.started_at).total_seconds(), 1) if job.started_at else None,
+        "progress": job.progress or {},
+    }
+
+async def claim_job(
+    worker: str,
+    per_tender: int = INGEST_TENDER_CONCURRENCY,
+    stale_seconds: float = INGEST_STALE_SECONDS,
+    max_attempts: int = INGEST_MAX_ATTEMPTS
+) -> Optional[Dict[str, Any]]:
+    """
+    Claims the oldest queued job whose tender is below its running-job limit.
+    Returns (id, tender_name, file_path, reingest, attempts) as a dict, or None when there is nothing to do.
+    """
+    now = datetime.utcnow()
+    session_gen = get_session()
+    session = await anext(session_gen)
+    try:
+        await session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CLAIM_LOCK})
+        await session.execute(REQUEUE_STALE, {
+            "max_attempts": max_attempts,
+            "now": now,
+            "stale_before": now - timedelta(seconds=stale_seconds),
+        })
+        result = await session.execute(CLAIM_JOB, {"worker": worker, "now": now, "per_tender": per_tender})
+        row = result.mappings().first()
+        await session.commit()
+        return dict(row) if row is not None else None
+    finally:
+        await session.close()
+
+async def _update_job(job_id: UUID, **values):
+    session_gen = get_session()
+    session = await anext(session_gen)
+    try:
+        await session.execute(update(IngestionJob).where(IngestionJob.id == job_id).values(**values))
+        await session.commit()
+    finally:
+        await session.close()
+
+async def _heartbeat(job_id: UUID, progress: IngestionProgress, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await _update_job(job_id, heartbeat_at=datetime.utcnow(), progress=progress.as_dict())
+        except Exception as e:
+            # A missed heartbeat is harmless unless it lasts until the job looks stale
+            print(f"Warning: Could not report progress of job {job_id}: {e}")
+
+async def run_job(job: Dict[str, Any], heartbeat_seconds: float = INGEST_HEARTBEAT_SECONDS):
+    # A retried job may have committed some files of its folder before the worker died;
+    # re-ingestion diffs them against the stored documents instead of inserting them twice
+    retry = job.get("attempts", 1) > 1
+    pipeline = IngestionPipeline(reingest=job["reingest"] or retry)
+    heartbeat = asyncio.create_task(_heartbeat(job["id"], pipeline.progress, heartbeat_seconds))
+    status, error = "succeeded", None
+    try:
+        tender_id = await get_or_create_tender(job["tender_name"])
+        report = await ingest_path(pipeline, Path(job["file_path"]), tender_id)
+        if report is not None and report.failed:
+            # Other files of the folder are ingested; the job reports which ones failed
+            error = "; ".join(f"{name}: {reason}" for name, reason in report.failed.items())
+            if not report.ingested:
+                status = "failed"
+    except Exception as e:
+        status, error = "failed", str(e)
+    finally:
+        heartbeat.cancel()
+    await _update_job(
+        job["id"],
+        status=status,
+        error=error,
+        progress=pipeline.progress.as_dict(),
+        heartbeat_at=datetime.utcnow(),
+        finished_at=datetime.utcnow()
+    )
+    print(f"Job {job['id']} ({job['tender_name']}): {status}")
+
+async def run_worker(worker: str, stop: asyncio.Event, poll_seconds: float = INGEST_POLL_SECONDS):
+    """Claims and runs jobs one at a time until `stop` is set; the current job is finished first."""
+    print(f"Ingestion worker {worker} started")
+    while not stop.is_set():
+        try:
+            job = await claim_job(worker)
+        except Exception as e:
+            print(f"Warning: Worker {worker} could not claim a job: {e}")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await run_job(job)
+    print(f"Ingestion worker {worker} stopped")
+
+def _worker_process(worker: str):
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            await run_worker(worker, stop)
+        finally:
+            await close_graph_driver()
+
+    try:
+        asyncio.run(main())
+    finally:
+        # The parse pool outlives jobs so Docling stays loaded; it goes with the worker
+        shutdown_parse_pool()
+
+def run_workers(workers: int = INGEST_WORKERS):
+    """Starts `workers` processes, each with its own event loop and database connections."""
+    context = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    processes = [
+        context.Process(target=_worker_process, args=(f"{host}-{os.getpid()}-{i}",), name=f"ingest-worker-{i}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def shutdown(signum, frame):
+        # Workers finish their current job, then exit
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ingestion job workers")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    args = parser.parse_args()
+    run_workers(args.workers)
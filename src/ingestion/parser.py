@@ -1,44 +1,169 @@
+import asyncio
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Any
-# from docling.document_converter import DocumentConverter 
+from typing import List, Dict, Any, AsyncIterator, Iterable, Tuple, Optional
 
-# Placeholder for Docling until we confirm environment supports it or we want to run it.
-# For this MVP step, we will assume we can read text/md files directly or mock PDF parsing.
+from src.ingestion.chunker import ClauseChunker
+
+# Docling models are loaded once per worker process, so the pool amortizes start-up
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+TEXT_SUFFIXES = {".md", ".txt"}
+DOCLING_SUFFIXES = {".pdf", ".docx"}
+SUPPORTED_SUFFIXES = TEXT_SUFFIXES | DOCLING_SUFFIXES
+
+_converter = None
+# Long-lived pool of the ingesting process; see parse_pool()
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _docling_converter():
+    global _converter
+    if _converter is None:
+        # Imported lazily: docling pulls in torch, which the API process doesn't need
+        from docling.document_converter import DocumentConverter
+        _converter = DocumentConverter()
+    return _converter
+
+def parse_file(file_path: str) -> Dict[str, Any]:
+    """
+    Parses one file into {"content": markdown/text, "metadata": {...}}.
+    A plain module-level function so it can be shipped to a process pool worker.
+    """
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+    if suffix in TEXT_SUFFIXES:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return {
+            "content": content,
+            "metadata": {"filename": path.name}
+        }
+    if suffix in DOCLING_SUFFIXES:
+        result = _docling_converter().convert(str(path))
+        return {
+            # Markdown keeps headings and tables, which the clause chunker relies on
+            "content": result.document.export_to_markdown(),
+            "metadata": {"filename": path.name, "page_count": len(result.document.pages)}
+        }
+    return {
+        "content": "",
+        "metadata": {"filename": path.name, "error": "Unsupported file type"}
+    }
+
+def collect_files(source: Path, extract_dir: Optional[Path] = None) -> List[Path]:
+    """
+    Supported files in a folder (recursively) or a .zip archive, in name order.
+    Archives are extracted into `extract_dir`, which the caller cleans up.
+    """
+    source = Path(source)
+    if source.suffix.lower() == ".zip":
+        if extract_dir is None:
+            raise ValueError("extract_dir is required for zip archives")
+        with zipfile.ZipFile(source) as archive:
+            archive.extractall(extract_dir)
+        source = extract_dir
+    if source.is_file():
+        return [source] if source.suffix.lower() in SUPPORTED_SUFFIXES else []
+    return sorted(
+        p for p in source.rglob("*")
+        if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES
+        # Skip macOS resource forks and other hidden files shipped inside archives
+        and not any(part.startswith((".", "__MACOSX")) for part in p.relative_to(source).parts)
+    )
+
+def parse_pool() -> ProcessPoolExecutor:
+    """
+    The process's parse pool, created on first use and kept for its lifetime, so worker
+    processes keep their Docling models loaded from one file (and job) to the next.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _pool
+
+def shutdown_parse_pool():
+    """Stops the parse pool's worker processes; called when the ingesting process exits."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """
+    Drops a broken pool so the next submit starts a fresh one. Only `pool` itself is
+    discarded: a newer pool created since is left running. Doesn't wait for the dead
+    workers, which would block the event loop.
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def parse_in_pool(
+    paths: Iterable[Path],
+    max_pending: Optional[int] = None
+) -> AsyncIterator[Tuple[Path, Dict[str, Any]]]:
+    """
+    Parses files across the shared process pool (PARSE_WORKERS processes) and yields
+    (path, parsed) in completion order, so each document can be ingested as soon as it is ready.
+    At most `max_pending` parses (default: twice PARSE_WORKERS) are submitted ahead of the
+    consumer, which keeps finished-but-unconsumed documents from piling up in memory.
+    A file that fails to parse is yielded with the exception in metadata["error"].
+    """
+    paths = iter(paths)
+    max_pending = max_pending or PARSE_WORKERS * 2
+    loop = asyncio.get_running_loop()
+    # Each future remembers the pool it was submitted to
+    pending: Dict[asyncio.Future, Tuple[Path, ProcessPoolExecutor]] = {}
+
+    def submit():
+        while len(pending) < max_pending:
+            path = next(paths, None)
+            if path is None:
+                return
+            pool = parse_pool()
+            pending[loop.run_in_executor(pool, parse_file, str(path))] = (path, pool)
+
+    submit()
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            path, pool = pending.pop(future)
+            try:
+                parsed = future.result()
+            except (BrokenProcessPool, asyncio.CancelledError) as e:
+                # A worker died (e.g. killed for memory) and took its pool's queued parses
+                # with it; later files get a fresh pool
+                _discard_pool(pool)
+                parsed = {"content": "", "metadata": {"filename": path.name, "error": str(e) or "Parser process died"}}
+            except Exception as e:
+                parsed = {"content": "", "metadata": {"filename": path.name, "error": str(e)}}
+            yield path, parsed
+        submit()
 
 class DocumentParser:
     def parse(self, file_path: Path) -> Dict[str, Any]:
         """
         Parses a file and returns a structured representation.
-        For MVP, we support Markdown files directly.
+        Markdown/text is read directly; PDF and DOCX go through Docling.
         """
-        if file_path.suffix.lower() == ".md":
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            return {
-                "content": content,
-                "metadata": {"filename": file_path.name}
-            }
-        else:
-            # TODO: Implement Docling or other PDF parsers
-            return {
-                "content": "",
-                "metadata": {"filename": file_path.name, "error": "Unsupported file type"}
-            }
+        return parse_file(str(file_path))
 
     def chunk_clauses(self, content: str) -> List[Dict[str, Any]]:
         """
-        Splits content into clauses. 
-        This is a heuristic implementation.
+        Splits content into clauses.
+        Uses the same heading patterns as ClauseChunker, so both agree on clause numbers.
         """
-        # Simple splitting by double newline for demonstration
-        # Real implementation would use regex for "1.1", "1.2" etc.
-        raw_chunks = content.split("\n\n")
-        clauses = []
-        for i, chunk in enumerate(raw_chunks):
-            if chunk.strip():
-                clauses.append({
-                    "clause_number": f"GEN-{i+1}", # Generic numbering
-                    "content": chunk.strip(),
-                    "chunk_index": i
-                })
-        return clauses
+        return [
+            {
+                "clause_number": span.clause_number,
+                "content": span.text(content),
+                "chunk_index": span.index,
+                "start": span.start,
+                "end": span.end,
+            }
+            for span in ClauseChunker().iter_spans(content)
+        ]
@@ -1,125 +1,610 @@
 from pathlib import Path
-from uuid import uuid4
+from uuid import uuid4, UUID
 import asyncio
-import json
-from typing import List
+import os
+import tempfile
+from contextlib import nullcontext, suppress
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterable
 
+from sqlalchemy import select, func, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.db.database import get_session
 from src.db.models import Tender, Document, Clause, Chunk
-from src.ingestion.parser import DocumentParser
-from src.ingestion.chunker import ClauseChunker, DocumentChunk
-from src.ingestion.embed import get_embedding
-from src.db.graph_db import graph_db
+from src.ingestion.parser import (
+    DocumentParser, DOCLING_SUFFIXES, TEXT_SUFFIXES, collect_files, parse_in_pool, shutdown_parse_pool
+)
+from src.ingestion.chunker import ClauseChunker, DocumentClause, map_text_file
+from src.ingestion.diff import ClausePlan, ReingestReport, StoredClause, content_hash, plan_clauses
+from src.ingestion.embed import get_embeddings, EMBED_BATCH_SIZE, EMBED_CONCURRENCY
+from src.ingestion.embed_cache import embedding_cache
+from src.ingestion.writer import BulkWriter
+from src.ingestion.stages import IngestionProgress, PipelineStats, StageStats, DONE, close_queue, drain_batch
+from src.db.graph_writer import GraphWriter, close_graph_driver
+from src.db.indexes import create_tender_vector_index
+from src.retrieval.cache import tender_versions
+from src.retrieval.clause_graph import clause_graph, extract_references, resolve_references
+from src.retrieval.clause_keys import clause_sort_key
+from src.retrieval.keyword_index import BM25_BACKEND, keyword_indexes
+from src.retrieval.search import keyword_rows, vector_rows
+from src.retrieval.vector_index import VECTOR_BACKEND, vector_indexes
+
+# Bounded queue size between stages; a full queue pauses the stage feeding it
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "64"))
+
+@dataclass
+class FolderReport:
+    """Outcome of a folder/zip ingestion, per file."""
+    ingested: Dict[str, PipelineStats] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
 
 class IngestionPipeline:
-    def __init__(self):
+    """
+    Streams a document through parse -> chunk -> embed -> persist -> graph stages.
+    Stages are connected by bounded asyncio queues, so chunking, embedding API calls,
+    database writes and Neo4j writes overlap instead of running one after another,
+    and a slow stage applies backpressure rather than letting work pile up in memory.
+    """
+    def __init__(
+        self,
+        batch_embeddings: bool = True,
+        embed_batch_size: int = EMBED_BATCH_SIZE,
+        embed_workers: int = EMBED_CONCURRENCY,
+        write_batch_size: int = 1000,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        graph_batch_size: int = 500,
+        reingest: bool = False,
+        tender_vector_index: bool = True,
+        keyword_index: bool = BM25_BACKEND == "memory",
+        local_vector_index: bool = VECTOR_BACKEND == "memmap"
+    ):
         self.parser = DocumentParser()
         self.chunker = ClauseChunker()
+        # When enabled, embed workers send the chunks of whatever clauses are queued
+        # (up to embed_batch_size chunks) in one request instead of one request per clause
+        self.batch_embeddings = batch_embeddings
+        self.embed_batch_size = embed_batch_size if batch_embeddings else 1
+        self.embed_workers = max(1, embed_workers)
+        self.write_batch_size = write_batch_size
+        self.queue_size = queue_size
+        # Clause nodes per UNWIND batch sent to Neo4j
+        self.graph_batch_size = graph_batch_size
+        # Diff against a stored document with the same filename instead of adding a new one
+        self.reingest = reingest
+        # Maintain the tender's partial HNSW index so scoped searches stay proportional to the tender
+        self.tender_vector_index = tender_vector_index
+        # Keep the tender's in-process BM25 index (src.retrieval.keyword_index) in sync
+        self.keyword_index = keyword_index
+        # Keep the tender's memory-mapped vector index (src.retrieval.vector_index) in sync
+        self.local_vector_index = local_vector_index
+        # Read by the job worker for its progress reports
+        self.progress = IngestionProgress()
+
+    async def ingest_file(self, file_path: Path, tender_id: uuid4) -> PipelineStats:
+        stats = PipelineStats()
+        self.progress.files_total = 1
+        self.progress.current_file = file_path.name
+        self.progress.current = stats
+        suffix = file_path.suffix.lower()
+        with map_text_file(file_path) if suffix in TEXT_SUFFIXES else nullcontext() as mapped:
+            with stats.stage("parse").timed():
+                if mapped is not None:
+                    # Chunked in place through the memory map; never held as one str
+                    parsed_data = {"content": mapped, "metadata": {"filename": file_path.name}}
+                elif suffix in DOCLING_SUFFIXES:
+                    # Docling is CPU-bound and holds the GIL; run it in the long-lived parse pool,
+                    # whose workers already have the models loaded
+                    async for _, parsed_data in parse_in_pool([file_path], max_pending=1):
+                        pass
+                else:
+                    parsed_data = await asyncio.to_thread(self.parser.parse, file_path)
+            await self.ingest_parsed(parsed_data, tender_id, stats)
+        self.progress.files_done += 1
+        return stats
+
+    async def ingest_folder(
+        self,
+        source: Path,
+        tender_id: UUID,
+        max_pending: Optional[int] = None
+    ) -> FolderReport:
+        """
+        Ingests every supported file in a folder or .zip archive.
+        PDF/DOCX files are parsed in parallel across a process pool, and each one enters the
+        staged pipeline as soon as its parse finishes; later files keep parsing meanwhile
+        (at most `max_pending` at a time, see parse_in_pool).
+        Text and markdown files need no parsing and are chunked in place through a memory map
+        while the pool works.
+        A failing file is reported and skipped; it doesn't stop the rest of the batch.
+        """
+        report = FolderReport()
+        with tempfile.TemporaryDirectory() as extract_dir:
+            paths = collect_files(Path(source), Path(extract_dir))
+            self.progress.files_total = len(paths)
+            print(f"Found {len(paths)} documents in {source}")
+
+            text_paths = [p for p in paths if p.suffix.lower() in TEXT_SUFFIXES]
+            parsed = parse_in_pool([p for p in paths if p not in text_paths], max_pending=max_pending)
+            # Submits the first parses, so the pool works while text files are ingested
+            first = asyncio.ensure_future(anext(parsed, None))
+            try:
+                for path in text_paths:
+                    await self._ingest_folder_file(report, path.name, tender_id, path=path)
+                item = await first
+                while item is not None:
+                    path, parsed_data = item
+                    await self._ingest_folder_file(report, path.name, tender_id, parsed_data=parsed_data)
+                    item = await anext(parsed, None)
+            finally:
+                if not first.done():
+                    first.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await first
+                await parsed.aclose()
+
+        print(f"Ingested {len(report.ingested)} of {len(paths)} documents from {source}")
+        return report
+
+    async def _ingest_folder_file(
+        self,
+        report: FolderReport,
+        filename: str,
+        tender_id: UUID,
+        path: Optional[Path] = None,
+        parsed_data: Optional[Dict[str, Any]] = None
+    ):
+        error = parsed_data["metadata"].get("error") if parsed_data else None
+        if error:
+            print(f"Skipping {filename}: {error}")
+            report.failed[filename] = error
+            self.progress.files_failed += 1
+            return
+        self.progress.current_file = filename
+        self.progress.current = PipelineStats()
+        try:
+            if path is not None:
+                with map_text_file(path) as mapped:
+                    content = mapped if mapped is not None else path.read_text(encoding="utf-8")
+                    parsed_data = {"content": content, "metadata": {"filename": filename}}
+                    report.ingested[filename] = await self.ingest_parsed(parsed_data, tender_id, self.progress.current)
+            else:
+                report.ingested[filename] = await self.ingest_parsed(parsed_data, tender_id, self.progress.current)
+            self.progress.files_done += 1
+        except Exception as e:
+            report.failed[filename] = str(e)
+            self.progress.files_failed += 1
+
+    async def ingest_parsed(
+        self,
+        parsed_data: Dict[str, Any],
+        tender_id: UUID,
+        stats: Optional[PipelineStats] = None
+    ) -> PipelineStats:
+        """
+        Runs the chunk/embed/persist/graph stages for an already parsed document.
+        Everything is written in one transaction; the graph and local indexes are
+        updated only for clauses that were flushed to Postgres.
+        With `reingest` enabled, a stored document with the same filename is diffed
+        against this revision and only changed clauses are rewritten and re-embedded.
+        """
+        stats = stats or PipelineStats()
+        content = parsed_data["content"]
+        metadata = parsed_data["metadata"]
+        document_hash = content_hash(content)
 
-    async def ingest_file(self, file_path: Path, tender_id: uuid4):
         session_gen = get_session()
         session: AsyncSession = await anext(session_gen)
-        
+        graph = GraphWriter(batch_size=self.graph_batch_size)
+
         try:
-            # 1. Parse Document (Get raw content)
-            parsed_data = self.parser.parse(file_path)
-            content = parsed_data["content"]
-            metadata = parsed_data["metadata"]
-            
-            # 2. Create Document Record
-            doc = Document(
-                filename=metadata["filename"],
-                tender_id=tender_id
-            )
+            existing = None
+            if self.reingest:
+                existing = await self._find_document(session, tender_id, metadata["filename"])
+            if existing is not None and existing.content_hash == document_hash:
+                count = await session.scalar(
+                    select(func.count()).select_from(Clause).where(Clause.document_id == existing.id)
+                )
+                stats.reingest = ReingestReport(
+                    unchanged=count, embeddings_reused=count, document_unchanged=True
+                )
+                print(f"Skipped {metadata['filename']}: {stats.reingest}")
+                return stats
+
+            if existing is None:
+                # IDs are generated client-side, so nothing needs to be refreshed before
+                # the clauses and chunks reference it
+                doc = Document(
+                    filename=metadata["filename"],
+                    tender_id=tender_id,
+                    content_hash=document_hash
+                )
+            else:
+                doc = existing
+                doc.content_hash = document_hash
             session.add(doc)
-            await session.commit()
-            await session.refresh(doc)
-            
-            # 3. Chunk Content (Using new Chunker)
-            # Add doc_id to metadata for convenient tracking if needed
+            await session.flush()
+
             doc_metadata = metadata.copy()
             doc_metadata["document_id"] = str(doc.id)
-            
-            chunks: List[DocumentChunk] = self.chunker.chunk_document(content, doc_metadata)
-            
-            print(f"Generated {len(chunks)} chunks for {file_path.name}")
-
-            for chunk_obj in chunks:
-                # Create Clause (One chunk = One clause for this MVP)
-                clause_number = chunk_obj.metadata.get("clause_number", f"GEN-{chunk_obj.index}")
-                
-                clause = Clause(
-                    document_id=doc.id,
-                    clause_number=clause_number,
-                    content=chunk_obj.content,
-                    title=f"Clause {clause_number}" 
-                )
-                session.add(clause)
-                await session.commit()
-                await session.refresh(clause)
-                
-                # Create Chunk & Embed
-                embedding = await get_embedding(chunk_obj.content)
-                
-                db_chunk = Chunk(
-                    clause_id=clause.id,
-                    content=chunk_obj.content,
-                    chunk_index=chunk_obj.index,
-                    embedding=embedding
-                    # metadata=json.dumps(chunk_obj.metadata) # If we add metadata column to Chunk table later
-                )
-                session.add(db_chunk)
-                
-                # 4. Neo4j Ingestion (Basic)
-                self.ingest_graph(clause)
-            
+
+            units: Iterable[DocumentClause] = self.chunker.iter_clauses(content, doc_metadata)
+            writer = BulkWriter(session, batch_size=self.write_batch_size)
+            plan = None
+            if existing is not None:
+                revision = list(units)
+                plan = await self._apply_plan(session, writer, doc.id, revision)
+                stats.reingest = ReingestReport.from_plan(plan)
+                # Only new and changed clauses go through embedding and persistence
+                changed = set(plan.inserted) | set(plan.updated)
+                units = [u for position, u in enumerate(revision) if position in changed]
+
+            clauses: List[Clause] = []
+            db_chunks: List[Chunk] = []
+
+            embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+            persist_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+            graph_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._chunk_stage(units, embed_queue, stats.stage("chunk")))
+                embed_stats = stats.stage("embed", self.embed_workers)
+                embed_tasks = [
+                    group.create_task(self._embed_worker(embed_queue, persist_queue, embed_stats))
+                    for _ in range(self.embed_workers)
+                ]
+                group.create_task(self._close_after(embed_tasks, persist_queue, 1))
+                group.create_task(self._persist_stage(
+                    persist_queue, graph_queue, writer, doc.id, tender_id,
+                    clauses, db_chunks, stats.stage("persist"),
+                    existing_ids=plan.updated if plan else {}
+                ))
+                group.create_task(self._graph_stage(graph_queue, graph, stats.stage("graph")))
+
+            await writer.flush()
+            if plan is not None and (self.keyword_index or self.local_vector_index):
+                # The local indexes are rebuilt per document, so they need the untouched rows too
+                clauses, db_chunks = await self._document_rows(session, doc.id)
+            if plan is not None:
+                await self._sync_graph_changes(graph, plan, revision, doc.id, tender_id)
+            if graph.available:
+                await self._link_references(session, graph, tender_id, doc.id, plan)
+            # Graph writes finish before the commit, as the per-clause MERGEs used to
+            await graph.flush()
+            await session.execute(
+                update(Tender).where(Tender.id == tender_id).values(version=Tender.version + 1)
+            )
             await session.commit()
-            print(f"Ingested {file_path.name} successfully.")
-            
+            stats.write = writer.stats
+            stats.graph = graph.stats
+            # Cached adjacency of this tender no longer matches the stored references
+            clause_graph.invalidate(tender_id)
+            tender_versions.bump(tender_id)
+
+            cache_stats = embedding_cache.stats
+            print(f"Ingested {metadata['filename']} successfully in {stats.seconds:.2f}s. Bulk write: {writer.stats}")
+            if graph.available:
+                print(f"Graph: {graph.stats}")
+            if stats.reingest is not None:
+                print(f"Re-ingest: {stats.reingest}")
+            print(stats.summary())
+            print(f"Embedding cache: {cache_stats.hits} hits, {cache_stats.misses} misses ({cache_stats.hit_rate:.0%})")
+
+            if self.tender_vector_index:
+                try:
+                    await create_tender_vector_index(tender_id)
+                except Exception as e:
+                    # The data is committed; a missing index only costs query latency
+                    print(f"Warning: Could not create vector index for tender {tender_id}: {e}")
+
+            if self.keyword_index:
+                await self.update_keyword_index(session, tender_id, str(doc.id), clauses)
+            if self.local_vector_index:
+                await self.update_vector_index(session, tender_id, str(doc.id), db_chunks)
+            return stats
+
         except Exception as e:
             await session.rollback()
-            print(f"Error ingesting {file_path}: {e}")
+            # A failing stage cancels the others; report the original error, not the group
+            if isinstance(e, ExceptionGroup):
+                e = e.exceptions[0]
+            print(f"Error ingesting {metadata.get('filename')}: {e}")
             raise e
         finally:
             await session.close()
+            await graph.close()
 
-    def ingest_graph(self, clause: Clause):
-        # Basic graph node creation
-        with graph_db.get_session() as session:
-            session.run(
-                """
-                MERGE (c:Clause {id: $id})
-                SET c.number = $number, c.content = $content
-                """,
-                id=str(clause.id),
-                number=clause.clause_number,
-                content=clause.content
-            )
+    async def update_keyword_index(self, session: AsyncSession, tender_id: UUID, document_key: str, clauses: List[Clause]):
+        # Re-ingesting a document replaces its previous clauses in the index; documents are
+        # keyed by id, since same-named uploads with different content coexist. Without a saved
+        # index, it is seeded from every committed clause of the tender, not just this document's
+        rows = None if keyword_indexes.exists(tender_id) else await keyword_rows(session, tender_id)
+        await asyncio.to_thread(
+            keyword_indexes.update,
+            tender_id,
+            document_key,
+            [(c.id, c.clause_number, c.content) for c in clauses],
+            rows
+        )
+
+    async def update_vector_index(self, session: AsyncSession, tender_id: UUID, document_key: str, chunks: List[Chunk]):
+        # Like the keyword index: seeded from every committed chunk when the tender has no matrix yet
+        rows = None if vector_indexes.exists(tender_id) else await vector_rows(session, tender_id)
+        await asyncio.to_thread(
+            vector_indexes.replace_document,
+            tender_id,
+            document_key,
+            [c.id for c in chunks],
+            [c.embedding for c in chunks],
+            rows
+        )
+
+    # --- Incremental re-ingestion ---
+
+    async def _find_document(self, session: AsyncSession, tender_id: UUID, filename: str) -> Optional[Document]:
+        result = await session.execute(
+            select(Document)
+            .where(Document.tender_id == tender_id, Document.filename == filename)
+            .order_by(Document.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def _apply_plan(
+        self, session: AsyncSession, writer: BulkWriter, document_id: UUID, clauses: List[DocumentClause]
+    ) -> ClausePlan:
+        """
+        Diffs the new revision against the stored clauses and applies everything that
+        needs no embedding: deletions and metadata updates for moved clauses.
+        Changed clauses lose their chunks here and are rewritten by the persist stage.
+        """
+        result = await session.execute(
+            select(Clause.id, Clause.clause_number, Clause.content_hash, func.min(Chunk.chunk_index))
+            .join(Chunk, Chunk.clause_id == Clause.id, isouter=True)
+            .where(Clause.document_id == document_id)
+            .group_by(Clause.id)
+        )
+        stored = [
+            # Rows ingested before hashes existed never match, so they are rewritten once
+            StoredClause(row[0], row[1], row[2] or "", row[3] if row[3] is not None else -1)
+            for row in result.all()
+        ]
+        plan = plan_clauses(stored, [(c.clause_number, content_hash(c.content), c.chunks[0].index) for c in clauses])
+
+        stale = [*plan.updated.values(), *plan.deleted]
+        if stale:
+            await session.execute(delete(Chunk).where(Chunk.clause_id.in_(stale)))
+        if plan.deleted:
+            await session.execute(delete(Clause).where(Clause.id.in_(plan.deleted)))
+        if plan.moved:
+            first_index = {c.id: c.chunk_index for c in stored}
+            for position, clause_id in plan.moved.items():
+                unit = clauses[position]
+                # Shift the clause's chunks to its new place in the document
+                await writer.move_clause(
+                    clause_id, unit.clause_number, clause_sort_key(unit.clause_number),
+                    chunk_offset=unit.chunks[0].index - first_index[clause_id]
+                )
+            await writer.flush()
+        return plan
+
+    async def _document_rows(self, session: AsyncSession, document_id: UUID):
+        clauses = (await session.execute(
+            select(Clause).where(Clause.document_id == document_id)
+        )).scalars().all()
+        db_chunks = (await session.execute(
+            select(Chunk).join(Clause, Chunk.clause_id == Clause.id).where(Clause.document_id == document_id)
+        )).scalars().all()
+        return list(clauses), list(db_chunks)
+
+    async def _sync_graph_changes(
+        self,
+        graph: GraphWriter,
+        plan: ClausePlan,
+        revision: List[DocumentClause],
+        document_id: UUID,
+        tender_id: UUID
+    ):
+        # Updated and inserted clauses went through the graph stage; moved clauses need
+        # their new number and deleted ones must go
+        await graph.delete_clauses(plan.deleted)
+        for position, clause_id in plan.moved.items():
+            unit = revision[position]
+            await graph.add_clause(Clause(
+                id=clause_id,
+                document_id=document_id,
+                tender_id=tender_id,
+                clause_number=unit.clause_number,
+                content=unit.content
+            ))
+
+    async def _link_references(
+        self,
+        session: AsyncSession,
+        graph: GraphWriter,
+        tender_id: UUID,
+        document_id: UUID,
+        plan: Optional[ClausePlan]
+    ):
+        """
+        Writes REFERENCES edges touching this document. References are resolved against
+        the whole tender, so "see Clause 4.2 of the Conditions of Contract" links across documents.
+        """
+        result = await session.execute(
+            select(Clause.id, Clause.clause_number, Clause.metadata_["references"], Clause.document_id)
+            .where(Clause.tender_id == tender_id)
+        )
+        rows = result.all()
+        in_document = {row[0] for row in rows if row[3] == document_id}
+        if plan is not None:
+            # Changed clauses may no longer refer to what they used to
+            await graph.delete_references(plan.updated.values())
+        for source, target in resolve_references((row[0], row[1], row[2]) for row in rows):
+            if source in in_document or target in in_document:
+                await graph.add_reference(source, target)
+
+    # --- Stages ---
+
+    async def _chunk_stage(
+        self,
+        units: Iterable[DocumentClause],
+        out: asyncio.Queue,
+        stats: StageStats
+    ):
+        units = iter(units)
+        while True:
+            with stats.timed(items=0):
+                unit = next(units, None)
+            if unit is None:
+                break
+            stats.items += len(unit.chunks)
+            # Blocks while the embed stage is behind
+            await out.put(unit)
+            # Chunking is synchronous; let the other stages run between clauses
+            await asyncio.sleep(0)
+        await close_queue(out, self.embed_workers)
+
+    async def _embed_worker(self, inbox: asyncio.Queue, out: asyncio.Queue, stats: StageStats):
+        done = False
+        while not done:
+            stats.record_depth(inbox.qsize())
+            first = await inbox.get()
+            if first is DONE:
+                break
+            # Batch whatever is already waiting instead of waiting for a full batch,
+            # so a slow chunker doesn't hold back the first embeddings
+            batch, done = drain_batch(inbox, first, self.embed_batch_size, size=lambda u: len(u.chunks))
+            texts = [c.content for unit in batch for c in unit.chunks]
+            with stats.timed(items=len(texts)):
+                embeddings = await get_embeddings(
+                    texts,
+                    max_items=self.embed_batch_size,
+                    concurrency=1
+                )
+            position = 0
+            for unit in batch:
+                await out.put((unit, embeddings[position:position + len(unit.chunks)]))
+                position += len(unit.chunks)
 
-async def run_ingestion(file_path: str, tender_name: str):
+    async def _close_after(self, tasks: List[asyncio.Task], queue: asyncio.Queue, consumers: int):
+        # The next stage is done once every worker of this one has finished
+        await asyncio.gather(*tasks)
+        await close_queue(queue, consumers)
+
+    async def _persist_stage(
+        self,
+        inbox: asyncio.Queue,
+        out: asyncio.Queue,
+        writer: BulkWriter,
+        document_id: UUID,
+        tender_id: UUID,
+        clauses: List[Clause],
+        db_chunks: List[Chunk],
+        stats: StageStats,
+        existing_ids: Optional[Dict[int, UUID]] = None
+    ):
+        # Clauses are handed to the graph stage only once the writer has flushed them,
+        # so a failed flush never leaves graph nodes for rows that don't exist
+        pending: List[Clause] = []
+        while True:
+            stats.record_depth(inbox.qsize())
+            item = await inbox.get()
+            if item is DONE:
+                break
+            unit, embeddings = item
+            with stats.timed(items=len(unit.chunks)):
+                clause = Clause(
+                    document_id=document_id,
+                    tender_id=tender_id,
+                    clause_number=unit.clause_number,
+                    clause_key=clause_sort_key(unit.clause_number),
+                    content=unit.content,
+                    content_hash=content_hash(unit.content),
+                    title=f"Clause {unit.clause_number}",
+                    # Referenced clause numbers; resolved to REFERENCES edges once the document is written
+                    metadata_={"references": extract_references(unit.clause_number, unit.content)}
+                )
+                existing_id = (existing_ids or {}).get(unit.index)
+                if existing_id is not None:
+                    # Changed clause of a re-ingested document: keep its id (and graph node)
+                    clause.id = existing_id
+                    await writer.update_clause(clause)
+                else:
+                    await writer.add_clause(clause)
+                clauses.append(clause)
+                pending.append(clause)
+
+                # Oversized clauses are embedded as several token-budgeted chunks
+                for chunk_obj, embedding in zip(unit.chunks, embeddings):
+                    db_chunk = Chunk(
+                        clause_id=clause.id,
+                        tender_id=tender_id,
+                        content=chunk_obj.content,
+                        chunk_index=chunk_obj.index,
+                        embedding=embedding,
+                        metadata_={"token_count": chunk_obj.token_count, "clause_number": unit.clause_number}
+                    )
+                    await writer.add_chunk(db_chunk)
+                    db_chunks.append(db_chunk)
+
+            if writer.pending_clauses == 0:
+                for flushed in pending:
+                    await out.put(flushed)
+                pending = []
+
+        with stats.timed(items=0):
+            await writer.flush()
+        for flushed in pending:
+            await out.put(flushed)
+        await close_queue(out, 1)
+
+    async def _graph_stage(self, inbox: asyncio.Queue, graph: GraphWriter, stats: StageStats):
+        while True:
+            stats.record_depth(inbox.qsize())
+            clause = await inbox.get()
+            if clause is DONE:
+                break
+            with stats.timed():
+                # Buffered; a full batch goes out as one UNWIND over the async driver
+                await graph.add_clause(clause)
+
+async def get_or_create_tender(tender_name: str) -> UUID:
     session_gen = get_session()
     session = await anext(session_gen)
-    
-    # Get or Create Tender
-    from sqlalchemy import select
-    res = await session.execute(select(Tender).where(Tender.name == tender_name))
-    tender = res.scalar_one_or_none()
-    
-    if not tender:
-        tender = Tender(name=tender_name)
-        session.add(tender)
-        await session.commit()
-        await session.refresh(tender)
-    
-    await session.close()
-    
-    pipeline = IngestionPipeline()
-    await pipeline.ingest_file(Path(file_path), tender.id)
+    try:
+        res = await session.execute(select(Tender).where(Tender.name == tender_name))
+        tender = res.scalar_one_or_none()
+
+        if not tender:
+            tender = Tender(name=tender_name)
+            session.add(tender)
+            await session.commit()
+            await session.refresh(tender)
+        return tender.id
+    finally:
+        await session.close()
+
+async def ingest_path(pipeline: IngestionPipeline, path: Path, tender_id: UUID) -> Optional[FolderReport]:
+    """Ingests a single file, or a folder/.zip (returning its per-file report)."""
+    if path.is_dir() or path.suffix.lower() == ".zip":
+        return await pipeline.ingest_folder(path, tender_id)
+    await pipeline.ingest_file(path, tender_id)
+    return None
+
+async def run_ingestion(file_path: str, tender_name: str, reingest: bool = False):
+    tender_id = await get_or_create_tender(tender_name)
+    pipeline = IngestionPipeline(reingest=reingest)
+    try:
+        await ingest_path(pipeline, Path(file_path), tender_id)
+    finally:
+        await close_graph_driver()
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) < 3:
-        print("Usage: python src/ingestion/pipeline.py <file_path> <tender_name>")
+    args = [a for a in sys.argv[1:] if a != "--reingest"]
+    if len(args) < 2:
+        print("Usage: python src/ingestion/pipeline.py <file_path|folder|archive.zip> <tender_name> [--reingest]")
     else:
-        asyncio.run(run_ingestion(sys.argv[1], sys.argv[2]))
+        try:
+            asyncio.run(run_ingestion(args[0], args[1], reingest="--reingest" in sys.argv))
+        finally:
+            shutdown_parse_pool()
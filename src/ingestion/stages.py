@@ -0,0 +1,152 @@
+"""
+Building blocks for the staged ingestion pipeline:
+bounded queues between stages, an end-of-stream marker and per-stage stats.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Tuple, Callable, Optional
+
+# End-of-stream marker. A stage with N workers receives N of them, one per worker.
+DONE = object()
+
+@dataclass
+class StageStats:
+    """Throughput and queue-depth figures for one pipeline stage."""
+    name: str
+    workers: int = 1
+    items: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _depth_total: int = 0
+    _depth_samples: int = 0
+
+    def record_depth(self, depth: int):
+        """Samples the depth of the stage's input queue."""
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+
+    @contextmanager
+    def timed(self, items: int = 1):
+        start = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = start
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.busy_seconds += end - start
+            self.finished_at = end
+            self.items += items
+
+    @property
+    def mean_queue_depth(self) -> float:
+        return self._depth_total / self._depth_samples if self._depth_samples else 0.0
+
+    @property
+    def items_per_sec(self) -> float:
+        if self.started_at is None or self.finished_at is None or self.finished_at <= self.started_at:
+            return 0.0
+        return self.items / (self.finished_at - self.started_at)
+
+    @property
+    def utilization(self) -> float:
+        """Share of the stage's wall time its workers were busy (1.0 = saturated)."""
+        if self.started_at is None or self.finished_at is None or self.finished_at <= self.started_at:
+            return 0.0
+        return self.busy_seconds / ((self.finished_at - self.started_at) * self.workers)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "items_per_sec": round(self.items_per_sec, 1),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": round(self.utilization, 2),
+            "max_queue_depth": self.max_queue_depth,
+            "mean_queue_depth": round(self.mean_queue_depth, 1),
+        }
+
+@dataclass
+class PipelineStats:
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+    write: Any = None
+    graph: Any = None
+    # ReingestReport when the document replaced a stored revision
+    reingest: Any = None
+
+    def stage(self, name: str, workers: int = 1) -> StageStats:
+        if name not in self.stages:
+            self.stages[name] = StageStats(name, workers)
+        return self.stages[name]
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "seconds": round(self.seconds, 1),
+            "stages": {name: s.as_dict() for name, s in self.stages.items()},
+        }
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<10} {'workers':>7} {'items':>7} {'items/s':>9} {'util':>6} {'max q':>6} {'mean q':>7}"]
+        for s in self.stages.values():
+            lines.append(
+                f"{s.name:<10} {s.workers:>7} {s.items:>7} {s.items_per_sec:>9.1f} "
+                f"{s.utilization:>6.0%} {s.max_queue_depth:>6} {s.mean_queue_depth:>7.1f}"
+            )
+        return "\n".join(lines)
+
+@dataclass
+class IngestionProgress:
+    """Where a running ingestion is: files done so far and the stages of the current one."""
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    current_file: Optional[str] = None
+    current: Optional[PipelineStats] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "files_failed": self.files_failed,
+            "current_file": self.current_file,
+            "current": self.current.as_dict() if self.current is not None else None,
+        }
+
+async def close_queue(queue: asyncio.Queue, consumers: int):
+    """Signals end-of-stream to every consumer of `queue`."""
+    for _ in range(consumers):
+        await queue.put(DONE)
+
+def drain_batch(
+    queue: asyncio.Queue,
+    first: Any,
+    max_size: int,
+    size: Callable[[Any], int] = lambda item: 1
+) -> Tuple[List[Any], bool]:
+    """
+    Starting from an already received item, takes whatever else is queued without waiting,
+    up to `max_size` (measured with `size`). Returns (batch, saw_done); a consumed DONE
+    marker belongs to the caller, which should finish after processing the batch.
+    """
+    batch = [first]
+    total = size(first)
+    while total < max_size:
+        try:
+            item = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        if item is DONE:
+            return batch, True
+        batch.append(item)
+        total += size(item)
+    return batch, False
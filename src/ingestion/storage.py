@@ -0,0 +1,74 @@
+"""
+Content-addressed upload storage.
+Uploads are streamed to disk in chunks (file I/O off the event loop) while their SHA-256
+is computed, then moved to uploads/<sha[:2]>/<sha>/<filename>. Identical bytes always land
+in the same place, and two different files with the same name never overwrite each other.
+"""
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
+
+from fastapi import UploadFile
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+@dataclass
+class StoredUpload:
+    sha256: str
+    path: Path
+    size: int
+
+def safe_filename(filename: str) -> str:
+    # Client-supplied names may carry directories ("../../x.pdf", "C:\\plans\\x.pdf")
+    name = Path((filename or "").replace("\\", "/")).name.strip()
+    return name if name not in ("", ".", "..") else "upload"
+
+def _write_chunk(f: BinaryIO, digest, chunk: bytes):
+    digest.update(chunk)
+    f.write(chunk)
+
+async def store_upload(
+    upload: UploadFile,
+    upload_dir: Path = UPLOAD_DIR,
+    chunk_bytes: int = UPLOAD_CHUNK_BYTES
+) -> StoredUpload:
+    """
+    Streams an upload into content-addressed storage and returns where it ended up.
+    An upload whose content is already stored is not written twice.
+    """
+    partial_dir = upload_dir / "partial"
+    await asyncio.to_thread(partial_dir.mkdir, parents=True, exist_ok=True)
+    # Unique per request, so concurrent uploads never share a temp file
+    partial = partial_dir / f"{uuid4()}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        f = await asyncio.to_thread(open, partial, "wb")
+        try:
+            while chunk := await upload.read(chunk_bytes):
+                # Hashing and writing a chunk both release the GIL; neither blocks the loop
+                await asyncio.to_thread(_write_chunk, f, digest, chunk)
+                size += len(chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+
+        sha256 = digest.hexdigest()
+        # The original name is kept: the parser picks a format by suffix and
+        # re-ingestion matches documents by filename
+        path = upload_dir / sha256[:2] / sha256 / safe_filename(upload.filename)
+        await asyncio.to_thread(_move_into_place, partial, path)
+        return StoredUpload(sha256=sha256, path=path, size=size)
+    finally:
+        await asyncio.to_thread(partial.unlink, missing_ok=True)
+
+def _move_into_place(partial: Path, path: Path):
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Atomic on one filesystem: a reader never sees a half-written file
+    os.replace(partial, path)
@@ -0,0 +1,42 @@
+"""
+Token counting with a cached tiktoken encoder.
+Loading an encoding reads (and on first use downloads) its BPE file, so it is done once per
+process. Where the encoding can't be loaded (offline machines without a tiktoken cache)
+counts fall back to the len // 4 estimate.
+"""
+import os
+from functools import lru_cache
+from typing import List, Tuple
+
+# cl100k_base is the encoding of the text-embedding-3 models
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding: str = TOKEN_ENCODING):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding)
+    except Exception as e:
+        print(f"Warning: Could not load tiktoken encoding {encoding}, estimating tokens: {e}")
+        return None
+
+def count_tokens(text: str, encoding: str = TOKEN_ENCODING) -> int:
+    encoder = get_encoder(encoding)
+    if encoder is None:
+        return len(text) // 4
+    # Special-token strings in tender text are plain text, not control tokens
+    return len(encoder.encode_ordinary(text))
+
+def token_windows(text: str, max_tokens: int, encoding: str = TOKEN_ENCODING) -> List[Tuple[int, int]]:
+    """
+    Hard split into (start, end) character ranges of at most max_tokens each; a last
+    resort for text without sentence boundaries (long tables, lists run together by the parser).
+    """
+    encoder = get_encoder(encoding)
+    if encoder is None:
+        width = max(1, max_tokens * 4)
+        return [(i, min(i + width, len(text))) for i in range(0, len(text), width)]
+    tokens = encoder.encode_ordinary(text)
+    _, offsets = encoder.decode_with_offsets(tokens)
+    starts = [offsets[i] for i in range(0, len(tokens), max_tokens)]
+    return [(start, end) for start, end in zip(starts, starts[1:] + [len(text)]) if end > start]
@@ -0,0 +1,171 @@
+"""
+Bulk writer for persisting clauses and chunks.
+"""
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any
+from uuid import UUID
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.models import Clause, Chunk
+
+@dataclass
+class WriteStats:
+    """Row counts and timings for a bulk write."""
+    clauses: int = 0
+    chunks: int = 0
+    statements: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.clauses + self.chunks
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.clauses} clauses, {self.chunks} chunks in {self.statements} statements, "
+            f"{self.seconds:.2f}s ({self.rows_per_sec:.0f} rows/sec)"
+        )
+
+class BulkWriter:
+    """
+    Buffers Clause/Chunk rows and writes them with multi-row INSERTs.
+    IDs are generated client-side (uuid4 defaults on the models), so chunks can reference
+    their clause without a refresh round trip.
+    The writer never commits: the caller owns the transaction, which keeps the
+    one-transaction-per-document, all-or-nothing semantics.
+    """
+    def __init__(self, session: AsyncSession, batch_size: int = 1000):
+        self.session = session
+        self.batch_size = batch_size
+        self.stats = WriteStats()
+        self._clauses: List[Dict[str, Any]] = []
+        self._chunks: List[Dict[str, Any]] = []
+        self._updates: List[Dict[str, Any]] = []
+        self._moves: List[Dict[str, Any]] = []
+        self._shifts: List[Dict[str, Any]] = []
+
+    @property
+    def pending_clauses(self) -> int:
+        """Clause rows buffered but not yet sent to the database."""
+        return len(self._clauses) + len(self._updates)
+
+    async def add_clause(self, clause: Clause):
+        self._clauses.append({
+            "id": clause.id,
+            "document_id": clause.document_id,
+            "tender_id": clause.tender_id,
+            "clause_number": clause.clause_number,
+            "clause_key": clause.clause_key,
+            "title": clause.title,
+            "content": clause.content,
+            "content_hash": clause.content_hash,
+            "page_number": clause.page_number,
+            "metadata_": clause.metadata_ or {},
+        })
+        if len(self._clauses) >= self.batch_size:
+            await self._flush_clauses()
+
+    async def update_clause(self, clause: Clause):
+        """
+        Rewrites an existing clause row in place (same id), e.g. when re-ingestion
+        finds its content changed. Sent as one executemany UPDATE per batch.
+        """
+        self._updates.append({
+            "id": clause.id,
+            "clause_number": clause.clause_number,
+            "clause_key": clause.clause_key,
+            "title": clause.title,
+            "content": clause.content,
+            "content_hash": clause.content_hash,
+            "metadata_": clause.metadata_ or {},
+        })
+        if len(self._updates) >= self.batch_size:
+            await self._flush_updates()
+
+    async def move_clause(self, clause_id: UUID, clause_number: str, clause_key: str, chunk_offset: int = 0):
+        """
+        Renumbers an unchanged clause and shifts its chunks by `chunk_offset`, e.g. when
+        re-ingestion finds it moved. Content and embeddings are left alone.
+        """
+        self._moves.append({
+            "id": clause_id,
+            "clause_number": clause_number,
+            "clause_key": clause_key,
+            "title": f"Clause {clause_number}",
+        })
+        if chunk_offset:
+            self._shifts.append({"target_clause_id": clause_id, "offset": chunk_offset})
+        if len(self._moves) >= self.batch_size:
+            await self._flush_moves()
+
+    async def add_chunk(self, chunk: Chunk):
+        self._chunks.append({
+            "id": chunk.id,
+            "clause_id": chunk.clause_id,
+            "tender_id": chunk.tender_id,
+            "content": chunk.content,
+            "chunk_index": chunk.chunk_index,
+            "embedding": chunk.embedding,
+            "metadata_": chunk.metadata_ or {},
+        })
+        if len(self._chunks) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        # Clauses first: chunks hold a foreign key to them
+        await self._flush_clauses()
+        await self._flush_updates()
+        await self._flush_moves()
+        await self._flush_chunks()
+
+    async def _flush_clauses(self):
+        if not self._clauses:
+            return
+        rows, self._clauses = self._clauses, []
+        await self._execute(insert(Clause), rows)
+        self.stats.clauses += len(rows)
+
+    async def _flush_updates(self):
+        if not self._updates:
+            return
+        rows, self._updates = self._updates, []
+        # ORM bulk UPDATE by primary key
+        await self._execute(update(Clause), rows)
+        self.stats.clauses += len(rows)
+
+    async def _flush_moves(self):
+        if not self._moves:
+            return
+        rows, self._moves = self._moves, []
+        shifts, self._shifts = self._shifts, []
+        await self._execute(update(Clause), rows)
+        self.stats.clauses += len(rows)
+        if shifts:
+            # Core executemany: one UPDATE per clause, sent in a single round trip
+            table = Chunk.__table__
+            await self._execute(
+                update(table)
+                .where(table.c.clause_id == bindparam("target_clause_id"))
+                .values(chunk_index=table.c.chunk_index + bindparam("offset")),
+                shifts
+            )
+
+    async def _flush_chunks(self):
+        if not self._chunks:
+            return
+        rows, self._chunks = self._chunks, []
+        await self._execute(insert(Chunk), rows)
+        self.stats.chunks += len(rows)
+
+    async def _execute(self, statement, rows: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        # ORM bulk INSERT: SQLAlchemy renders these as batched multi-row INSERT ... VALUES
+        await self.session.execute(statement, rows)
+        self.stats.seconds += time.perf_counter() - start
+        self.stats.statements += 1
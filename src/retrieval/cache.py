@@ -0,0 +1,138 @@
+"""
+Query-path caches for repeated questions on the same tender.
+Retrieval results and final answers are cached per (tender, tender version, normalized
+query, strategy). Ingestion bumps Tender.version with every committed document, so an
+addendum makes older entries unreachable; they are then dropped by LRU/TTL eviction.
+"""
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import select
+from src.db.database import get_session
+from src.db.models import Tender
+
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "900"))
+RETRIEVAL_CACHE_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_ENTRIES", "2000"))
+ANSWER_CACHE_ENTRIES = int(os.getenv("ANSWER_CACHE_ENTRIES", "1000"))
+# Seconds a tender version read from Postgres is trusted; bounds how long another
+# process's ingestion can go unnoticed
+TENDER_VERSION_TTL = float(os.getenv("TENDER_VERSION_TTL", "5"))
+
+class TenderVersion(NamedTuple):
+    id: UUID
+    version: int
+
+def normalize_query(query: str) -> str:
+    # "What is the retention?" and "what is the  retention" are the same question
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+def query_key(tender: TenderVersion, query: str, strategy: str) -> Tuple[UUID, int, str, str]:
+    return (tender.id, tender.version, normalize_query(query), strategy.upper())
+
+@dataclass
+class QueryCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+class QueryCache:
+    """
+    In-memory LRU with a per-entry TTL. Keys are tuples starting with the tender id.
+    """
+    def __init__(self, max_entries: int, ttl: float = QUERY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = QueryCacheStats()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            if entry is not None:
+                del self._entries[key]
+                self.stats.evictions += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, tender_id: UUID):
+        stale = [key for key in self._entries if key[0] == tender_id]
+        for key in stale:
+            del self._entries[key]
+        self.stats.evictions += len(stale)
+
+class TenderVersions:
+    """
+    Current Tender.version per tender, as sent by the API (UUID string or name).
+    """
+    def __init__(self, ttl: float = TENDER_VERSION_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, TenderVersion]] = {}
+
+    async def get(self, tender_id: Union[str, UUID]) -> Optional[TenderVersion]:
+        """
+        Returns None for unknown tenders, or when the version can't be read
+        (callers then simply don't cache).
+        """
+        key = str(tender_id)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        try:
+            tender = await self._load(key)
+        except Exception as e:
+            print(f"Warning: Could not read version of tender {key}: {e}")
+            return None
+        if tender is not None:
+            self._entries[key] = (time.monotonic(), tender)
+        return tender
+
+    def bump(self, tender_id: UUID):
+        """
+        Called by ingestion after a commit: forgets the tender's version and cached
+        results in this process. Other processes catch up within `ttl` seconds.
+        """
+        for key in [k for k, (_, tender) in self._entries.items() if tender.id == tender_id]:
+            del self._entries[key]
+        retrieval_cache.invalidate(tender_id)
+        answer_cache.invalidate(tender_id)
+
+    async def _load(self, tender_id: str) -> Optional[TenderVersion]:
+        try:
+            condition = Tender.id == UUID(tender_id)
+        except ValueError:
+            condition = Tender.name == tender_id
+        session_gen = get_session()
+        session = await anext(session_gen)
+        try:
+            result = await session.execute(select(Tender.id, Tender.version).where(condition).limit(1))
+            row = result.first()
+            return TenderVersion(row[0], row[1] or 0) if row is not None else None
+        finally:
+            await session.close()
+
+# Global instances shared by the controller, the agent tools and ingestion
+retrieval_cache = QueryCache(RETRIEVAL_CACHE_ENTRIES)
+answer_cache = QueryCache(ANSWER_CACHE_ENTRIES)
+tender_versions = TenderVersions()
@@ -0,0 +1,168 @@
+"""
+Clause cross-references ("see Clause 5.1") and a per-tender adjacency cache for
+graph-expanded retrieval.
+
+The REFERENCES graph lives in Neo4j (written at ingestion) and, as referenced clause
+numbers, in Clause.metadata["references"] in Postgres. On the query path it is held
+in memory as CSR arrays, so expanding results by one or more hops is a couple of array
+slices instead of a database round trip per hop.
+"""
+import asyncio
+import os
+import time
+from typing import List, Dict, Tuple, Iterable, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+
+from src.db.database import get_session
+from src.db.graph_db import graph_db
+from src.db.models import Clause
+from src.retrieval.clause_keys import extract_clause_references
+
+# Seconds before a cached adjacency is reloaded (ingestion in another process may have changed it)
+GRAPH_CACHE_TTL = float(os.getenv("GRAPH_CACHE_TTL", "300"))
+# "neo4j" when available, otherwise Postgres; "postgres" forces Postgres
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+
+def extract_references(clause_number: str, content: str) -> List[str]:
+    """
+    Clause numbers a clause refers to, e.g. "as set out in Clause 12.3" -> ["12.3"].
+    The clause's own number (its heading) is not a reference.
+    """
+    return [number for number in extract_clause_references(content) if number != clause_number]
+
+def resolve_references(rows: Iterable[Tuple[UUID, str, Sequence[str]]]) -> List[Tuple[UUID, UUID]]:
+    """
+    Turns (clause id, clause number, referenced numbers) rows of one tender into
+    (source id, target id) edges. A number shared by several clauses links to all of them.
+    """
+    rows = list(rows)
+    by_number: Dict[str, List[UUID]] = {}
+    for clause_id, number, _ in rows:
+        by_number.setdefault(number, []).append(clause_id)
+    edges = []
+    for clause_id, _, references in rows:
+        for number in references or ():
+            edges.extend((clause_id, target) for target in by_number.get(number, ()) if target != clause_id)
+    return edges
+
+class ClauseAdjacency:
+    """
+    Directed REFERENCES edges in CSR form: the targets of node i are
+    indices[indptr[i]:indptr[i + 1]].
+    """
+    def __init__(self, ids: List[UUID], indptr: np.ndarray, indices: np.ndarray):
+        self.ids = ids
+        self.positions = {clause_id: i for i, clause_id in enumerate(ids)}
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Tuple[UUID, UUID]]) -> "ClauseAdjacency":
+        edges = list(set(edges))
+        ids = sorted({node for edge in edges for node in edge}, key=str)
+        positions = {clause_id: i for i, clause_id in enumerate(ids)}
+        sources = np.fromiter((positions[s] for s, _ in edges), dtype=np.int32, count=len(edges))
+        targets = np.fromiter((positions[t] for _, t in edges), dtype=np.int32, count=len(edges))
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(ids)), out=indptr[1:])
+        return cls(ids, indptr, targets[order])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def neighbors(self, clause_id: UUID) -> List[UUID]:
+        i = self.positions.get(clause_id)
+        if i is None:
+            return []
+        return [self.ids[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def expand(self, clause_ids: Iterable[UUID], hops: int = 1, limit: Optional[int] = None) -> List[UUID]:
+        """
+        Clauses reachable within `hops` REFERENCES edges, nearest first, excluding the seeds.
+        """
+        seen = set()
+        frontier = []
+        for clause_id in clause_ids:
+            i = self.positions.get(clause_id)
+            if i is not None and i not in seen:
+                seen.add(i)
+                frontier.append(i)
+
+        found: List[int] = []
+        for _ in range(hops):
+            following = []
+            for i in frontier:
+                for j in self.indices[self.indptr[i]:self.indptr[i + 1]].tolist():
+                    if j not in seen:
+                        seen.add(j)
+                        following.append(j)
+                        found.append(j)
+                        if limit is not None and len(found) >= limit:
+                            return [self.ids[k] for k in found]
+            frontier = following
+        return [self.ids[k] for k in found]
+
+class AdjacencyCache:
+    """
+    Lazily loads and caches one ClauseAdjacency per tender.
+    """
+    def __init__(self, ttl: float = GRAPH_CACHE_TTL, backend: str = GRAPH_BACKEND):
+        self.ttl = ttl
+        self.backend = backend
+        self._entries: Dict[UUID, Tuple[float, ClauseAdjacency]] = {}
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+
+    def invalidate(self, tender_id: UUID):
+        self._entries.pop(tender_id, None)
+
+    async def get(self, tender_id: UUID) -> ClauseAdjacency:
+        entry = self._entries.get(tender_id)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        # One load per tender even when many queries miss at once
+        lock = self._locks.setdefault(tender_id, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(tender_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            if self.backend == "neo4j" and graph_db.is_available():
+                edges = await asyncio.to_thread(self._load_neo4j, tender_id)
+            else:
+                edges = await self._load_postgres(tender_id)
+            adjacency = ClauseAdjacency.from_edges(edges)
+            self._entries[tender_id] = (time.monotonic(), adjacency)
+            return adjacency
+
+    def _load_neo4j(self, tender_id: UUID) -> List[Tuple[UUID, UUID]]:
+        with graph_db.get_session() as session:
+            result = session.run(
+                """
+                MATCH (s:Clause {tender_id: $tender_id})-[:REFERENCES]->(t:Clause)
+                RETURN s.id AS source, t.id AS target
+                """,
+                tender_id=str(tender_id)
+            )
+            return [(UUID(record["source"]), UUID(record["target"])) for record in result]
+
+    async def _load_postgres(self, tender_id: UUID) -> List[Tuple[UUID, UUID]]:
+        session_gen = get_session()
+        session = await anext(session_gen)
+        try:
+            result = await session.execute(
+                select(Clause.id, Clause.clause_number, Clause.metadata_["references"])
+                .where(Clause.tender_id == tender_id)
+            )
+            return resolve_references(result.all())
+        finally:
+            await session.close()
+
+# Global instance shared by the agent tools and ingestion (for invalidation)
+clause_graph = AdjacencyCache()
@@ -0,0 +1,71 @@
+"""
+Clause number normalization.
+"Clause 5.1", "5.1." and "cl 5.1" all resolve to the same sortable key, and a key's
+sub-clauses share it as a prefix, so "5.1" can return 5.1.1 - 5.1.9 with one B-tree range scan.
+"""
+import re
+from typing import List, Optional
+
+# Words that introduce a clause reference in tender text and queries
+_PREFIX = r"(?:sub-?clause|clause|cl\.?|section|sect?\.|appendix|annex(?:ure)?|schedule|§)"
+
+# One clause number: 5 / 5.1 / 5.1.2 / A / A.1
+# A letter only counts on its own, so "Schedule a payment" or "clauses" never yield "A"/"S"
+_NUMBER = r"(?:\d+|[A-Z](?![A-Za-z]))(?:\.\d+)*"
+
+# The prefix is case-insensitive, the number is not. It must be separated from the prefix
+# by whitespace, unless it is numeric ("cl.5.1", "§5")
+PREFIXED_REFERENCE = re.compile(rf"(?<!\w)(?i:{_PREFIX})(?:\s+|\s*(?=\d))({_NUMBER})\b")
+BARE_REFERENCE = re.compile(rf"\b({_NUMBER})\b")
+
+# Zero padding width for numeric segments: keeps "5.10" after "5.9" in plain string order
+SEGMENT_WIDTH = 4
+
+def normalize_clause_number(raw: str) -> Optional[str]:
+    """
+    "Clause 5.1." -> "5.1", "appendix a" -> "A", "05.01" -> "5.1".
+    Returns None for identifiers that aren't clause numbers (e.g. "GEN-3").
+    """
+    if not raw:
+        return None
+    text = re.sub(rf"(?i)^\s*{_PREFIX}\s*", "", raw.strip()).strip().rstrip(".")
+    if not re.fullmatch(rf"(?i){_NUMBER}", text):
+        return None
+    segments = []
+    for segment in text.split("."):
+        segments.append(str(int(segment)) if segment.isdigit() else segment.upper())
+    return ".".join(segments)
+
+def clause_sort_key(raw: str) -> Optional[str]:
+    """
+    Sortable, prefix-searchable key: "5.1.10" -> "0005.0001.0010".
+    """
+    number = normalize_clause_number(raw)
+    if number is None:
+        return None
+    return ".".join(
+        segment.zfill(SEGMENT_WIDTH) if segment.isdigit() else segment
+        for segment in number.split(".")
+    )
+
+def key_to_number(key: str) -> str:
+    return ".".join(str(int(s)) if s.isdigit() else s for s in key.split("."))
+
+def extract_clause_references(text: str, require_prefix: bool = True) -> List[str]:
+    """
+    Finds clause references in free text, normalized and de-duplicated in order of appearance.
+    With require_prefix=False (tool input such as "5.1, 6.2"), bare dotted numbers count too.
+    """
+    matches = PREFIXED_REFERENCE.findall(text)
+    if not matches and not require_prefix:
+        # Bare single letters/numbers are too ambiguous; only take dotted numbers,
+        # unless the whole input is one clause number
+        whole = normalize_clause_number(text)
+        matches = [whole] if whole else [m for m in BARE_REFERENCE.findall(text) if "." in m]
+
+    references = []
+    for match in matches:
+        number = normalize_clause_number(match)
+        if number and number not in references:
+            references.append(number)
+    return references
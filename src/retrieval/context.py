@@ -0,0 +1,137 @@
+"""
+Token-budgeted context packing for the agent's retrieval tools.
+Hits are grouped by clause, overlapping chunks of a clause are dropped, clauses are
+ordered by their best rank and packed under a token budget, each behind a compact
+citation header such as "[Clause 5.1 | Conditions of Contract.pdf | p. 12]".
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+from src.ingestion.tokens import count_tokens, token_windows
+
+# Tokens of retrieved text handed to the model per tool call
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+
+SEPARATOR = "\n---\n"
+
+@dataclass
+class Citation:
+    clause_number: Optional[str] = None
+    filename: Optional[str] = None
+    page_number: Optional[int] = None
+
+    def header(self, referenced: bool = False) -> str:
+        parts = [f"Clause {self.clause_number}" if self.clause_number else "Clause ?"]
+        if self.filename:
+            parts.append(self.filename)
+        if self.page_number is not None:
+            parts.append(f"p. {self.page_number}")
+        if referenced:
+            # Pulled in through a "see Clause X" reference, not matched by the query
+            parts.append("referenced")
+        return "[" + " | ".join(parts) + "]"
+
+@dataclass
+class ContextStats:
+    hits: int = 0
+    clauses: int = 0
+    # Hits dropped because their text was already in the context
+    duplicates: int = 0
+    # Clauses left out because the budget was spent
+    truncated: int = 0
+    tokens: int = 0
+    # Tokens of the unpacked hits, joined as the tools used to
+    raw_tokens: int = 0
+
+    @property
+    def saved(self) -> int:
+        return max(0, self.raw_tokens - self.tokens)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits -> {self.clauses} clauses, {self.tokens} tokens "
+            f"({self.saved} saved, {self.duplicates} duplicates, {self.truncated} over budget)"
+        )
+
+@dataclass
+class PackedContext:
+    text: str
+    # Chunk/clause ids and clause numbers that made it into the text
+    ids: List[str] = field(default_factory=list)
+    clause_numbers: List[str] = field(default_factory=list)
+    stats: ContextStats = field(default_factory=ContextStats)
+
+def clause_of(item) -> UUID:
+    # Chunks belong to a clause; clause rows are their own group
+    return getattr(item, "clause_id", None) or item.id
+
+def _clause_number(item) -> Optional[str]:
+    return getattr(item, "clause_number", None) or (item.metadata_ or {}).get("clause_number")
+
+def pack_context(
+    hits: Sequence,
+    citations: Dict[UUID, Citation],
+    referenced: Sequence = (),
+    notes: Sequence[str] = (),
+    budget: int = CONTEXT_TOKEN_BUDGET
+) -> PackedContext:
+    """
+    Packs ranked hits (best first) and the clauses they reference into at most `budget`
+    tokens. A clause ranks by its best hit; referenced clauses come after every hit.
+    `notes` (e.g. "No clause found ...") are always included.
+    """
+    stats = ContextStats(hits=len(hits) + len(referenced))
+    stats.raw_tokens = count_tokens(SEPARATOR.join([*notes, *(item.content for item in [*hits, *referenced])]))
+
+    # Insertion order = best rank, since hits arrive ranked
+    matched = {clause_of(item) for item in hits}
+    groups: Dict[UUID, List] = {}
+    for item in [*hits, *referenced]:
+        groups.setdefault(clause_of(item), []).append(item)
+
+    sections = list(notes)
+    used = count_tokens(SEPARATOR.join(sections)) if sections else 0
+    packed = PackedContext(text="", stats=stats)
+    for clause_id, items in groups.items():
+        pieces = _dedupe(items, stats)
+        citation = citations.get(clause_id) or Citation(clause_number=_clause_number(items[0]))
+        header = citation.header(referenced=clause_id not in matched)
+        body = "\n".join(item.content for item in pieces)
+        section = f"{header}\n{body}"
+        tokens = count_tokens(section) + (1 if sections else 0)
+        if used + tokens > budget:
+            if stats.clauses == 0:
+                # Never return nothing: the best clause is cut to the budget instead
+                windows = token_windows(body, max(1, budget - used - count_tokens(header) - 2))
+                start, end = windows[0] if windows else (0, 0)
+                section = f"{header}\n{body[start:end]}"
+                tokens = count_tokens(section)
+            else:
+                stats.truncated += 1
+                continue
+        sections.append(section)
+        used += tokens
+        stats.clauses += 1
+        packed.ids.extend(str(item.id) for item in pieces)
+        if citation.clause_number:
+            packed.clause_numbers.append(citation.clause_number)
+
+    packed.text = SEPARATOR.join(sections)
+    stats.tokens = count_tokens(packed.text)
+    return packed
+
+def _dedupe(items: List, stats: ContextStats) -> List:
+    """
+    Keeps the pieces of one clause that add text: a full clause row makes its chunks
+    redundant, and a chunk contained in another kept piece is dropped. Chunks are put
+    back in document order.
+    """
+    pieces = []
+    for item in sorted(items, key=lambda i: len(i.content), reverse=True):
+        if any(item.content in kept.content for kept in pieces):
+            stats.duplicates += 1
+            continue
+        pieces.append(item)
+    return sorted(pieces, key=lambda i: getattr(i, "chunk_index", 0) or 0)
@@ -0,0 +1,131 @@
+"""
+Recall@k report for vector search settings against exact (sequential scan) search.
+
+Queries are sampled from the tender's own chunk embeddings, so the report needs no
+embedding API calls. The sampled chunk is its own exact nearest neighbour, so it is left
+out of both the exact and the approximate results; otherwise every query would score a
+free hit and inflate recall.
+
+Usage:
+    python -m src.retrieval.evaluation <tender_id> [--k 10] [--samples 100] \
+        [--setting hnsw] [--setting hnsw:ef_search=100] [--setting binary:oversample=8] ...
+"""
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, func
+from src.db.database import get_session
+from src.db.models import Chunk
+from src.retrieval.search import SearchEngine
+
+DEFAULT_SETTINGS = ["hnsw", "halfvec", "binary", "binary:oversample=10", "subvector"]
+
+@dataclass
+class RecallResult:
+    setting: str
+    recall: float
+    mean_ms: float
+    p95_ms: float
+
+def recall_at_k(exact: Sequence, approx: Sequence, k: int) -> float:
+    """
+    Fraction of the exact top-k that also appears in the approximate top-k.
+    """
+    truth = set(exact[:k])
+    if not truth:
+        return 1.0
+    return len(truth & set(approx[:k])) / len(truth)
+
+def parse_setting(setting: str) -> Dict[str, Any]:
+    """
+    "binary:oversample=8,ef_search=100" -> search_embeddings keyword arguments.
+    "hnsw" means the plain (unquantized) ANN index.
+    """
+    name, _, options = setting.partition(":")
+    kwargs: Dict[str, Any] = {}
+    if name != "hnsw":
+        kwargs["quantization"] = name
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        kwargs[key.strip()] = int(value)
+    return kwargs
+
+def without_source(ids: Sequence, source: Any, k: int) -> List:
+    """The top-k ids other than the query's own chunk."""
+    return [i for i in ids if i != source][:k]
+
+def _p95(timings: List[float]) -> float:
+    return timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+async def sample_query_embeddings(tender_id: str, samples: int) -> List[Tuple[UUID, List[float]]]:
+    """(chunk id, embedding) of randomly sampled chunks of the tender."""
+    session_gen = get_session()
+    session = await anext(session_gen)
+    try:
+        result = await session.execute(
+            select(Chunk.id, Chunk.embedding)
+            .where(Chunk.tender_id == UUID(str(tender_id)))
+            .order_by(func.random())
+            .limit(samples)
+        )
+        return [(chunk_id, list(embedding)) for chunk_id, embedding in result.all()]
+    finally:
+        await session.close()
+
+async def _timed_search(engine: SearchEngine, queries, k: int, tender_id: str, **kwargs):
+    ids, timings = [], []
+    for source, embedding in queries:
+        start = time.perf_counter()
+        # One extra result, since the query's own chunk is dropped
+        results = await engine.search_embeddings([embedding], k + 1, tender_id, **kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+        ids.append(without_source([chunk.id for chunk in results[0]], source, k))
+    return ids, sorted(timings)
+
+async def recall_report(
+    tender_id: str,
+    settings: List[str] = DEFAULT_SETTINGS,
+    k: int = 10,
+    samples: int = 100
+) -> List[RecallResult]:
+    engine = SearchEngine(vector_backend="pgvector")
+    queries = await sample_query_embeddings(tender_id, samples)
+    if not queries:
+        return []
+
+    exact_ids, exact_timings = await _timed_search(engine, queries, k, tender_id, exact=True)
+    report = [RecallResult(
+        "exact", 1.0,
+        sum(exact_timings) / len(exact_timings),
+        _p95(exact_timings)
+    )]
+
+    for setting in settings:
+        approx_ids, timings = await _timed_search(engine, queries, k, tender_id, **parse_setting(setting))
+        recall = sum(recall_at_k(e, a, k) for e, a in zip(exact_ids, approx_ids)) / len(exact_ids)
+        report.append(RecallResult(
+            setting, recall,
+            sum(timings) / len(timings),
+            _p95(timings)
+        ))
+    return report
+
+async def main():
+    parser = argparse.ArgumentParser(description="Recall@k of vector search settings vs exact search")
+    parser.add_argument("tender_id")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--setting", action="append", dest="settings")
+    args = parser.parse_args()
+
+    report = await recall_report(args.tender_id, args.settings or DEFAULT_SETTINGS, args.k, args.samples)
+    print(f"{'setting':<32} {'recall@' + str(args.k):>10} {'mean ms':>10} {'p95 ms':>10}")
+    for row in report:
+        print(f"{row.setting:<32} {row.recall:>10.3f} {row.mean_ms:>10.1f} {row.p95_ms:>10.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
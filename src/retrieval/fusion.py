@@ -0,0 +1,32 @@
+"""
+Rank fusion for hybrid retrieval.
+"""
+from typing import List, Callable, Dict, Any, TypeVar, Optional
+
+T = TypeVar("T")
+
+def reciprocal_rank_fusion(
+    rankings: List[List[T]],
+    k: int = 60,
+    key: Callable[[T], Any] = lambda item: item.id,
+    limit: Optional[int] = None
+) -> List[T]:
+    """
+    Fuses several ranked result lists with Reciprocal Rank Fusion:
+    score(d) = sum over lists of 1 / (k + rank(d)), rank starting at 1.
+    Only ranks are used, so lexical and vector scores never need to be calibrated
+    against each other. Ties keep the order in which items were first seen.
+    """
+    scores: Dict[Any, float] = {}
+    items: Dict[Any, T] = {}
+
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank)
+            items.setdefault(item_key, item)
+
+    ordered = sorted(scores, key=lambda item_key: scores[item_key], reverse=True)
+    if limit is not None:
+        ordered = ordered[:limit]
+    return [items[item_key] for item_key in ordered]
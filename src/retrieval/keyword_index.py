@@ -0,0 +1,325 @@
+"""
+In-process BM25 keyword index, one per tender.
+Postings are typed arrays (doc ids + term frequencies) so the index stays compact and
+scoring can run vectorized over them with NumPy. Clauses are grouped by a document key
+(the Document id) so a re-ingested document can be swapped out incrementally.
+"""
+import json
+import math
+import os
+import re
+from array import array
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, Iterable, Any
+from uuid import UUID
+
+import numpy as np
+
+from src.retrieval.locks import file_lock
+
+# "postgres" uses the content_tsv GIN index, "memory" uses this module
+BM25_BACKEND = os.getenv("BM25_BACKEND", "postgres")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".indexes")
+
+# Keeps clause references like "5.1.2" as a single token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or shall that the "
+    "this to was were will with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+class KeywordIndex:
+    """
+    BM25 over clause texts.
+    Removal marks documents dead; postings are rewritten by compact() once enough
+    of the index is dead, so re-ingestion doesn't pay for a full rebuild.
+    """
+    # 2: document keys are Document ids rather than filenames
+    FORMAT_VERSION = 2
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_lengths = array("I")
+        self.alive = bytearray()
+        # Stored fields, parallel to doc_lengths
+        self.clause_ids: List[str] = []
+        self.document_keys: List[str] = []
+        self.clause_numbers: List[str] = []
+        self.contents: List[str] = []
+        self.live_count = 0
+        self.live_length = 0
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def add(self, clause_id: Any, document_key: str, clause_number: str, content: str):
+        doc = len(self.doc_lengths)
+        tokens = tokenize(content)
+
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for term, tf in frequencies.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("I"), array("I"))
+            entry[0].append(doc)
+            entry[1].append(tf)
+
+        self.doc_lengths.append(len(tokens))
+        self.alive.append(1)
+        self.clause_ids.append(str(clause_id))
+        self.document_keys.append(document_key)
+        self.clause_numbers.append(clause_number)
+        self.contents.append(content)
+        self.live_count += 1
+        self.live_length += len(tokens)
+
+    def remove_document(self, document_key: str) -> int:
+        removed = 0
+        for doc, key in enumerate(self.document_keys):
+            if key == document_key and self.alive[doc]:
+                self.alive[doc] = 0
+                self.live_count -= 1
+                self.live_length -= self.doc_lengths[doc]
+                removed += 1
+        if removed and self.live_count < len(self.alive) * 0.75:
+            self.compact()
+        return removed
+
+    def replace_document(self, document_key: str, clauses: Iterable[Tuple[Any, str, str]]):
+        """
+        Swaps in a new revision of a document: (clause_id, clause_number, content) tuples.
+        """
+        self.remove_document(document_key)
+        for clause_id, clause_number, content in clauses:
+            self.add(clause_id, document_key, clause_number, content)
+
+    def compact(self):
+        """
+        Drops dead documents and renumbers the survivors.
+        """
+        remap = np.full(len(self.alive), -1, dtype=np.int64)
+        keep = np.frombuffer(bytes(self.alive), dtype=np.uint8).astype(bool)
+        remap[keep] = np.arange(int(keep.sum()))
+
+        postings: Dict[str, Tuple[array, array]] = {}
+        for term, (docs, tfs) in self.postings.items():
+            doc_arr = np.frombuffer(docs, dtype=np.uint32)
+            mask = keep[doc_arr]
+            if not mask.any():
+                continue
+            postings[term] = (
+                array("I", remap[doc_arr[mask]].astype(np.uint32).tobytes()),
+                array("I", np.frombuffer(tfs, dtype=np.uint32)[mask].tobytes())
+            )
+        self.postings = postings
+
+        survivors = [doc for doc in range(len(self.alive)) if self.alive[doc]]
+        self.doc_lengths = array("I", (self.doc_lengths[d] for d in survivors))
+        self.clause_ids = [self.clause_ids[d] for d in survivors]
+        self.document_keys = [self.document_keys[d] for d in survivors]
+        self.clause_numbers = [self.clause_numbers[d] for d in survivors]
+        self.contents = [self.contents[d] for d in survivors]
+        self.alive = bytearray(b"\x01" * len(survivors))
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """
+        Returns (internal doc id, BM25 score) pairs, best first.
+        Use document(doc) to read the stored fields.
+        """
+        n = len(self.doc_lengths)
+        if not n or not self.live_count:
+            return []
+
+        avg_length = self.live_length / self.live_count or 1.0
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32).astype(np.float32)
+        norms = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        scores = np.zeros(n, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            docs = np.frombuffer(entry[0], dtype=np.uint32)
+            tfs = np.frombuffer(entry[1], dtype=np.uint32).astype(np.float32)
+            # Document frequency counts dead postings until the next compaction; close enough for idf
+            df = len(docs)
+            idf = math.log(1 + (self.live_count - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norms[docs])
+
+        scores[np.frombuffer(bytes(self.alive), dtype=np.uint8) == 0] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc), float(scores[doc])) for doc in ordered]
+
+    def document(self, doc: int) -> Dict[str, str]:
+        return {
+            "clause_id": self.clause_ids[doc],
+            "document_key": self.document_keys[doc],
+            "clause_number": self.clause_numbers[doc],
+            "content": self.contents[doc],
+        }
+
+    # --- Persistence ---
+
+    def save(self, path: Path):
+        """
+        Writes the index as one uncompressed .npz: postings packed CSR-style
+        (offsets + concatenated arrays) so loading is a handful of bulk reads.
+        """
+        if any(not alive for alive in self.alive):
+            self.compact()
+
+        terms = list(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(self.postings[term][0])
+        docs = np.empty(offsets[-1], dtype=np.uint32)
+        tfs = np.empty(offsets[-1], dtype=np.uint32)
+        for i, term in enumerate(terms):
+            start, end = offsets[i], offsets[i + 1]
+            docs[start:end] = np.frombuffer(self.postings[term][0], dtype=np.uint32)
+            tfs[start:end] = np.frombuffer(self.postings[term][1], dtype=np.uint32)
+
+        stored = json.dumps({
+            "version": self.FORMAT_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "terms": terms,
+            "clause_ids": self.clause_ids,
+            "document_keys": self.document_keys,
+            "clause_numbers": self.clause_numbers,
+            "contents": self.contents,
+        }).encode("utf-8")
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                offsets=offsets,
+                docs=docs,
+                tfs=tfs,
+                doc_lengths=np.frombuffer(self.doc_lengths, dtype=np.uint32),
+                stored=np.frombuffer(stored, dtype=np.uint8)
+            )
+        # Atomic swap, so readers never see a half-written index
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "KeywordIndex":
+        with np.load(path) as data:
+            stored = json.loads(data["stored"].tobytes().decode("utf-8"))
+            if stored["version"] != cls.FORMAT_VERSION:
+                raise ValueError(f"Unsupported keyword index version {stored['version']} in {path}")
+            index = cls(k1=stored["k1"], b=stored["b"])
+            offsets = data["offsets"]
+            docs = data["docs"]
+            tfs = data["tfs"]
+            for i, term in enumerate(stored["terms"]):
+                start, end = offsets[i], offsets[i + 1]
+                index.postings[term] = (
+                    array("I", docs[start:end].tobytes()),
+                    array("I", tfs[start:end].tobytes())
+                )
+            index.doc_lengths = array("I", data["doc_lengths"].tobytes())
+
+        index.clause_ids = stored["clause_ids"]
+        index.document_keys = stored["document_keys"]
+        index.clause_numbers = stored["clause_numbers"]
+        index.contents = stored["contents"]
+        index.alive = bytearray(b"\x01" * len(index.doc_lengths))
+        index.live_count = len(index.doc_lengths)
+        index.live_length = sum(index.doc_lengths)
+        return index
+
+class KeywordIndexRegistry:
+    """
+    Lazily loads and caches one KeywordIndex per tender from `root`.
+    An index saved by another process (e.g. an ingestion worker) is reloaded on next access;
+    updates hold the tender's file lock so concurrent writers don't lose each other's documents.
+    """
+    def __init__(self, root: str = LOCAL_INDEX_DIR):
+        self.root = Path(root)
+        self._indexes: Dict[str, KeywordIndex] = {}
+        self._mtimes: Dict[str, float] = {}
+
+    def path_for(self, tender_id: UUID) -> Path:
+        # Versioned name: an index in an older format is rebuilt from Postgres, not misread
+        return self.root / str(tender_id) / f"keywords.v{KeywordIndex.FORMAT_VERSION}.npz"
+
+    def exists(self, tender_id: UUID) -> bool:
+        # Only a saved index counts: an unsaved one may be missing the tender's older clauses
+        return self.path_for(tender_id).exists()
+
+    def get(self, tender_id: UUID) -> KeywordIndex:
+        key = str(tender_id)
+        path = self.path_for(tender_id)
+        mtime = path.stat().st_mtime if path.exists() else None
+        index = self._indexes.get(key)
+        if index is None or (mtime is not None and mtime != self._mtimes.get(key)):
+            index = KeywordIndex.load(path) if mtime is not None else KeywordIndex()
+            self._indexes[key] = index
+            self._mtimes[key] = mtime
+        return index
+
+    def save(self, tender_id: UUID):
+        key = str(tender_id)
+        index = self._indexes.get(key)
+        if index is not None:
+            path = self.path_for(tender_id)
+            index.save(path)
+            self._mtimes[key] = path.stat().st_mtime
+
+    def _build(self, tender_id: UUID, rows: Iterable[Tuple[Any, str, str, str]]) -> KeywordIndex:
+        index = KeywordIndex()
+        for clause_id, document_key, clause_number, content in rows:
+            index.add(clause_id, document_key, clause_number, content)
+        self._indexes[str(tender_id)] = index
+        return index
+
+    def ensure(self, tender_id: UUID, rows: Iterable[Tuple[Any, str, str, str]]) -> KeywordIndex:
+        """
+        Returns the tender's index, building and saving it from `rows`
+        ((clause_id, document_key, clause_number, content) of every clause) if none is saved yet.
+        """
+        with file_lock(self.path_for(tender_id).with_suffix(".lock")):
+            if not self.exists(tender_id):
+                self._build(tender_id, rows)
+                self.save(tender_id)
+            return self.get(tender_id)
+
+    def update(
+        self,
+        tender_id: UUID,
+        document_key: str,
+        clauses: Iterable[Tuple[Any, str, str]],
+        rows: Optional[Iterable[Tuple[Any, str, str, str]]] = None
+    ):
+        """
+        Replaces one document's clauses and saves, as a single locked load-modify-save.
+        `rows` (every clause of the tender) seed the index when none is saved yet, so the
+        first update doesn't leave out clauses ingested before the index existed.
+        """
+        with file_lock(self.path_for(tender_id).with_suffix(".lock")):
+            if rows is not None and not self.exists(tender_id):
+                self._build(tender_id, rows)
+            # Reloads the file if another process saved since our last access
+            self.get(tender_id).replace_document(document_key, clauses)
+            self.save(tender_id)
+
+# Global instance shared by ingestion and search
+keyword_indexes = KeywordIndexRegistry()
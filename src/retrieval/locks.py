@@ -0,0 +1,21 @@
+"""
+Cross-process file locks for the local index files.
+The API and ingestion workers load, modify and save the same per-tender index files;
+an exclusive flock around each load-modify-save keeps one writer from dropping
+another's update.
+"""
+import fcntl
+from contextlib import contextmanager
+from pathlib import Path
+
+@contextmanager
+def file_lock(path: Path):
+    """Holds an exclusive lock on `path` (created if missing). Blocks until it is free."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
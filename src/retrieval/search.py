@@ -1,40 +1,541 @@
-from typing import List, Optional
+import asyncio
+import os
+import numpy as np
+from typing import List, Optional, Union, Dict
 from uuid import UUID
-from sqlalchemy import select, text
+from sqlalchemy import select, text, func, or_
 from src.db.database import get_session
-from src.db.models import Chunk, Clause
-from src.ingestion.embed import get_embedding
+from src.db.models import Chunk, Clause, Tender, Document
+from src.db.indexes import QUANTIZATIONS
+from src.ingestion.embed import get_embedding, get_embeddings
+from src.retrieval.clause_graph import clause_graph
+from src.retrieval.clause_keys import clause_sort_key
+from src.retrieval.context import Citation
+from src.retrieval.fusion import reciprocal_rank_fusion
+from src.retrieval.keyword_index import BM25_BACKEND, KeywordIndex, keyword_indexes
+from src.retrieval.vector_index import VECTOR_BACKEND, vector_indexes
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+# pgvector's upper bound for hnsw.ef_search
+HNSW_MAX_EF_SEARCH = 1000
+
+# REFERENCES hops followed when expanding results with referenced clauses (0 disables)
+GRAPH_HOPS = int(os.getenv("GRAPH_HOPS", "1"))
+
+async def keyword_rows(session, tender_uuid: UUID) -> List[tuple]:
+    """(clause id, document id, clause number, content) of every clause of a tender, for the keyword index."""
+    result = await session.execute(
+        select(Clause.id, Clause.document_id, Clause.clause_number, Clause.content)
+        .where(Clause.tender_id == tender_uuid)
+    )
+    return [(clause_id, str(document_id), number, content) for clause_id, document_id, number, content in result.all()]
+
+async def vector_rows(session, tender_uuid: UUID) -> List[tuple]:
+    """(document id, chunk id, embedding) of every chunk of a tender, for the memory-mapped vector index."""
+    result = await session.execute(
+        select(Clause.document_id, Chunk.id, Chunk.embedding)
+        .join(Clause, Chunk.clause_id == Clause.id)
+        .where(Chunk.tender_id == tender_uuid)
+    )
+    return [(str(document_id), chunk_id, embedding) for document_id, chunk_id, embedding in result.all()]
+
+def _clause_key(item) -> UUID:
+    # Chunks and clauses from different backends fuse on the clause they belong to
+    return getattr(item, "clause_id", None) or item.id
 
 class SearchEngine:
-    async def search_vector(self, query: str, limit: int = 5) -> List[Chunk]:
+    def __init__(
+        self,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        bm25_backend: str = BM25_BACKEND,
+        vector_backend: str = VECTOR_BACKEND,
+        quantization: Optional[str] = os.getenv("VECTOR_QUANTIZATION") or None,
+        oversample: int = int(os.getenv("VECTOR_OVERSAMPLE", "4"))
+    ):
+        # Default ANN recall/latency knobs; None keeps the server setting.
+        # Both can be overridden per query on search_vector.
+        self.ef_search = ef_search or _env_int("HNSW_EF_SEARCH")
+        self.probes = probes or _env_int("IVFFLAT_PROBES")
+        # "postgres" (tsvector/GIN) or "memory" (per-tender KeywordIndex)
+        self.bm25_backend = bm25_backend
+        # "pgvector" or "memmap" (per-tender MemmapVectorIndex, no pgvector needed)
+        self.vector_backend = vector_backend
+        # First-stage compact index ("halfvec", "binary", "subvector", see src.db.indexes)
+        # and how many candidates per result it fetches before exact rescoring
+        self.quantization = quantization
+        self.oversample = oversample
+        # Tender names/ids seen by the API -> Tender.id
+        self._tender_ids: Dict[str, UUID] = {}
+
+    async def _resolve_tender_id(self, session, tender_id: Union[str, UUID, None]) -> Optional[UUID]:
+        """
+        Accepts a Tender UUID (or its string form) or a tender name, as sent by the API.
+        Returns None if the tender does not exist.
+        """
+        if tender_id is None or isinstance(tender_id, UUID):
+            return tender_id
+        if tender_id in self._tender_ids:
+            return self._tender_ids[tender_id]
+
+        try:
+            resolved = UUID(tender_id)
+        except ValueError:
+            result = await session.execute(select(Tender.id).where(Tender.name == tender_id))
+            resolved = result.scalars().first()
+        if resolved is not None:
+            self._tender_ids[tender_id] = resolved
+        return resolved
+
+    async def _apply_ann_settings(self, session, limit: int, ef_search: Optional[int], probes: Optional[int]):
+        """
+        Sets the pgvector query-time parameters for the current transaction only.
+        """
+        ef_search = ef_search or self.ef_search
+        probes = probes or self.probes
+        # HNSW never returns more than ef_search rows (server default 40), so keep it >= limit,
+        # within pgvector's maximum (a larger value makes the SET fail)
+        if ef_search or limit > 40:
+            ef_search = min(max(int(ef_search or 0), limit), HNSW_MAX_EF_SEARCH)
+            await session.execute(text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+        if probes:
+            await session.execute(text(f"SET LOCAL ivfflat.probes = {int(probes)}"))
+
+    async def search_vector(
+        self,
+        query: str,
+        limit: int = 5,
+        tender_id: Union[str, UUID, None] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        quantization: Optional[str] = None,
+        oversample: Optional[int] = None
+    ) -> List[Chunk]:
+        """
+        Semantic search over chunk embeddings, scoped to `tender_id` when given.
+        `ef_search` (HNSW) and `probes` (IVFFlat) trade recall for latency on this query.
+        `quantization` picks a compact first-stage index whose `oversample` x `limit`
+        candidates are rescored against the full-precision embeddings.
+        """
         embedding = await get_embedding(query)
+        results = await self.search_embeddings(
+            [embedding], limit, tender_id, ef_search, probes, quantization, oversample
+        )
+        return results[0]
+
+    async def search_vector_batch(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        tender_id: Union[str, UUID, None] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        quantization: Optional[str] = None,
+        oversample: Optional[int] = None
+    ) -> List[List[Chunk]]:
+        """
+        Semantic search for many queries: one batched embedding request, one session.
+        Results are aligned with `queries`.
+        """
+        embeddings = await get_embeddings(queries)
+        return await self.search_embeddings(
+            embeddings, limit, tender_id, ef_search, probes, quantization, oversample
+        )
+
+    async def search_embeddings(
+        self,
+        embeddings: List[List[float]],
+        limit: int = 5,
+        tender_id: Union[str, UUID, None] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        quantization: Optional[str] = None,
+        oversample: Optional[int] = None,
+        exact: bool = False
+    ) -> List[List[Chunk]]:
+        """
+        Searches precomputed query embeddings. `exact=True` disables the ANN indexes
+        (sequential scan), which is the ground truth for recall measurements.
+        """
+        if not embeddings:
+            return []
+        quantization = None if exact else (quantization or self.quantization)
+        oversample = oversample or self.oversample
         session_gen = get_session()
         session = await anext(session_gen)
         
         try:
-            # Using pgvector's l2_distance or cosine_distance
-            # NOTE: pgvector uses <-> for L2 distance, <=> for cosine distance
-            stmt = select(Chunk).order_by(Chunk.embedding.cosine_distance(embedding)).limit(limit)
-            result = await session.execute(stmt)
-            chunks = result.scalars().all()
-            return chunks
+            tender_uuid = await self._resolve_tender_id(session, tender_id)
+            if tender_id is not None and tender_uuid is None:
+                # Unknown tender: never fall back to searching every tender
+                return [[] for _ in embeddings]
+
+            if self.vector_backend == "memmap" and tender_uuid is not None:
+                return await self._search_memmap(session, embeddings, limit, tender_uuid)
+
+            if exact:
+                await session.execute(text("SET LOCAL enable_indexscan = off"))
+            else:
+                # The first stage fetches limit * oversample rows, so size ef_search for that
+                candidates = limit * oversample if quantization else limit
+                await self._apply_ann_settings(session, candidates, ef_search, probes)
+            if tender_uuid is not None:
+                # Plan with the actual tender_id value so Postgres can pick the
+                # tender's partial HNSW index (see src.db.indexes.create_tender_vector_index)
+                await session.execute(text("SET LOCAL plan_cache_mode = force_custom_plan"))
+
+            results = []
+            for embedding in embeddings:
+                if quantization:
+                    results.append(await self._search_quantized(
+                        session, embedding, limit, tender_uuid, quantization, oversample
+                    ))
+                    continue
+                # Using pgvector's l2_distance or cosine_distance
+                # NOTE: pgvector uses <-> for L2 distance, <=> for cosine distance
+                stmt = select(Chunk)
+                if tender_uuid is not None:
+                    stmt = stmt.where(Chunk.tender_id == tender_uuid)
+                stmt = stmt.order_by(Chunk.embedding.cosine_distance(embedding)).limit(limit)
+                result = await session.execute(stmt)
+                results.append(result.scalars().all())
+            return results
         finally:
             await session.close()
+
+    async def _search_quantized(
+        self,
+        session,
+        embedding: List[float],
+        limit: int,
+        tender_uuid: Optional[UUID],
+        quantization: str,
+        oversample: int
+    ) -> List[Chunk]:
+        """
+        Two-stage search: oversample candidates from the compact quantized index,
+        then rescore them exactly with the full-precision embedding column.
+        """
+        q = QUANTIZATIONS[quantization]
+        tender_filter = "WHERE tender_id = :tender_id" if tender_uuid is not None else ""
+        stmt = text(
+            f"""
+            SELECT candidates.* FROM (
+                SELECT * FROM chunk {tender_filter}
+                ORDER BY {q.expression} {q.operator} {q.query}
+                LIMIT :candidates
+            ) AS candidates
+            ORDER BY candidates.embedding <=> CAST(:query AS vector)
+            LIMIT :limit
+            """
+        )
+        params = {
+            "query": "[" + ",".join(map(str, embedding)) + "]",
+            "candidates": limit * oversample,
+            "limit": limit,
+        }
+        if tender_uuid is not None:
+            params["tender_id"] = tender_uuid
+        result = await session.execute(select(Chunk).from_statement(stmt), params)
+        return result.scalars().all()
+
+    async def _search_memmap(
+        self,
+        session,
+        embeddings: List[List[float]],
+        limit: int,
+        tender_uuid: UUID
+    ) -> List[List[Chunk]]:
+        """
+        Exact search against the tender's memory-mapped matrix (src.retrieval.vector_index),
+        then one plain primary-key lookup to load the hits for every query. A tender without
+        a matrix gets one built from its stored chunk embeddings first.
+        """
+        if vector_indexes.exists(tender_uuid):
+            index = vector_indexes.get(tender_uuid)
+        else:
+            # Tender ingested before the memmap backend was enabled
+            rows = await vector_rows(session, tender_uuid)
+            index = await asyncio.to_thread(vector_indexes.ensure, tender_uuid, rows)
+        # The block matmul over the matrix is CPU-bound; keep it off the event loop
+        hits = await asyncio.to_thread(index.search, np.asarray(embeddings, dtype=np.float32), limit)
+        chunk_ids = {chunk_id for query_hits in hits for chunk_id, _ in query_hits}
+        if not chunk_ids:
+            return [[] for _ in embeddings]
+
+        result = await session.execute(select(Chunk).where(Chunk.id.in_(chunk_ids)))
+        chunks = {chunk.id: chunk for chunk in result.scalars().all()}
+        return [
+            [chunks[chunk_id] for chunk_id, _ in query_hits if chunk_id in chunks]
+            for query_hits in hits
+        ]
             
-    async def search_clause(self, clause_number: str, tender_id: Optional[UUID] = None) -> List[Clause]:
+    async def search_clause(
+        self,
+        clause_number: str,
+        tender_id: Union[str, UUID, None] = None,
+        include_children: bool = False
+    ) -> List[Clause]:
+        """
+        Looks up a clause by number ("5.1", "Clause 5.1.", ...) via its normalized key.
+        With include_children, sub-clauses (5.1.1, 5.1.2, ...) are returned too.
+        """
+        results = await self.search_clauses_batch([clause_number], tender_id, include_children)
+        return results.get(clause_number, [])
+
+    async def search_clauses_batch(
+        self,
+        clause_numbers: List[str],
+        tender_id: Union[str, UUID, None] = None,
+        include_children: bool = True
+    ) -> Dict[str, List[Clause]]:
+        """
+        Resolves many clause references in one round trip.
+        Returns {reference: [matching clauses in clause order]} for every input reference.
+        """
+        results: Dict[str, List[Clause]] = {number: [] for number in clause_numbers}
+        if not clause_numbers:
+            return results
+
         session_gen = get_session()
         session = await anext(session_gen)
         
         try:
-            stmt = select(Clause).where(Clause.clause_number == clause_number)
-            # Todo: join with Document -> Tender to filter by tender_id if provided
+            tender_uuid = await self._resolve_tender_id(session, tender_id)
+            if tender_id is not None and tender_uuid is None:
+                return results
+
+            keys = {number: clause_sort_key(number) for number in clause_numbers}
+            conditions = []
+            for number, key in keys.items():
+                if key is None:
+                    # Not a clause number we can normalize (e.g. "GEN-3"): exact match only
+                    conditions.append(Clause.clause_number == number)
+                    continue
+                conditions.append(Clause.clause_key == key)
+                if include_children:
+                    conditions.append(Clause.clause_key.like(f"{key}.%"))
+
+            stmt = select(Clause).where(or_(*conditions))
+            if tender_uuid is not None:
+                stmt = stmt.where(Clause.tender_id == tender_uuid)
+            stmt = stmt.order_by(Clause.clause_key, Clause.clause_number)
             result = await session.execute(stmt)
             clauses = result.scalars().all()
-            return clauses
+
+            for number, key in keys.items():
+                for clause in clauses:
+                    if key is None:
+                        matched = clause.clause_number == number
+                    else:
+                        matched = clause.clause_key == key or (
+                            include_children and (clause.clause_key or "").startswith(key + ".")
+                        )
+                    if matched:
+                        results[number].append(clause)
+            return results
         finally:
             await session.close()
 
-    async def hybrid_search(self, query: str) -> List[Chunk]:
-        # For MVP, we'll just run vector search. 
-        # Full hybrid requires full-text search setup on Postgres side which takes more DDL.
-        return await self.search_vector(query)
+    async def get_clauses(self, clause_ids: List[UUID]) -> List[Clause]:
+        """
+        Fetches clauses by id in one round trip, in the order given.
+        """
+        if not clause_ids:
+            return []
+        session_gen = get_session()
+        session = await anext(session_gen)
+        try:
+            result = await session.execute(select(Clause).where(Clause.id.in_(clause_ids)))
+            by_id = {c.id: c for c in result.scalars().all()}
+            return [by_id[i] for i in clause_ids if i in by_id]
+        finally:
+            await session.close()
+
+    async def get_citations(self, clause_ids: List[UUID]) -> Dict[UUID, Citation]:
+        """
+        Clause number, document filename and page per clause id, in one round trip.
+        Chunks only carry their clause id, so this is what their citation headers come from.
+        """
+        if not clause_ids:
+            return {}
+        session_gen = get_session()
+        session = await anext(session_gen)
+        try:
+            result = await session.execute(
+                select(Clause.id, Clause.clause_number, Clause.page_number, Document.filename)
+                .join(Document, Clause.document_id == Document.id)
+                .where(Clause.id.in_(list(dict.fromkeys(clause_ids))))
+            )
+            return {
+                row.id: Citation(clause_number=row.clause_number, filename=row.filename, page_number=row.page_number)
+                for row in result.all()
+            }
+        finally:
+            await session.close()
+
+    async def expand_references(
+        self,
+        items: List[Union[Chunk, Clause]],
+        tender_id: Union[str, UUID, None],
+        hops: int = GRAPH_HOPS,
+        limit: int = 5
+    ) -> List[Clause]:
+        """
+        Clauses referenced by the given results ("see Clause 12.3"), following up to `hops`
+        REFERENCES edges through the tender's cached adjacency. Only the final clause fetch
+        touches the database, however many hops are followed.
+        """
+        results = await self.expand_references_batch([items], tender_id, hops, limit)
+        return results[0]
+
+    async def expand_references_batch(
+        self,
+        item_lists: List[List[Union[Chunk, Clause]]],
+        tender_id: Union[str, UUID, None],
+        hops: int = GRAPH_HOPS,
+        limit: int = 5
+    ) -> List[List[Clause]]:
+        """
+        expand_references for many result lists. Clauses referenced from several lists
+        are fetched once, in a single round trip for the whole batch.
+        """
+        if tender_id is None or hops <= 0 or not any(item_lists):
+            return [[] for _ in item_lists]
+        session_gen = get_session()
+        session = await anext(session_gen)
+        try:
+            tender_uuid = await self._resolve_tender_id(session, tender_id)
+        finally:
+            await session.close()
+        if tender_uuid is None:
+            return [[] for _ in item_lists]
+
+        adjacency = await clause_graph.get(tender_uuid)
+        referenced = [
+            adjacency.expand(list(dict.fromkeys(_clause_key(item) for item in items)), hops=hops, limit=limit)
+            for items in item_lists
+        ]
+        unique = list(dict.fromkeys(clause_id for ids in referenced for clause_id in ids))
+        clauses = {clause.id: clause for clause in await self.get_clauses(unique)}
+        return [[clauses[i] for i in ids if i in clauses] for ids in referenced]
+
+    async def _keyword_index(self, session, tender_uuid: UUID) -> KeywordIndex:
+        """
+        Returns the tender's in-memory keyword index, building it from Clause rows
+        the first time if nothing has been saved to disk yet.
+        """
+        if keyword_indexes.exists(tender_uuid):
+            return keyword_indexes.get(tender_uuid)
+        rows = await keyword_rows(session, tender_uuid)
+        # Loading and saving can block on another process's lock; keep it off the event loop
+        return await asyncio.to_thread(keyword_indexes.ensure, tender_uuid, rows)
+
+    async def _bm25_search_memory(self, session, query: str, limit: int, tender_uuid: UUID) -> List[Clause]:
+        index = await self._keyword_index(session, tender_uuid)
+        clauses = []
+        for doc, score in index.search(query, limit):
+            stored = index.document(doc)
+            # Transient rows built from the index's stored fields, no DB round trip
+            clause = Clause(
+                id=UUID(stored["clause_id"]),
+                tender_id=tender_uuid,
+                clause_number=stored["clause_number"],
+                document_id=UUID(stored["document_key"]),
+                content=stored["content"],
+                metadata_={"bm25_score": score}
+            )
+            clauses.append(clause)
+        return clauses
+
+    async def bm25_search(self, query: str, limit: int = 5, tender_id: Union[str, UUID, None] = None) -> List[Union[Chunk, Clause]]:
+        """
+        Keyword search, no embedding needed, so this path makes no network calls.
+        The "postgres" backend ranks chunk.content_tsv matches with ts_rank_cd and returns Chunks;
+        the "memory" backend scores the tender's in-process BM25 index and returns Clauses.
+        """
+        return (await self.bm25_search_batch([query], limit=limit, tender_id=tender_id))[0]
+
+    async def bm25_search_batch(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        tender_id: Union[str, UUID, None] = None
+    ) -> List[List[Union[Chunk, Clause]]]:
+        """
+        Keyword search for several queries on one session, one query after another,
+        so a large batch holds a single pooled connection. Results are aligned with `queries`.
+        """
+        session_gen = get_session()
+        session = await anext(session_gen)
+
+        try:
+            tender_uuid = await self._resolve_tender_id(session, tender_id)
+            if tender_id is not None and tender_uuid is None:
+                return [[] for _ in queries]
+
+            if self.bm25_backend == "memory" and tender_uuid is not None:
+                return [await self._bm25_search_memory(session, query, limit, tender_uuid) for query in queries]
+
+            results = []
+            for query in queries:
+                # websearch_to_tsquery accepts free text ("quoted phrases", -exclusions) without syntax errors
+                ts_query = func.websearch_to_tsquery("english", query)
+                stmt = select(Chunk).where(Chunk.content_tsv.op("@@")(ts_query))
+                if tender_uuid is not None:
+                    stmt = stmt.where(Chunk.tender_id == tender_uuid)
+                stmt = stmt.order_by(func.ts_rank_cd(Chunk.content_tsv, ts_query).desc()).limit(limit)
+                result = await session.execute(stmt)
+                results.append(result.scalars().all())
+            return results
+        finally:
+            await session.close()
+
+    async def hybrid_search(
+        self,
+        query: str,
+        limit: int = 5,
+        tender_id: Union[str, UUID, None] = None,
+        candidates: int = 20
+    ) -> List[Union[Chunk, Clause]]:
+        """
+        Runs keyword and vector retrieval concurrently and fuses them with Reciprocal Rank Fusion.
+        """
+        lexical, semantic = await asyncio.gather(
+            self.bm25_search(query, limit=candidates, tender_id=tender_id),
+            self.search_vector(query, limit=candidates, tender_id=tender_id)
+        )
+        return reciprocal_rank_fusion([lexical, semantic], key=_clause_key, limit=limit)
+
+    async def search_batch(
+        self,
+        queries: List[str],
+        strategy: str,
+        limit: int = 5,
+        tender_id: Union[str, UUID, None] = None,
+        candidates: int = 20
+    ) -> List[List[Union[Chunk, Clause]]]:
+        """
+        Retrieval for a whole set of questions with one strategy ("VECTOR", "BM25" or "HYBRID").
+        All questions are embedded in one batched request and searched in one session.
+        Results are aligned with `queries`.
+        """
+        if not queries:
+            return []
+        strategy = strategy.upper()
+        if strategy == "BM25":
+            return await self.bm25_search_batch(queries, limit=limit, tender_id=tender_id)
+        if strategy != "HYBRID":
+            return await self.search_vector_batch(queries, limit=limit, tender_id=tender_id)
+
+        lexical, semantic = await asyncio.gather(
+            self.bm25_search_batch(queries, limit=candidates, tender_id=tender_id),
+            self.search_vector_batch(queries, limit=candidates, tender_id=tender_id)
+        )
+        return [
+            reciprocal_rank_fusion([keyword, vector], key=_clause_key, limit=limit)
+            for keyword, vector in zip(lexical, semantic)
+        ]
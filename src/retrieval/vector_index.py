@@ -0,0 +1,282 @@
+"""
+Memory-mapped exact vector index, one per tender.
+For laptops and air-gapped reviewers without pgvector: each tender's chunk embeddings
+live in one contiguous, L2-normalized float32/float16 matrix on disk with a parallel
+array of chunk ids. Files are opened with mmap_mode="r", so uvicorn workers on the
+same machine share a single copy through the page cache.
+
+Layout:
+    <root>/<tender_id>/vectors.v2/CURRENT            name of the live generation
+    <root>/<tender_id>/vectors.v2/<generation>/      vectors.npy, ids.npy, groups.npy, meta.json
+Every write produces a new generation and swaps CURRENT atomically; readers holding
+the old memmap keep working until they reload.
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Iterable, List, Dict, Tuple, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+
+from src.retrieval.locks import file_lock
+
+# "pgvector" searches Postgres, "memmap" uses this module
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pgvector")
+VECTOR_INDEX_DTYPE = os.getenv("VECTOR_INDEX_DTYPE", "float32")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".indexes")
+
+# Rows scored per matmul, bounds the temporary float32 copy when storing float16
+BLOCK_ROWS = 65536
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class MemmapVectorIndex:
+    # 2: group keys are Document ids rather than filenames
+    FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ids: np.ndarray,
+        groups: np.ndarray,
+        group_keys: List[str],
+        path: Optional[Path] = None
+    ):
+        self.vectors = vectors          # (n, dim), rows L2-normalized
+        self.ids = ids                  # (n, 16) uint8, chunk UUID bytes
+        self.groups = groups            # (n,) int32, index into group_keys
+        self.group_keys = group_keys    # document keys (Document ids; same-named uploads are separate documents)
+        self.path = path
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1] if self.vectors.ndim == 2 else 0
+
+    @classmethod
+    def empty(cls, dim: int = 0, dtype: str = VECTOR_INDEX_DTYPE) -> "MemmapVectorIndex":
+        return cls(
+            np.zeros((0, dim), dtype=dtype),
+            np.zeros((0, 16), dtype=np.uint8),
+            np.zeros(0, dtype=np.int32),
+            []
+        )
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Tuple[str, Any, Sequence[float]]],
+        dtype: str = VECTOR_INDEX_DTYPE
+    ) -> "MemmapVectorIndex":
+        """Builds an index from (document key, chunk id, embedding) rows in one pass."""
+        group_keys: List[str] = []
+        positions: Dict[str, int] = {}
+        ids, groups, embeddings = [], [], []
+        for document_key, chunk_id, embedding in rows:
+            if document_key not in positions:
+                positions[document_key] = len(group_keys)
+                group_keys.append(document_key)
+            ids.append(UUID(str(chunk_id)).bytes)
+            groups.append(positions[document_key])
+            embeddings.append(embedding)
+        if not ids:
+            return cls.empty(dtype=dtype)
+        return cls(
+            _normalize(embeddings).astype(dtype),
+            np.frombuffer(b"".join(ids), dtype=np.uint8).reshape(-1, 16),
+            np.asarray(groups, dtype=np.int32),
+            group_keys
+        )
+
+    @classmethod
+    def open(cls, path: Path) -> "MemmapVectorIndex":
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        return cls(
+            np.load(path / "vectors.npy", mmap_mode="r"),
+            np.load(path / "ids.npy", mmap_mode="r"),
+            np.load(path / "groups.npy", mmap_mode="r"),
+            meta["group_keys"],
+            path
+        )
+
+    def write(self, path: Path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "vectors.npy", np.ascontiguousarray(self.vectors))
+        np.save(path / "ids.npy", np.ascontiguousarray(self.ids))
+        np.save(path / "groups.npy", np.ascontiguousarray(self.groups))
+        (path / "meta.json").write_text(json.dumps({
+            "dim": self.dim,
+            "dtype": str(self.vectors.dtype),
+            "count": len(self),
+            "group_keys": self.group_keys,
+        }))
+
+    def replace_document(
+        self,
+        document_key: str,
+        ids: Sequence[UUID],
+        embeddings: Sequence[Sequence[float]]
+    ) -> "MemmapVectorIndex":
+        """
+        Returns a new in-memory index with `document_key`'s previous rows swapped for these.
+        """
+        keys = [k for k in self.group_keys if k != document_key]
+        old_group = self.group_keys.index(document_key) if document_key in self.group_keys else -1
+        keep = np.asarray(self.groups) != old_group
+
+        # Re-number surviving groups after dropping the replaced key
+        remap = np.array([keys.index(k) if k in keys else -1 for k in self.group_keys], dtype=np.int32)
+        groups = remap[np.asarray(self.groups)[keep]] if len(self.group_keys) else np.zeros(0, dtype=np.int32)
+        keys.append(document_key)
+
+        dtype = self.vectors.dtype
+        new_vectors = _normalize(embeddings).astype(dtype) if len(embeddings) else np.zeros((0, self.dim), dtype=dtype)
+        if len(self) and new_vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {new_vectors.shape[1]} does not match index dimension {self.dim}")
+
+        return MemmapVectorIndex(
+            np.concatenate([np.asarray(self.vectors)[keep], new_vectors]) if len(self) else new_vectors,
+            np.concatenate([
+                np.asarray(self.ids)[keep],
+                np.frombuffer(b"".join(UUID(str(i)).bytes for i in ids), dtype=np.uint8).reshape(-1, 16)
+            ]),
+            np.concatenate([groups, np.full(len(ids), len(keys) - 1, dtype=np.int32)]),
+            keys
+        )
+
+    def search(self, queries: np.ndarray, limit: int = 5) -> List[List[Tuple[UUID, float]]]:
+        """
+        Exact cosine search for a batch of query vectors (q, dim) in one pass over the matrix.
+        Returns, per query, (chunk id, cosine similarity) pairs best first.
+        """
+        queries = _normalize(np.atleast_2d(queries))
+        n = len(self)
+        if not n:
+            return [[] for _ in range(len(queries))]
+        k = min(limit, n)
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, n, BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores = queries @ block.T                                  # (q, block)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = top + start
+            else:
+                rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            # Merge with the running top-k from previous blocks
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_scores.shape[1] > k:
+                top = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(UUID(bytes=bytes(self.ids[row])), float(score)) for row, score in zip(rows, scores)]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+class VectorIndexRegistry:
+    """
+    Opens (and reopens after another process writes) one MemmapVectorIndex per tender.
+    """
+    def __init__(self, root: str = LOCAL_INDEX_DIR, dtype: str = VECTOR_INDEX_DTYPE):
+        self.root = Path(root)
+        self.dtype = dtype
+        self._indexes: Dict[str, Tuple[str, MemmapVectorIndex]] = {}
+
+    def _tender_dir(self, tender_id: UUID) -> Path:
+        # Versioned name: an index in an older format is rebuilt from Postgres, not misread
+        return self.root / str(tender_id) / f"vectors.v{MemmapVectorIndex.FORMAT_VERSION}"
+
+    def _current(self, tender_id: UUID) -> Optional[str]:
+        pointer = self._tender_dir(tender_id) / "CURRENT"
+        return pointer.read_text().strip() if pointer.exists() else None
+
+    def exists(self, tender_id: UUID) -> bool:
+        return self._current(tender_id) is not None
+
+    def get(self, tender_id: UUID) -> MemmapVectorIndex:
+        key = str(tender_id)
+        generation = self._current(tender_id)
+        cached = self._indexes.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        if generation is None:
+            index = MemmapVectorIndex.empty(dtype=self.dtype)
+        else:
+            index = MemmapVectorIndex.open(self._tender_dir(tender_id) / generation)
+        self._indexes[key] = (generation, index)
+        return index
+
+    def _lock(self, tender_id: UUID):
+        # Serializes read-modify-publish across the API and ingestion workers
+        tender_dir = self._tender_dir(tender_id)
+        return file_lock(tender_dir.with_name(tender_dir.name + ".lock"))
+
+    def ensure(self, tender_id: UUID, rows: Iterable[Tuple[str, Any, Sequence[float]]]) -> MemmapVectorIndex:
+        """
+        Returns the tender's index, building and publishing it from `rows`
+        ((document key, chunk id, embedding) of every chunk) if none exists yet.
+        """
+        with self._lock(tender_id):
+            if not self.exists(tender_id):
+                self._publish(tender_id, MemmapVectorIndex.from_rows(rows, self.dtype))
+            return self.get(tender_id)
+
+    def replace_document(
+        self,
+        tender_id: UUID,
+        document_key: str,
+        ids: Sequence[UUID],
+        embeddings: Sequence[Sequence[float]],
+        rows: Optional[Iterable[Tuple[str, Any, Sequence[float]]]] = None
+    ):
+        """
+        Writes a new generation with the document's chunks swapped in, then publishes it.
+        `rows` (every chunk of the tender) seed the index when none exists yet, so the
+        first write doesn't leave out documents ingested before the index was enabled.
+        """
+        with self._lock(tender_id):
+            if rows is not None and not self.exists(tender_id):
+                current = MemmapVectorIndex.from_rows(rows, self.dtype)
+            else:
+                current = self.get(tender_id)
+            if not len(current) and current.vectors.dtype != np.dtype(self.dtype):
+                current = MemmapVectorIndex.empty(dtype=self.dtype)
+            self._publish(tender_id, current.replace_document(document_key, ids, embeddings))
+
+    def _publish(self, tender_id: UUID, index: MemmapVectorIndex):
+        tender_dir = self._tender_dir(tender_id)
+        generation = f"{time.time_ns()}"
+        index.write(tender_dir / generation)
+
+        tmp_pointer = tender_dir / "CURRENT.tmp"
+        tmp_pointer.write_text(generation)
+        os.replace(tmp_pointer, tender_dir / "CURRENT")
+
+        # Keep the previous generation for readers that just read the old pointer;
+        # anything older can go (open memmaps keep their inodes alive until closed)
+        generations = sorted(p.name for p in tender_dir.iterdir() if p.is_dir())
+        for old in generations[:-2]:
+            shutil.rmtree(tender_dir / old, ignore_errors=True)
+
+# Global instance shared by ingestion and search
+vector_indexes = VectorIndexRegistry()
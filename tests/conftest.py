@@ -0,0 +1,12 @@
+import os
+
+# Modules create their clients at import time; give them harmless defaults so
+# unit tests can import them without a .env file or running services.
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("POSTGRES_USER", "postgres")
+os.environ.setdefault("POSTGRES_PASSWORD", "postgres")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_PORT", "5432")
+os.environ.setdefault("POSTGRES_DB", "tender_rag")
+# Keep the embedding cache in memory during tests
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
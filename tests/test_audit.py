@@ -0,0 +1,60 @@
+import asyncio
+from src.api import controller as controller_module
+from src.api.audit import AuditLogger
+from src.retrieval.context import ContextStats
+
+class RecordingAuditLogger(AuditLogger):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    async def _write(self, rows):
+        self.batches.append(rows)
+        self.stats.written += len(rows)
+
+def test_audit_logger_batches_and_flushes_on_stop():
+    async def run():
+        logger = RecordingAuditLogger(batch_size=4, flush_interval=0.01)
+        for i in range(10):
+            logger.log({"query_id": str(i)})
+        logger.start()
+        await asyncio.sleep(0)
+        logger.log({"query_id": "late"})
+        await logger.stop()
+        return logger
+
+    logger = asyncio.run(run())
+    written = [row["query_id"] for batch in logger.batches for row in batch]
+    assert written == [str(i) for i in range(10)] + ["late"]
+    assert all(len(batch) <= 4 for batch in logger.batches)
+
+def test_audit_logger_drops_when_full():
+    logger = RecordingAuditLogger(queue_size=2)
+    for i in range(3):
+        logger.log({"query_id": str(i)})
+    assert logger.stats.enqueued == 2 and logger.stats.dropped == 1
+
+def test_controller_audits_each_query(monkeypatch):
+    records = []
+    monkeypatch.setattr(controller_module.audit_logger, "log", records.append)
+
+    async def no_version(tender_id):
+        return None
+
+    async def answer(query, tender_id, strategy, tender_version=None, retrieved_ids=None, context_stats=None):
+        retrieved_ids.append("chunk-1")
+        context_stats.append(ContextStats(tokens=100, raw_tokens=250))
+        return "Retention is 5%."
+
+    monkeypatch.setattr(controller_module.tender_versions, "get", no_version)
+    monkeypatch.setattr(controller_module.agent, "ask_with_strategy", answer)
+
+    response = asyncio.run(controller_module.controller.execute("Bid A", "What is the retention?"))
+    assert response.status == "ANSWERED"
+    assert len(records) == 1
+    record = records[0]
+    assert record["query_id"] == response.query_id
+    assert record["retrieved_ids"] == ["chunk-1"]
+    assert record["strategy"] == "VECTOR" and record["cached"] is False
+    assert record["context_tokens"] == {"tokens": 100, "raw_tokens": 250, "saved": 150}
+    assert {"prepare", "agent", "total"} <= set(record["timings"])
@@ -36,3 +36,107 @@ def test_chunker_small_noise():
     # 'a' (length 1) should be filtered out by < 5 char check
     assert len(chunks) == 1
     assert chunks[0].content == "valid clause"
+
+SPEC = """TENDER FOR ROAD WORKS
+
+1. GENERAL
+The works are described below.
+
+1.1 Scope
+The contractor shall provide all labour.
+
+Further scope paragraph.
+
+1.2. Payment
+Payment within 30 days of 5. certificate.
+
+Appendix B Drawings
+Drawing list."""
+
+def test_chunker_uses_clause_headings():
+    chunks = ClauseChunker().chunk_document(SPEC, {"filename": "spec.md"})
+
+    assert [c.metadata["clause_number"] for c in chunks] == ["GEN-1", "1", "1.1", "1.2", "B"]
+    # A clause keeps all its paragraphs
+    assert chunks[2].content == "1.1 Scope\nThe contractor shall provide all labour.\n\nFurther scope paragraph."
+    assert [c.index for c in chunks] == list(range(5))
+    assert chunks[3].metadata["filename"] == "spec.md"
+
+def test_chunker_keeps_numbered_lists_inside_their_clause():
+    content = (
+        "5. PAYMENT\n\n"
+        "5.1 Payment Terms\nThe contractor shall submit:\n"
+        "1. invoices monthly, with supporting records;\n"
+        "2. an updated programme\n\n"
+        "5.2 Retention\nFive percent is held.\n\n"
+        "6. VARIATIONS\nVariations need written instruction.\n"
+    )
+    for buffer in (content, content.encode()):
+        clauses = list(ClauseChunker(min_chars=1).iter_clauses(buffer, {}))
+        assert [c.clause_number for c in clauses] == ["5", "5.1", "5.2", "6"]
+        assert "2. an updated programme" in clauses[1].content
+
+def test_chunker_spans_are_offsets_into_the_source():
+    chunker = ClauseChunker()
+    for span in chunker.iter_spans(SPEC):
+        assert SPEC[span.start:span.end] == span.text(SPEC)
+
+def test_chunker_memory_mapped_file_matches_str(tmp_path):
+    path = tmp_path / "spec.md"
+    path.write_text(SPEC.replace("labour", "labour – plant"), encoding="utf-8")
+    chunker = ClauseChunker()
+
+    from_file = list(chunker.iter_file_chunks(path, {}))
+    from_str = chunker.chunk_document(path.read_text(encoding="utf-8"), {})
+    assert [(c.content, c.metadata["clause_number"]) for c in from_file] == \
+        [(c.content, c.metadata["clause_number"]) for c in from_str]
+
+def test_map_text_file_falls_back_for_crlf_and_empty_files(tmp_path):
+    from src.ingestion.chunker import map_text_file
+    from src.ingestion.diff import content_hash
+    lf, crlf, empty = tmp_path / "lf.md", tmp_path / "crlf.md", tmp_path / "empty.md"
+    lf.write_bytes(SPEC.encode("utf-8"))
+    crlf.write_bytes(SPEC.replace("\n", "\r\n").encode("utf-8"))
+    empty.write_bytes(b"")
+    with map_text_file(lf) as mapped:
+        # Re-ingestion compares hashes across both paths
+        assert content_hash(mapped) == content_hash(SPEC)
+    for path in (crlf, empty):
+        with map_text_file(path) as mapped:
+            assert mapped is None
+    chunker = ClauseChunker()
+    assert [c.content for c in chunker.iter_file_chunks(crlf, {})] == [c.content for c in chunker.chunk_document(SPEC, {})]
+    assert list(chunker.iter_file_chunks(empty, {})) == []
+
+def test_chunker_packs_small_paragraphs_up_to_budget():
+    from src.ingestion.tokens import count_tokens
+    paragraphs = [f"Item {i}: the contractor shall supply fixings." for i in range(12)]
+    content = "5.1 Fixings\n" + "\n\n".join(paragraphs)
+    chunker = ClauseChunker(max_tokens=40)
+
+    clause, = chunker.iter_clauses(content, {})
+    assert clause.clause_number == "5.1"
+    assert 1 < len(clause.chunks) < len(paragraphs)
+    assert all(count_tokens(c.content) <= 40 for c in clause.chunks)
+    # Chunks are contiguous slices of the clause, in order, with document-wide indexes
+    assert [c.index for c in clause.chunks] == list(range(len(clause.chunks)))
+    position = 0
+    for chunk in clause.chunks:
+        position = clause.content.index(chunk.content, position) + len(chunk.content)
+    assert all(c.metadata["clause_number"] == "5.1" for c in clause.chunks)
+
+def test_chunker_splits_oversized_paragraph_at_sentences():
+    from src.ingestion.tokens import count_tokens
+    sentences = [f"Sentence {i} describes the concrete curing regime in detail." for i in range(30)]
+    content = "6.2 Curing\n" + " ".join(sentences)
+    chunker = ClauseChunker(max_tokens=50)
+
+    chunks = chunker.chunk_document(content, {})
+    assert len(chunks) > 1
+    assert all(count_tokens(c.content) <= 50 for c in chunks)
+    # Splits fall on sentence ends
+    assert all(c.content.endswith(".") for c in chunks)
+
+def test_chunker_small_clause_is_one_chunk():
+    chunks = ClauseChunker(max_tokens=512).chunk_document("7.1 Short clause text.", {})
+    assert len(chunks) == 1 and chunks[0].content == "7.1 Short clause text."
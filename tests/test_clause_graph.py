@@ -0,0 +1,44 @@
+import asyncio
+from uuid import uuid4
+from src.retrieval.clause_graph import AdjacencyCache, ClauseAdjacency, extract_references, resolve_references
+
+def test_extract_references_skips_own_number():
+    content = "5.1 Payment\nSubject to Clause 12.3 and Clause 5.1, see Clause 4.2."
+    assert extract_references("5.1", content) == ["12.3", "4.2"]
+
+def test_resolve_references_links_by_number():
+    a, b, c = uuid4(), uuid4(), uuid4()
+    edges = resolve_references([(a, "1.1", ["2.1", "9.9"]), (b, "2.1", ["1.1"]), (c, "3.1", None)])
+    assert sorted(edges) == sorted([(a, b), (b, a)])
+
+def test_adjacency_expands_nearest_first():
+    a, b, c, d = uuid4(), uuid4(), uuid4(), uuid4()
+    graph = ClauseAdjacency.from_edges([(a, b), (b, c), (c, d), (b, a)])
+    assert len(graph) == 4 and graph.edge_count == 4
+    assert graph.neighbors(a) == [b]
+    assert graph.neighbors(uuid4()) == []
+    assert graph.expand([a]) == [b]
+    # Seeds are never returned, even when a cycle leads back to them
+    assert graph.expand([a], hops=3) == [b, c, d]
+    assert graph.expand([a], hops=3, limit=2) == [b, c]
+
+def test_adjacency_cache_loads_once_until_invalidated():
+    loads = []
+    a, b = uuid4(), uuid4()
+
+    class CountingCache(AdjacencyCache):
+        async def _load_postgres(self, tender_id):
+            loads.append(tender_id)
+            return [(a, b)]
+
+    async def run():
+        cache = CountingCache(ttl=60, backend="postgres")
+        tender_id = uuid4()
+        await asyncio.gather(*(cache.get(tender_id) for _ in range(5)))
+        cache.invalidate(tender_id)
+        graph = await cache.get(tender_id)
+        return graph
+
+    graph = asyncio.run(run())
+    assert len(loads) == 2
+    assert graph.neighbors(a) == [b]
@@ -0,0 +1,43 @@
+import pytest
+from src.retrieval.clause_keys import (
+    normalize_clause_number,
+    clause_sort_key,
+    key_to_number,
+    extract_clause_references,
+)
+
+@pytest.mark.parametrize("raw", ["5.1", "5.1.", "Clause 5.1", "clause 5.1.", "Cl. 5.1", "05.01", " Section 5.1 "])
+def test_normalize_variants(raw):
+    assert normalize_clause_number(raw) == "5.1"
+
+def test_normalize_rejects_generated_ids():
+    assert normalize_clause_number("GEN-3") is None
+    assert normalize_clause_number("") is None
+
+def test_sort_key_orders_numerically_and_nests():
+    keys = [clause_sort_key(n) for n in ["5.10", "5.2", "5.1.1", "5.1", "12"]]
+    assert sorted(keys) == [clause_sort_key(n) for n in ["5.1", "5.1.1", "5.2", "5.10", "12"]]
+    assert clause_sort_key("5.1.3").startswith(clause_sort_key("5.1") + ".")
+    assert key_to_number(clause_sort_key("Appendix B.2")) == "B.2"
+
+def test_extract_references_from_query():
+    query = "Compare Clause 5.1 with sub-clause 14.2.3 and clause 5.1 again"
+    assert extract_clause_references(query) == ["5.1", "14.2.3"]
+    assert extract_clause_references("What are the payment terms?") == []
+
+def test_extract_references_from_tool_input():
+    assert extract_clause_references("5.1, 6.2 and 7.3.1", require_prefix=False) == ["5.1", "6.2", "7.3.1"]
+    assert extract_clause_references("12", require_prefix=False) == ["12"]
+
+@pytest.mark.parametrize("text", [
+    "Which clauses mention retention?",
+    "What do the sections say?",
+    "Schedule a payment for the contractor",
+    "Sections and annexures are listed in the schedules",
+])
+def test_extract_ignores_letters_of_words(text):
+    assert extract_clause_references(text) == []
+
+def test_extract_letter_references_stand_alone():
+    assert extract_clause_references("Which clauses mention retention? See Section 4") == ["4"]
+    assert extract_clause_references("See Appendix A, Schedule B.2 and cl.5.1") == ["A", "B.2", "5.1"]
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+from uuid import uuid4
+from src.ingestion.tokens import count_tokens
+from src.retrieval.context import Citation, pack_context
+
+def _clause(number, content):
+    return SimpleNamespace(id=uuid4(), clause_number=number, content=content, metadata_={})
+
+def _chunk(clause, content, index=0):
+    return SimpleNamespace(id=uuid4(), clause_id=clause.id, chunk_index=index, content=content, metadata_={})
+
+def test_chunks_of_a_clause_are_grouped_and_deduped():
+    clause = _clause("14.2", "Retention of 5% is held. It is released on completion.")
+    first = _chunk(clause, "Retention of 5% is held.", 0)
+    second = _chunk(clause, "It is released on completion.", 1)
+    citations = {clause.id: Citation("14.2", "Conditions.pdf", 12)}
+
+    # Ranked out of order, with the second chunk retrieved twice
+    packed = pack_context([second, first, second], citations, budget=1000)
+    assert packed.text == "[Clause 14.2 | Conditions.pdf | p. 12]\nRetention of 5% is held.\nIt is released on completion."
+    assert packed.stats.duplicates == 1 and packed.stats.clauses == 1
+    assert packed.clause_numbers == ["14.2"]
+
+    # The full clause row makes its chunks redundant
+    packed = pack_context([first, clause], citations, budget=1000)
+    assert packed.text.endswith("\n" + clause.content)
+    assert packed.ids == [str(clause.id)]
+
+def test_clauses_are_ranked_and_cut_at_the_budget():
+    best = _clause("5.1", "Payment is monthly. " * 5)
+    second = _clause("6.2", "Variations need written instruction. " * 5)
+    third = _clause("8.1", "Insurance is the contractor's. " * 40)
+    referenced = _clause("12.3", "Disputes go to adjudication.")
+    budget = count_tokens(best.content) + count_tokens(second.content) + 40
+
+    packed = pack_context([best, second, third], {}, referenced=[referenced], budget=budget)
+    assert packed.clause_numbers == ["5.1", "6.2", "12.3"]
+    assert "[Clause 12.3 | referenced]" in packed.text
+    assert packed.stats.truncated == 1
+    assert packed.stats.tokens <= budget
+    assert packed.stats.saved == packed.stats.raw_tokens - packed.stats.tokens > 0
+
+def test_first_clause_is_cut_rather_than_dropped():
+    huge = _clause("1.1", "Definitions apply throughout the contract. " * 200)
+    packed = pack_context([huge], {}, notes=["No clause found with number '99'."], budget=100)
+    assert packed.text.startswith("No clause found with number '99'.\n---\n[Clause 1.1]\n")
+    assert packed.ids == [str(huge.id)]
+    assert packed.stats.tokens <= 100
+
+def test_empty_clause_over_budget_is_kept_as_header():
+    empty = _clause("2.1", "")
+    packed = pack_context([empty], {}, notes=["No clause found with number '99'. " * 20], budget=10)
+    assert packed.text.endswith("[Clause 2.1]\n")
+    assert packed.ids == [str(empty.id)]
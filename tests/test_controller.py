@@ -0,0 +1,203 @@
+import asyncio
+from src.api import controller as controller_module
+from src.retrieval.context import Citation
+
+def test_execute_stream_emits_retrieval_tokens_then_final(monkeypatch):
+    records = []
+    monkeypatch.setattr(controller_module.audit_logger, "log", records.append)
+
+    async def no_version(tender_id):
+        return None
+
+    async def stream(query, tender_id, strategy, tender_version=None, retrieved_ids=None, retrieved_clauses=None, context_stats=None):
+        # Tools have run by the time the first delta arrives
+        retrieved_ids.append("chunk-1")
+        retrieved_clauses.extend(["14.2", "14.2", "3.1"])
+        for delta in ["Retention ", "is 5% ", "(Clause 14.2)."]:
+            yield delta
+
+    monkeypatch.setattr(controller_module.tender_versions, "get", no_version)
+    monkeypatch.setattr(controller_module.agent, "stream_with_strategy", stream)
+
+    async def collect():
+        return [e async for e in controller_module.controller.execute_stream("Bid A", "What is the retention?")]
+
+    events = asyncio.run(collect())
+    assert [name for name, _ in events] == ["retrieval", "token", "token", "token", "final"]
+    assert events[0][1] == {"clauses": ["14.2", "3.1"]}
+    final = events[-1][1]
+    assert final["answer"] == "Retention is 5% (Clause 14.2)."
+    assert final["status"] == "ANSWERED"
+    # Audited once, on the completed text
+    assert [r["agent_response"] for r in records] == [final["answer"]]
+
+def test_cut_off_stream_is_still_audited(monkeypatch):
+    records = []
+    monkeypatch.setattr(controller_module.audit_logger, "log", records.append)
+
+    async def no_version(tender_id):
+        return None
+
+    async def stream(query, tender_id, strategy, tender_version=None, retrieved_ids=None, retrieved_clauses=None, context_stats=None):
+        for delta in ["Retention ", "is 5% ", "(Clause 14.2)."]:
+            yield delta
+
+    monkeypatch.setattr(controller_module.tender_versions, "get", no_version)
+    monkeypatch.setattr(controller_module.agent, "stream_with_strategy", stream)
+
+    async def disconnect_after_first_token():
+        events = controller_module.controller.execute_stream("Bid A", "What is the retention?")
+        async for name, _ in events:
+            if name == "token":
+                break
+        await events.aclose()
+
+    asyncio.run(disconnect_after_first_token())
+    assert len(records) == 1
+    assert records[0]["status"] == "CANCELLED"
+    assert records[0]["agent_response"] == "Retention "
+
+def test_execute_stream_rejects_empty_query():
+    async def collect():
+        return [e async for e in controller_module.controller.execute_stream("Bid A", "  ")]
+
+    events = asyncio.run(collect())
+    assert [name for name, _ in events] == ["final"]
+    assert events[0][1]["status"] == "REFUSED"
+
+def test_execute_batch_prefetches_and_limits_concurrency(monkeypatch):
+    monkeypatch.setattr(controller_module.audit_logger, "log", lambda record: None)
+
+    async def no_version(tender_id):
+        return None
+
+    searches = []
+
+    class FakeSearchEngine:
+        async def search_batch(self, queries, strategy, tender_id=None):
+            searches.append((strategy, list(queries)))
+            return [[] if "nothing" in q else [FakeChunk(q)] for q in queries]
+
+        async def expand_references_batch(self, item_lists, tender_id):
+            return [[] for _ in item_lists]
+
+        async def get_citations(self, clause_ids):
+            return {}
+
+    class FakeChunk:
+        def __init__(self, query):
+            self.id = f"chunk-{query}"
+            self.content = f"About {query}"
+            self.metadata_ = {"clause_number": "14.2"}
+
+    running = [0, 0]
+    contexts = {}
+
+    async def answer(query, tender_id, strategy, tender_version=None, retrieved_ids=None, context=None, context_stats=None):
+        running[0] += 1
+        running[1] = max(running[1], running[0])
+        contexts[query] = context
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return f"Answer to {query}"
+
+    monkeypatch.setattr(controller_module.tender_versions, "get", no_version)
+    monkeypatch.setattr(controller_module.agent, "search_engine", FakeSearchEngine())
+    monkeypatch.setattr(controller_module.agent, "ask_with_strategy", answer)
+
+    queries = ["retention", "Clause 5.1", "liquidated damages", "", "nothing here"]
+
+    async def collect():
+        return [r async for r in controller_module.controller.execute_batch("Bid A", queries, concurrency=2)]
+
+    results = dict(asyncio.run(collect()))
+    assert sorted(results) == list(range(len(queries)))
+    assert results[3].status == "REFUSED"
+    assert results[0].answer == "Answer to retention"
+    # One retrieval call per strategy for the whole set
+    assert sorted(searches) == [("BM25", ["Clause 5.1"]), ("VECTOR", ["retention", "liquidated damages", "nothing here"])]
+    assert contexts["retention"] == "[Clause 14.2]\nAbout retention"
+    assert contexts["nothing here"] is None
+    assert running[1] == 2
+
+class FakeClause:
+    def __init__(self, number, content):
+        self.id = f"clause-{number}"
+        self.clause_number = number
+        self.content = content
+
+class ClauseSearchEngine:
+    def __init__(self, clauses):
+        self.clauses = clauses
+        self.looked_up = []
+
+    async def search_clauses_batch(self, references, tender_id=None):
+        self.looked_up.extend(references)
+        return {r: [c for c in self.clauses if c.clause_number == r] for r in references}
+
+    async def expand_references(self, items, tender_id=None):
+        return []
+
+    async def get_citations(self, clause_ids):
+        return {c.id: Citation(c.clause_number, "spec.pdf", 3) for c in self.clauses if c.id in clause_ids}
+
+def _exact_setup(monkeypatch, clauses):
+    calls = []
+    monkeypatch.setattr(controller_module.audit_logger, "log", lambda record: None)
+
+    async def no_version(tender_id):
+        return None
+
+    async def with_context(query, context):
+        calls.append(("context", context))
+        return "Clause 5.1 requires monthly payment."
+
+    async def with_strategy(**kwargs):
+        calls.append(("agent", None))
+        return "tool answer"
+
+    monkeypatch.setattr(controller_module.tender_versions, "get", no_version)
+    monkeypatch.setattr(controller_module.agent, "search_engine", ClauseSearchEngine(clauses))
+    monkeypatch.setattr(controller_module.agent, "ask_with_context", with_context)
+    monkeypatch.setattr(controller_module.agent, "ask_with_strategy", with_strategy)
+    return calls
+
+def test_exact_query_answers_in_one_context_run(monkeypatch):
+    calls = _exact_setup(monkeypatch, [FakeClause("5.1", "5.1 Payment: monthly.")])
+    response = asyncio.run(controller_module.controller.execute("Bid A", "What does Clause 5.1 say?"))
+    assert response.classification == "EXACT" and response.status == "ANSWERED"
+    assert calls == [("context", "[Clause 5.1 | spec.pdf | p. 3]\n5.1 Payment: monthly.")]
+
+def test_exact_query_refuses_missing_clause_without_llm(monkeypatch):
+    calls = _exact_setup(monkeypatch, [])
+    response = asyncio.run(controller_module.controller.execute("Bid A", "What does Clause 99.9 say?"))
+    assert response.status == "REFUSED"
+    assert "99.9" in response.answer
+    assert calls == []
+
+def test_exact_query_ignores_plural_words(monkeypatch):
+    calls = _exact_setup(monkeypatch, [FakeClause("5.1", "5.1 Payment: monthly.")])
+    response = asyncio.run(controller_module.controller.execute("Bid A", "What do the sections say? Clause 5.1"))
+    assert response.status == "ANSWERED"
+    assert controller_module.agent.search_engine.looked_up == ["5.1"]
+    assert "No clause found" not in calls[0][1]
+
+    _exact_setup(monkeypatch, [])
+    response = asyncio.run(controller_module.controller.execute("Bid A", "Which clauses cover Clause 5.1?"))
+    assert response.status == "REFUSED"
+    assert response.answer.startswith("Clause 5.1 could not be found")
+
+def test_batch_exact_questions_take_the_fast_path(monkeypatch):
+    calls = _exact_setup(monkeypatch, [FakeClause("5.1", "5.1 Payment: monthly.")])
+
+    async def collect():
+        return dict([item async for item in controller_module.controller.execute_batch(
+            "Bid A", ["What does Clause 5.1 say?", "What does Clause 99.9 say?"]
+        )])
+
+    responses = asyncio.run(collect())
+    single = asyncio.run(controller_module.controller.execute("Bid A", "What does Clause 5.1 say?"))
+    assert responses[0].status == single.status == "ANSWERED"
+    assert responses[1].status == "REFUSED"
+    # Both runs answered from the prefetched clause, never through the tool-choosing agent
+    assert calls == [("context", "[Clause 5.1 | spec.pdf | p. 3]\n5.1 Payment: monthly.")] * 2
@@ -27,6 +27,13 @@ def test_clause_model_creation():
     assert clause.content == "This is a clause."
     assert clause.document_id == doc_id
 
+def test_clause_and_chunk_carry_tender_id():
+    tender_id = uuid4()
+    clause = Clause(document_id=uuid4(), tender_id=tender_id, clause_number="2.1", content="Scope.")
+    chunk = Chunk(clause_id=clause.id, tender_id=tender_id, content="Scope.", chunk_index=0, embedding=[0.0] * 1536)
+    assert clause.tender_id == tender_id
+    assert chunk.tender_id == clause.tender_id
+
 def test_chunk_model_creation():
     clause_id = uuid4()
     embedding = [0.1] * 1536 
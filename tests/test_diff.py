@@ -0,0 +1,45 @@
+from uuid import uuid4
+import pytest
+from src.ingestion.diff import StoredClause, ReingestReport, content_hash, plan_clauses
+
+def _stored(*clauses):
+    return [StoredClause(uuid4(), number, content_hash(text), i) for i, (number, text) in enumerate(clauses)]
+
+def test_plan_clauses_classifies_changes():
+    stored = _stored(("1", "Scope"), ("2", "Payment terms"), ("3", "Retention 5%"), ("4", "Insurance"))
+    revision = [
+        ("1", content_hash("Scope"), 0),           # unchanged
+        ("2", content_hash("Payment terms"), 1),   # unchanged
+        ("3", content_hash("Retention 10%"), 2),   # updated in place
+        ("5", content_hash("Defects period"), 3),  # new clause
+    ]
+    plan = plan_clauses(stored, revision)
+
+    assert plan.unchanged == {0: stored[0].id, 1: stored[1].id}
+    assert plan.updated == {2: stored[2].id}
+    assert plan.inserted == [3]
+    assert plan.deleted == [stored[3].id]
+
+    report = ReingestReport.from_plan(plan)
+    assert report.embeddings_reused == 2
+    assert report.embeddings_computed == 2
+    assert report.skipped_fraction == pytest.approx(0.5)
+
+def test_plan_clauses_keeps_embeddings_of_moved_clauses():
+    stored = _stored(("GEN-1", "Scope"), ("GEN-2", "Payment terms"))
+    # A paragraph inserted at the top shifts every generated number
+    revision = [
+        ("GEN-1", content_hash("Addendum note"), 0),
+        ("GEN-2", content_hash("Scope"), 1),
+        ("GEN-3", content_hash("Payment terms"), 2),
+    ]
+    plan = plan_clauses(stored, revision)
+
+    assert plan.moved == {1: stored[0].id, 2: stored[1].id}
+    assert plan.inserted == [0]
+    assert not plan.updated and not plan.deleted
+
+def test_legacy_rows_without_hash_are_rewritten():
+    legacy = [StoredClause(uuid4(), "1", "", 0)]
+    plan = plan_clauses(legacy, [("1", content_hash("Scope"), 0)])
+    assert plan.updated == {0: legacy[0].id}
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from src.ingestion import embed
+from src.ingestion.embed import batch_texts, get_embeddings
+from src.ingestion.embed_cache import EmbeddingCache
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = EmbeddingCache(path=None)
+    monkeypatch.setattr(embed, "embedding_cache", cache)
+    return cache
+
+def test_batch_texts_respects_item_limit():
+    batches = batch_texts(["text"] * 5, max_items=2, max_tokens=1000)
+    assert batches == [[0, 1], [2, 3], [4]]
+
+def test_batch_texts_respects_token_limit():
+    # 40 chars ~ 10 tokens each
+    texts = ["x" * 40, "x" * 40, "x" * 40]
+    batches = batch_texts(texts, max_items=100, max_tokens=20)
+    assert batches == [[0, 1], [2]]
+
+def test_batch_texts_oversized_item_gets_own_batch():
+    batches = batch_texts(["x" * 400, "short"], max_items=100, max_tokens=10)
+    assert batches == [[0], [1]]
+
+def test_get_embeddings_preserves_order(monkeypatch):
+    calls = []
+
+    async def fake_create(input, model):
+        calls.append(list(input))
+        # Return results out of order to make sure we map by index
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(text))])
+            for i, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+    monkeypatch.setattr(embed.client.embeddings, "create", fake_create)
+
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    result = asyncio.run(get_embeddings(texts, max_items=2, concurrency=2))
+
+    assert result == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(calls) == 3
+
+def test_get_embeddings_empty():
+    assert asyncio.run(get_embeddings([])) == []
+
+def test_get_embeddings_uses_cache_and_dedupes(monkeypatch, fresh_cache):
+    calls = []
+
+    async def fake_create(input, model):
+        calls.append(list(input))
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)
+        ])
+
+    monkeypatch.setattr(embed.client.embeddings, "create", fake_create)
+
+    first = asyncio.run(get_embeddings(["same text", "same  text\n", "other"]))
+    assert first == [[9.0], [9.0], [5.0]]
+    assert calls == [["same text", "other"]]
+
+    second = asyncio.run(get_embeddings(["other", "new one"]))
+    assert second == [[5.0], [7.0]]
+    assert calls[-1] == ["new one"]
+    assert fresh_cache.stats.memory_hits == 1
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from src.ingestion.embed_cache import EmbeddingCache, cache_key
+
+def test_cache_key_normalizes_whitespace_and_includes_model():
+    assert cache_key("GCC  clause\n1", "m") == cache_key("GCC clause 1", "m")
+    assert cache_key("GCC clause 1", "m") != cache_key("GCC clause 1", "other-model")
+
+def _key(text):
+    return cache_key(text, "m")
+
+def test_memory_lru_eviction():
+    cache = EmbeddingCache(path=None, memory_entries=2)
+
+    async def run():
+        await cache.put_many([(_key("a"), [1.0]), (_key("b"), [2.0])])
+        assert await cache.get_many([_key("a")]) == {_key("a"): [1.0]}  # 'a' is now most recently used
+        await cache.put_many([(_key("c"), [3.0])])
+        return await cache.get_many([_key("a"), _key("b")])
+
+    assert asyncio.run(run()) == {_key("a"): [1.0]}
+    assert cache.stats.memory_hits == 2
+    assert cache.stats.misses == 1
+    assert cache.stats.memory_evictions == 1 and cache.stats.disk_evictions == 0
+
+def test_disk_tier_survives_restart_and_evicts(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path=path, memory_entries=10, disk_entries=2)
+    for key, vector in ((_key("a"), [0.5, 1.5]), (_key("b"), [2.5]), (_key("c"), [3.5])):
+        # Separate writes, so "a" is the least recently used row
+        asyncio.run(cache.put_many([(key, vector)]))
+    cache.evict()
+    cache.close()
+    assert cache.stats.disk_evictions == 1 and cache.stats.memory_evictions == 0
+
+    reopened = EmbeddingCache(path=path)
+    assert asyncio.run(reopened.get_many([_key("a"), _key("c")])) == {_key("c"): [3.5]}
+    assert reopened.stats.disk_hits == 1
+    # Second read is served from memory
+    assert asyncio.run(reopened.get_many([_key("c")])) == {_key("c"): [3.5]}
+    assert reopened.stats.memory_hits == 1
+    reopened.close()
+
+def test_disk_tier_opens_lazily_and_serves_async_batches(tmp_path):
+    path = tmp_path / "cache" / "embeddings.sqlite3"
+    cache = EmbeddingCache(path=str(path), memory_entries=1)
+    assert not path.parent.exists()
+
+    keys = [cache_key(text, "m") for text in ("a", "b", "c")]
+    asyncio.run(cache.put_many([(key, [float(i)]) for i, key in enumerate(keys)]))
+    assert path.exists()
+
+    # Only the last key is still in memory; the others come from one disk read
+    found = asyncio.run(cache.get_many([*keys, cache_key("missing", "m")]))
+    assert found == {key: [float(i)] for i, key in enumerate(keys)}
+    assert cache.stats.memory_hits == 1 and cache.stats.disk_hits == 2 and cache.stats.misses == 1
+    cache.close()
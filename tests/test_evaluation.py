@@ -0,0 +1,20 @@
+import pytest
+from src.retrieval.evaluation import recall_at_k, parse_setting, without_source
+
+def test_recall_at_k():
+    assert recall_at_k(["a", "b", "c", "d"], ["a", "x", "c", "b"], k=2) == 0.5
+    assert recall_at_k(["a", "b"], ["b", "a"], k=2) == 1.0
+    assert recall_at_k([], ["a"], k=3) == 1.0
+
+def test_parse_setting():
+    assert parse_setting("hnsw") == {}
+    assert parse_setting("hnsw:ef_search=100") == {"ef_search": 100}
+    assert parse_setting("binary:oversample=8,ef_search=200") == {
+        "quantization": "binary", "oversample": 8, "ef_search": 200
+    }
+
+def test_query_chunk_is_left_out_of_the_results():
+    # The sampled chunk is its own top-1; counting it would inflate recall
+    assert without_source(["self", "a", "b", "c"], "self", k=2) == ["a", "b"]
+    assert without_source(["a", "b", "c"], "self", k=2) == ["a", "b"]
+    assert recall_at_k(without_source(["self", "a", "b"], "self", 2), without_source(["self", "x", "a"], "self", 2), 2) == 0.5
@@ -0,0 +1,20 @@
+import pytest
+from types import SimpleNamespace
+from src.retrieval.fusion import reciprocal_rank_fusion
+
+def _items(*ids):
+    return [SimpleNamespace(id=i) for i in ids]
+
+def test_rrf_rewards_items_in_both_lists():
+    lexical = _items("a", "b", "c")
+    semantic = _items("c", "d", "a")
+    fused = reciprocal_rank_fusion([lexical, semantic])
+    ids = [item.id for item in fused]
+    # 'a' (ranks 1 and 3) and 'c' (ranks 3 and 1) tie and beat single-list items
+    assert ids[:2] == ["a", "c"]
+    assert set(ids) == {"a", "b", "c", "d"}
+
+def test_rrf_limit_and_empty_lists():
+    fused = reciprocal_rank_fusion([_items("a", "b"), []], limit=1)
+    assert [item.id for item in fused] == ["a"]
+    assert reciprocal_rank_fusion([[], []]) == []
@@ -0,0 +1,92 @@
+import asyncio
+from uuid import uuid4
+import pytest
+from src.db.graph_writer import GraphWriter, MERGE_CLAUSES, MERGE_REFERENCES
+from src.db.models import Clause
+
+class RecordingWriter(GraphWriter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.queries = []
+
+    async def _run(self, query, **params):
+        self.queries.append((query, params))
+
+def _clause(number):
+    return Clause(document_id=uuid4(), tender_id=uuid4(), clause_number=number, content=f"clause {number}")
+
+def test_graph_writer_batches_nodes_before_edges():
+    async def run():
+        writer = RecordingWriter(batch_size=2, available=True)
+        clauses = [_clause(str(i)) for i in range(3)]
+        for clause in clauses:
+            await writer.add_clause(clause)
+        await writer.add_reference(clauses[0].id, clauses[2].id)
+        await writer.flush()
+        return writer
+
+    writer = asyncio.run(run())
+    assert [q for q, _ in writer.queries] == [MERGE_CLAUSES, MERGE_CLAUSES, MERGE_REFERENCES]
+    assert [len(p["rows"]) for _, p in writer.queries] == [2, 1, 1]
+    assert writer.stats.nodes == 3 and writer.stats.edges == 1
+
+def test_graph_writer_is_noop_when_unavailable():
+    async def run():
+        writer = RecordingWriter(batch_size=1, available=False)
+        await writer.add_clause(_clause("1"))
+        await writer.delete_clauses([uuid4()])
+        await writer.flush()
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.queries == []
+
+def test_graph_writers_share_one_driver(monkeypatch):
+    from src.db import graph_writer as graph_writer_module
+
+    drivers, sessions = [], []
+
+    class FakeResult:
+        async def consume(self):
+            pass
+
+    class FakeSession:
+        def __init__(self):
+            self.queries = []
+            self.closed = False
+
+        async def run(self, query, parameters=None):
+            self.queries.append(query)
+            return FakeResult()
+
+        async def close(self):
+            self.closed = True
+
+    class FakeDriver:
+        def __init__(self, uri, auth):
+            self.closed = False
+            drivers.append(self)
+
+        def session(self):
+            sessions.append(FakeSession())
+            return sessions[-1]
+
+        async def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(graph_writer_module.AsyncGraphDatabase, "driver", FakeDriver)
+
+    async def run():
+        for _ in range(3):
+            # One writer per ingested document
+            writer = GraphWriter(batch_size=10, available=True)
+            await writer.add_clause(_clause("1"))
+            await writer.flush()
+            await writer.close()
+        await graph_writer_module.close_graph_driver()
+
+    asyncio.run(run())
+    assert len(drivers) == 1 and drivers[0].closed
+    assert len(sessions) == 3 and all(session.closed for session in sessions)
+    assert sessions[-1].queries == [MERGE_CLAUSES]
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from src.db import indexes
+from src.retrieval.search import HNSW_MAX_EF_SEARCH, SearchEngine
+
+class Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+class RecordingConnection:
+    def __init__(self, executed, fail_on=None, invalid=None):
+        self.executed = executed
+        self.fail_on = fail_on
+        # Answer to the pg_index validity check
+        self.invalid = invalid
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execution_options(self, **options):
+        return self
+
+    async def execute(self, statement, params=None):
+        self.executed.append(str(statement))
+        if self.fail_on and self.fail_on in str(statement):
+            raise RuntimeError("index build failed")
+        return Result(self.invalid)
+
+def test_index_build_settings_are_reset_before_the_connection_is_returned(monkeypatch):
+    executed = []
+    monkeypatch.setattr(indexes, "engine", type("Engine", (), {
+        "connect": lambda self: RecordingConnection(executed, fail_on="CREATE INDEX")
+    })())
+    try:
+        asyncio.run(indexes.create_vector_index("hnsw", maintenance_work_mem="2GB"))
+    except RuntimeError:
+        pass
+    assert executed[1] == "SET maintenance_work_mem = '2GB'"
+    # Reset even though the build failed
+    assert executed[-1] == "RESET maintenance_work_mem"
+
+def test_ef_search_is_capped_at_the_pgvector_maximum():
+    executed = []
+    session = RecordingConnection(executed)
+    asyncio.run(SearchEngine()._apply_ann_settings(session, limit=5000, ef_search=None, probes=None))
+    assert executed == [f"SET LOCAL hnsw.ef_search = {HNSW_MAX_EF_SEARCH}"]
+
+def _run_cli(monkeypatch, argv):
+    executed = []
+    monkeypatch.setattr(indexes, "engine", type("Engine", (), {
+        "connect": lambda self: RecordingConnection(executed)
+    })())
+    async def no_indexes():
+        return []
+    monkeypatch.setattr(indexes, "list_vector_indexes", no_indexes)
+    asyncio.run(indexes.main(argv))
+    return executed
+
+def test_tender_drop_targets_the_requested_kind(monkeypatch):
+    tender = "7f1d2c3b-0000-4000-8000-000000000001"
+    executed = _run_cli(monkeypatch, ["drop", "binary", "--tender", tender])
+    name = indexes.tender_index_name(tender, indexes.QUANTIZATIONS["binary"].index_name)
+    assert executed == [f"DROP INDEX CONCURRENTLY IF EXISTS {name}"]
+
+def test_tender_ivfflat_is_rejected(monkeypatch):
+    with pytest.raises(SystemExit):
+        _run_cli(monkeypatch, ["create", "ivfflat", "--tender", "7f1d2c3b-0000-4000-8000-000000000001"])
+
+def test_invalid_tender_index_is_dropped_and_rebuilt(monkeypatch):
+    executed = []
+    monkeypatch.setattr(indexes, "engine", type("Engine", (), {
+        "connect": lambda self: RecordingConnection(executed, invalid=True)
+    })())
+    tender = "7f1d2c3b-0000-4000-8000-000000000001"
+    asyncio.run(indexes.create_tender_vector_index(tender))
+    name = indexes.tender_index_name(tender)
+    assert "indisvalid" in executed[0]
+    assert executed[1] == f"DROP INDEX CONCURRENTLY IF EXISTS {name}"
+    assert executed[2].startswith(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ")
@@ -0,0 +1,64 @@
+import asyncio
+from uuid import uuid4
+from src.ingestion import jobs as jobs_module
+from src.ingestion.pipeline import FolderReport
+from src.ingestion.stages import PipelineStats
+
+def _run_job(monkeypatch, ingest, attempts=1):
+    updates = []
+
+    async def fake_update(job_id, **values):
+        updates.append(values)
+
+    async def fake_tender(name):
+        return uuid4()
+
+    monkeypatch.setattr(jobs_module, "_update_job", fake_update)
+    monkeypatch.setattr(jobs_module, "get_or_create_tender", fake_tender)
+    monkeypatch.setattr(jobs_module, "ingest_path", ingest)
+    job = {"id": uuid4(), "tender_name": "Bid A", "file_path": "/uploads/spec.pdf", "reingest": False, "attempts": attempts}
+    asyncio.run(jobs_module.run_job(job, heartbeat_seconds=0.001))
+    return updates
+
+def test_run_job_reports_progress_and_success(monkeypatch):
+    async def ingest(pipeline, path, tender_id):
+        pipeline.progress.files_total = 1
+        pipeline.progress.current_file = path.name
+        pipeline.progress.current = PipelineStats()
+        pipeline.progress.current.stage("embed").items = 40
+        # Long enough for a heartbeat
+        await asyncio.sleep(0.02)
+        pipeline.progress.files_done = 1
+
+    updates = _run_job(monkeypatch, ingest)
+    heartbeats, final = updates[:-1], updates[-1]
+    assert heartbeats and all("heartbeat_at" in u and "status" not in u for u in heartbeats)
+    assert heartbeats[0]["progress"]["current"]["stages"]["embed"]["items"] == 40
+    assert final["status"] == "succeeded" and final["error"] is None
+    assert final["progress"]["files_done"] == 1
+    assert final["progress"]["current_file"] == "spec.pdf"
+
+def test_run_job_records_failures(monkeypatch):
+    async def failing(pipeline, path, tender_id):
+        raise RuntimeError("parse failed")
+
+    final = _run_job(monkeypatch, failing)[-1]
+    assert final["status"] == "failed" and final["error"] == "parse failed"
+    assert final["finished_at"] is not None
+
+    async def partial(pipeline, path, tender_id):
+        return FolderReport(ingested={"a.pdf": PipelineStats()}, failed={"b.pdf": "corrupt"})
+
+    final = _run_job(monkeypatch, partial)[-1]
+    assert final["status"] == "succeeded" and final["error"] == "b.pdf: corrupt"
+
+def test_retried_job_reingests_committed_files(monkeypatch):
+    modes = []
+
+    async def ingest(pipeline, path, tender_id):
+        modes.append(pipeline.reingest)
+
+    _run_job(monkeypatch, ingest)
+    _run_job(monkeypatch, ingest, attempts=2)
+    # First attempt as queued; the retry diffs files the dead worker already committed
+    assert modes == [False, True]
@@ -0,0 +1,111 @@
+import pytest
+import asyncio
+import threading
+from uuid import uuid4
+from src.retrieval.keyword_index import KeywordIndex, KeywordIndexRegistry, tokenize
+
+def _index():
+    index = KeywordIndex()
+    index.add("c1", "spec.md", "5.1", "The contractor shall provide concrete grade C30 for all slabs.")
+    index.add("c2", "spec.md", "5.2", "Reinforcement steel shall comply with SANS 920.")
+    index.add("c3", "gcc.md", "1.1", "Payment is due within 30 days of the certificate.")
+    return index
+
+def test_tokenize_keeps_clause_numbers():
+    assert tokenize("See Clause 5.1.2 for the Concrete") == ["see", "clause", "5.1.2", "concrete"]
+
+def test_search_ranks_matching_clause_first():
+    index = _index()
+    hits = index.search("concrete slabs", limit=5)
+    assert [index.document(doc)["clause_id"] for doc, _ in hits] == ["c1"]
+
+def test_replace_document_removes_old_revision():
+    index = _index()
+    index.replace_document("spec.md", [("c4", "5.1", "Concrete grade C40 is required.")])
+
+    assert len(index) == 2
+    hits = index.search("concrete", limit=5)
+    assert [index.document(doc)["clause_id"] for doc, _ in hits] == ["c4"]
+    assert index.search("reinforcement") == []
+
+def test_save_and_load_roundtrip(tmp_path):
+    index = _index()
+    index.remove_document("gcc.md")
+    path = tmp_path / "keywords.npz"
+    index.save(path)
+
+    loaded = KeywordIndex.load(path)
+    assert len(loaded) == 2
+    assert loaded.search("steel") == index.search("steel")
+    assert loaded.document(loaded.search("steel")[0][0])["clause_number"] == "5.2"
+
+def test_registry_persists_per_tender(tmp_path):
+    registry = KeywordIndexRegistry(root=str(tmp_path))
+    registry.get("tender-a").add("c1", "spec.md", "1", "Scope of works")
+    registry.save("tender-a")
+
+    fresh = KeywordIndexRegistry(root=str(tmp_path))
+    assert fresh.exists("tender-a")
+    assert not fresh.exists("tender-b")
+    assert len(fresh.get("tender-a")) == 1
+
+def test_concurrent_updates_from_processes_keep_every_document(tmp_path):
+    # Two registries stand in for the API and a worker process, each with its own cache
+    registries = [KeywordIndexRegistry(root=str(tmp_path)) for _ in range(2)]
+
+    def ingest(worker):
+        for i in range(10):
+            key = f"doc{worker}-{i}.md"
+            registries[worker].update("tender-a", key, [(key, str(i), f"Clause text of {key}")])
+
+    threads = [threading.Thread(target=ingest, args=(worker,)) for worker in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(KeywordIndexRegistry(root=str(tmp_path)).get("tender-a")) == 20
+
+def test_first_update_seeds_the_index_with_existing_clauses(tmp_path):
+    registry = KeywordIndexRegistry(root=str(tmp_path))
+    older = [("c1", "old.md", "1", "Scope of works")]
+    registry.update("tender-a", "new.md", [("c2", "2", "Retention money")], rows=older)
+    index = KeywordIndexRegistry(root=str(tmp_path)).get("tender-a")
+    assert len(index) == 2
+    assert index.document(index.search("scope")[0][0])["document_key"] == "old.md"
+
+def test_documents_are_keyed_by_id_not_filename(tmp_path):
+    # Two uploads named Conditions.pdf with different content are separate documents
+    registry = KeywordIndexRegistry(root=str(tmp_path))
+    first, addendum = str(uuid4()), str(uuid4())
+    registry.update("tender-a", first, [("c1", "1", "Retention money is five percent")])
+    registry.update("tender-a", addendum, [("c2", "1", "Retention money is reduced to three percent")])
+    index = KeywordIndexRegistry(root=str(tmp_path)).get("tender-a")
+    assert len(index) == 2
+    assert {index.document(doc)["document_key"] for doc, _ in index.search("retention")} == {first, addendum}
+
+def test_batch_keyword_search_holds_one_session(tmp_path, monkeypatch):
+    from src.retrieval import search as search_module
+
+    sessions = []
+
+    class FakeSession:
+        async def close(self):
+            pass
+
+    async def fake_get_session():
+        sessions.append(FakeSession())
+        yield sessions[-1]
+
+    registry = KeywordIndexRegistry(root=str(tmp_path))
+    tender = uuid4()
+    registry.update(tender, str(uuid4()), [
+        (uuid4(), "5.1", "Retention money is five percent"),
+        (uuid4(), "8.1", "Insurance is carried by the contractor"),
+    ])
+    monkeypatch.setattr(search_module, "keyword_indexes", registry)
+    monkeypatch.setattr(search_module, "get_session", fake_get_session)
+
+    engine = search_module.SearchEngine(bm25_backend="memory")
+    results = asyncio.run(engine.search_batch(["retention", "insurance", "retention"] * 10, "BM25", tender_id=tender))
+    assert len(sessions) == 1
+    assert [r[0].clause_number for r in results[:3]] == ["5.1", "8.1", "5.1"]
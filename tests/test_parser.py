@@ -0,0 +1,90 @@
+import asyncio
+import zipfile
+import pytest
+from src.ingestion import parser as parser_module
+from src.ingestion.parser import collect_files, parse_file, parse_in_pool
+
+def _write_docs(folder, count):
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        (folder / f"doc{i}.md").write_text(f"Clause {i}\n\nBody of document {i}.")
+    (folder / "drawing.dwg").write_bytes(b"\x00")
+    return folder
+
+def test_parse_file_reads_markdown_and_flags_unsupported(tmp_path):
+    _write_docs(tmp_path, 1)
+    parsed = parse_file(str(tmp_path / "doc0.md"))
+    assert parsed["metadata"]["filename"] == "doc0.md"
+    assert "Body of document 0" in parsed["content"]
+    assert "error" in parse_file(str(tmp_path / "drawing.dwg"))["metadata"]
+
+def test_collect_files_from_folder_and_zip(tmp_path):
+    folder = _write_docs(tmp_path / "tender", 3)
+    (folder / ".hidden.md").write_text("ignored")
+    assert [p.name for p in collect_files(folder)] == ["doc0.md", "doc1.md", "doc2.md"]
+
+    archive = tmp_path / "tender.zip"
+    with zipfile.ZipFile(archive, "w") as z:
+        for path in collect_files(folder):
+            z.write(path, f"specs/{path.name}")
+    extracted = collect_files(archive, tmp_path / "extracted")
+    assert [p.name for p in extracted] == ["doc0.md", "doc1.md", "doc2.md"]
+
+def test_parse_in_pool_yields_every_file(tmp_path):
+    paths = collect_files(_write_docs(tmp_path, 5))
+
+    async def run():
+        return [(path, parsed) async for path, parsed in parse_in_pool(paths, max_pending=2)]
+
+    results = asyncio.run(run())
+    assert sorted(p.name for p, _ in results) == [p.name for p in paths]
+    assert all(parsed["metadata"]["filename"] == path.name for path, parsed in results)
+
+def test_parse_pool_is_reused_across_calls(tmp_path):
+    paths = collect_files(_write_docs(tmp_path, 2))
+
+    async def run():
+        async for _ in parse_in_pool(paths[:1], max_pending=1):
+            pass
+        first = parser_module.parse_pool()
+        async for _ in parse_in_pool(paths[1:], max_pending=1):
+            pass
+        return first, parser_module.parse_pool()
+
+    try:
+        first, second = asyncio.run(run())
+        assert first is second
+    finally:
+        parser_module.shutdown_parse_pool()
+    assert parser_module._pool is None
+
+def _parse_or_crash(file_path):
+    if "doc0" in file_path:
+        import os
+        os._exit(1)
+    return parse_file(file_path)
+
+def test_crashed_worker_is_reported_per_file(tmp_path, monkeypatch):
+    paths = collect_files(_write_docs(tmp_path, 4))
+    monkeypatch.setattr(parser_module, "parse_file", _parse_or_crash)
+
+    async def run():
+        return {path.name: parsed async for path, parsed in parse_in_pool(paths, max_pending=4)}
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        parser_module.shutdown_parse_pool()
+    # Every file comes back; the crash (and whatever it took down) is a per-file error
+    assert sorted(results) == [p.name for p in paths]
+    assert "error" in results["doc0.md"]["metadata"]
+
+def test_stale_broken_pool_leaves_the_fresh_pool_running():
+    try:
+        stale = parser_module.parse_pool()
+        parser_module._pool = None
+        fresh = parser_module.parse_pool()
+        parser_module._discard_pool(stale)
+        assert parser_module._pool is fresh
+    finally:
+        parser_module.shutdown_parse_pool()
@@ -0,0 +1,43 @@
+import asyncio
+from uuid import uuid4
+from src.retrieval import cache as cache_module
+from src.retrieval.cache import QueryCache, TenderVersion, TenderVersions, query_key
+
+def test_query_key_normalizes_and_tracks_version():
+    tender = TenderVersion(uuid4(), 3)
+    assert query_key(tender, "What is the  Retention?", "vector") == query_key(tender, "what is the retention", "VECTOR")
+    assert query_key(tender, "retention", "VECTOR") != query_key(TenderVersion(tender.id, 4), "retention", "VECTOR")
+    assert query_key(tender, "retention", "VECTOR") != query_key(tender, "retention", "BM25")
+
+def test_query_cache_evicts_lru_and_expired(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = QueryCache(max_entries=2, ttl=10)
+    tender = uuid4()
+    cache.put((tender, "a"), 1)
+    cache.put((tender, "b"), 2)
+    assert cache.get((tender, "a")) == 1
+    cache.put((tender, "c"), 3)
+    # "b" was least recently used
+    assert cache.get((tender, "b")) is None
+    now[0] = 11
+    assert cache.get((tender, "a")) is None
+    assert len(cache) == 1
+    assert cache.stats.hits == 1 and cache.stats.misses == 2
+
+def test_bump_invalidates_tender_entries(monkeypatch):
+    tender, other = uuid4(), uuid4()
+    versions = TenderVersions(ttl=60)
+
+    async def load(tender_id):
+        return TenderVersion(tender, 1)
+
+    monkeypatch.setattr(versions, "_load", load)
+    assert asyncio.run(versions.get("Bid A")) == TenderVersion(tender, 1)
+
+    cache_module.answer_cache.put((tender, 1, "q", "VECTOR"), "answer")
+    cache_module.answer_cache.put((other, 1, "q", "VECTOR"), "other")
+    versions.bump(tender)
+    assert cache_module.answer_cache.get((tender, 1, "q", "VECTOR")) is None
+    assert cache_module.answer_cache.get((other, 1, "q", "VECTOR")) == "other"
+    assert "Bid A" not in versions._entries
@@ -0,0 +1,201 @@
+import asyncio
+import mmap
+import pytest
+from src.ingestion.stages import StageStats, PipelineStats, DONE, drain_batch, close_queue
+import src.ingestion.pipeline as pipeline_module
+from uuid import UUID
+from src.db.graph_writer import GraphWriter
+from src.ingestion.pipeline import IngestionPipeline
+from src.retrieval.keyword_index import KeywordIndexRegistry
+
+def test_drain_batch_stops_at_limit_and_done():
+    async def run():
+        queue = asyncio.Queue()
+        for i in range(1, 5):
+            queue.put_nowait(i)
+        first_batch = drain_batch(queue, 0, 3)
+        queue.put_nowait(DONE)
+        second_batch = drain_batch(queue, await queue.get(), 10)
+        return first_batch, second_batch
+
+    (batch, done), (rest, rest_done) = asyncio.run(run())
+    assert batch == [0, 1, 2] and not done
+    assert rest == [3, 4] and rest_done
+
+def test_stage_stats_records_depth_and_items():
+    stats = StageStats("embed", workers=2)
+    for depth in (0, 4, 2):
+        stats.record_depth(depth)
+    with stats.timed(items=3):
+        pass
+    assert stats.items == 3
+    assert stats.max_queue_depth == 4
+    assert stats.mean_queue_depth == pytest.approx(2.0)
+    assert set(stats.as_dict()) >= {"items_per_sec", "utilization", "max_queue_depth"}
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+class FakeSession:
+    def __init__(self):
+        self.rows = {"clause": [], "chunk": []}
+        self.committed = False
+
+    def add(self, obj):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def execute(self, stmt, rows=None):
+        if rows is None and "content" in getattr(stmt, "selected_columns", {}).keys():
+            # Keyword index seed: (id, document id, number, content) of every clause
+            return FakeResult([
+                (r["id"], r["document_id"], r["clause_number"], r["content"])
+                for r in self.rows["clause"]
+            ])
+        if rows is None:
+            # Reference lookup: (id, number, references, document_id) of written clauses
+            return FakeResult([
+                (r["id"], r["clause_number"], r["metadata_"].get("references"), r["document_id"])
+                for r in self.rows["clause"]
+            ])
+        self.rows[stmt.table.name].extend(rows)
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+def test_pipeline_streams_all_chunks_through_stages(monkeypatch):
+    session = FakeSession()
+    graph_nodes = []
+
+    async def fake_get_session():
+        yield session
+
+    async def fake_get_embeddings(texts, **kwargs):
+        await asyncio.sleep(0)
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(pipeline_module, "get_session", fake_get_session)
+    monkeypatch.setattr(pipeline_module, "get_embeddings", fake_get_embeddings)
+    class RecordingGraphWriter(GraphWriter):
+        def __init__(self, batch_size):
+            super().__init__(batch_size, available=True)
+
+        async def _run(self, query, **params):
+            graph_nodes.extend(UUID(row["id"]) for row in params["rows"])
+            self.stats.batches += 1
+
+    monkeypatch.setattr(pipeline_module, "GraphWriter", RecordingGraphWriter)
+
+    pipeline = IngestionPipeline(
+        embed_batch_size=3, embed_workers=2, write_batch_size=4, queue_size=2, graph_batch_size=8,
+        tender_vector_index=False, keyword_index=False, local_vector_index=False
+    )
+    content = "\n\n".join(f"Paragraph number {i} of the tender." for i in range(20))
+    parsed = {"content": content, "metadata": {"filename": "spec.md"}}
+    stats = asyncio.run(pipeline.ingest_parsed(parsed, pipeline_module.uuid4()))
+
+    assert session.committed
+    assert len(session.rows["clause"]) == len(session.rows["chunk"]) == 20
+    assert sorted(graph_nodes) == sorted(r["id"] for r in session.rows["clause"])
+    # Bounded queues never hold more than queue_size items
+    assert all(s.max_queue_depth <= 2 for s in stats.stages.values())
+    assert stats.stages["embed"].items == 20
+    assert stats.write.clauses == 20
+    # 20 nodes in UNWIND batches of at most 8
+    assert stats.graph.batches == 3
+
+def test_pipeline_updates_keyword_index_after_commit(monkeypatch, tmp_path):
+    session = FakeSession()
+
+    async def fake_get_session():
+        yield session
+
+    async def fake_get_embeddings(texts, **kwargs):
+        return [[1.0] for _ in texts]
+
+    # Ingested before the keyword index existed, from an upload with the same filename
+    old_document = pipeline_module.uuid4()
+    session.rows["clause"].append({
+        "id": pipeline_module.uuid4(), "clause_number": "9",
+        "content": "Insurance is carried by the contractor.", "metadata_": {}, "document_id": old_document
+    })
+    registry = KeywordIndexRegistry(root=str(tmp_path))
+    monkeypatch.setattr(pipeline_module, "get_session", fake_get_session)
+    monkeypatch.setattr(pipeline_module, "get_embeddings", fake_get_embeddings)
+    monkeypatch.setattr(pipeline_module, "keyword_indexes", registry)
+    monkeypatch.setattr(pipeline_module, "GraphWriter", lambda batch_size: GraphWriter(batch_size, available=False))
+
+    pipeline = IngestionPipeline(tender_vector_index=False, keyword_index=True, local_vector_index=False)
+    tender_id = pipeline_module.uuid4()
+    parsed = {"content": "Retention is five percent.\n\nPayment is monthly.", "metadata": {"filename": "spec.md"}}
+    asyncio.run(pipeline.ingest_parsed(parsed, tender_id))
+
+    assert session.committed
+    assert registry.path_for(tender_id).exists()
+    index = registry.get(tender_id)
+    assert len(index) == 3
+    new_document = session.rows["clause"][-1]["document_id"]
+    assert index.document(index.search("retention")[0][0])["document_key"] == str(new_document)
+    assert index.document(index.search("insurance")[0][0])["document_key"] == str(old_document)
+
+def test_pipeline_reraises_stage_errors(monkeypatch):
+    session = FakeSession()
+
+    async def fake_get_session():
+        yield session
+
+    async def failing_embeddings(texts, **kwargs):
+        raise RuntimeError("embedding API down")
+
+    monkeypatch.setattr(pipeline_module, "get_session", fake_get_session)
+    monkeypatch.setattr(pipeline_module, "get_embeddings", failing_embeddings)
+
+    pipeline = IngestionPipeline(tender_vector_index=False, keyword_index=False, local_vector_index=False)
+    parsed = {"content": "First clause text.\n\nSecond clause text.", "metadata": {"filename": "spec.md"}}
+    with pytest.raises(RuntimeError, match="embedding API down"):
+        asyncio.run(pipeline.ingest_parsed(parsed, pipeline_module.uuid4()))
+    assert not session.committed
+
+def test_ingest_folder_streams_files_and_reports_failures(monkeypatch, tmp_path):
+    for i in range(3):
+        (tmp_path / f"doc{i}.md").write_text(f"Clause {i} of the specification.")
+    ingested = []
+
+    async def fake_ingest_parsed(self, parsed, tender_id, stats=None):
+        if parsed["metadata"]["filename"] == "doc1.md":
+            raise RuntimeError("bad document")
+        ingested.append(parsed["metadata"]["filename"])
+        return PipelineStats()
+
+    monkeypatch.setattr(IngestionPipeline, "ingest_parsed", fake_ingest_parsed)
+    pipeline = IngestionPipeline(tender_vector_index=False, keyword_index=False, local_vector_index=False)
+    report = asyncio.run(pipeline.ingest_folder(tmp_path, pipeline_module.uuid4(), max_pending=2))
+
+    assert sorted(report.ingested) == sorted(ingested) == ["doc0.md", "doc2.md"]
+    assert report.failed == {"doc1.md": "bad document"}
+
+def test_text_files_are_ingested_through_a_memory_map(monkeypatch, tmp_path):
+    (tmp_path / "spec.md").write_text("Clause 1 of the specification.")
+    received = []
+
+    async def fake_ingest_parsed(self, parsed, tender_id, stats=None):
+        received.append((type(parsed["content"]), bytes(parsed["content"][:6])))
+        return PipelineStats()
+
+    monkeypatch.setattr(IngestionPipeline, "ingest_parsed", fake_ingest_parsed)
+    pipeline = IngestionPipeline(tender_vector_index=False, keyword_index=False, local_vector_index=False)
+    asyncio.run(pipeline.ingest_file(tmp_path / "spec.md", pipeline_module.uuid4()))
+    asyncio.run(pipeline.ingest_folder(tmp_path, pipeline_module.uuid4()))
+    assert received == [(mmap.mmap, b"Clause")] * 2
@@ -0,0 +1,31 @@
+import asyncio
+import hashlib
+import io
+from fastapi import UploadFile
+from src.ingestion.storage import safe_filename, store_upload
+
+def _store(tmp_path, data, filename):
+    upload = UploadFile(io.BytesIO(data), filename=filename)
+    return asyncio.run(store_upload(upload, upload_dir=tmp_path, chunk_bytes=7))
+
+def test_store_upload_is_content_addressed(tmp_path):
+    data = b"Clause 5.1 Payment\n" * 20
+    stored = _store(tmp_path, data, "spec.md")
+    digest = hashlib.sha256(data).hexdigest()
+    assert stored.sha256 == digest and stored.size == len(data)
+    assert stored.path == tmp_path / digest[:2] / digest / "spec.md"
+    assert stored.path.read_bytes() == data
+    # No temp files left behind
+    assert list((tmp_path / "partial").iterdir()) == []
+
+def test_same_name_different_content_never_collides(tmp_path):
+    first = _store(tmp_path, b"revision A", "spec.md")
+    second = _store(tmp_path, b"revision B", "spec.md")
+    again = _store(tmp_path, b"revision A", "spec.md")
+    assert first.path != second.path
+    assert again.path == first.path and first.path.read_bytes() == b"revision A"
+
+def test_safe_filename_strips_directories():
+    assert safe_filename("../../etc/passwd") == "passwd"
+    assert safe_filename("C:\\plans\\drawings.zip") == "drawings.zip"
+    assert safe_filename("..") == "upload"
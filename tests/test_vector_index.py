@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from uuid import uuid4
+from src.retrieval.vector_index import MemmapVectorIndex, VectorIndexRegistry
+
+def _vectors():
+    return [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.7, 0.7, 0.0], [0.0, 0.0, 1.0]]
+
+def test_batched_search_returns_exact_top_k():
+    ids = [uuid4() for _ in range(4)]
+    index = MemmapVectorIndex.empty().replace_document("spec.md", ids, _vectors())
+
+    results = index.search(np.array([[1.0, 0.1, 0.0], [0.0, 0.0, 2.0]]), limit=2)
+
+    assert [chunk_id for chunk_id, _ in results[0]] == [ids[0], ids[2]]
+    assert results[1][0][0] == ids[3]
+    assert results[1][0][1] == pytest.approx(1.0)
+
+def test_search_across_blocks(monkeypatch):
+    monkeypatch.setattr("src.retrieval.vector_index.BLOCK_ROWS", 2)
+    ids = [uuid4() for _ in range(4)]
+    index = MemmapVectorIndex.empty().replace_document("spec.md", ids, _vectors())
+    results = index.search(np.array([0.6, 0.8, 0.0]), limit=3)
+    assert [chunk_id for chunk_id, _ in results[0]] == [ids[2], ids[1], ids[0]]
+
+def test_registry_replaces_document_and_memory_maps(tmp_path):
+    registry = VectorIndexRegistry(root=str(tmp_path), dtype="float16")
+    tender = uuid4()
+    spec_ids = [uuid4(), uuid4()]
+    registry.replace_document(tender, "spec.md", spec_ids, _vectors()[:2])
+    registry.replace_document(tender, "gcc.md", [uuid4()], _vectors()[3:])
+
+    new_ids = [uuid4()]
+    registry.replace_document(tender, "spec.md", new_ids, [[1.0, 0.0, 0.0]])
+
+    index = VectorIndexRegistry(root=str(tmp_path)).get(tender)
+    assert isinstance(index.vectors, np.memmap)
+    assert index.vectors.dtype == np.float16
+    assert len(index) == 2
+    assert index.search(np.array([1.0, 0.0, 0.0]), limit=1)[0][0][0] == new_ids[0]
+
+def test_first_write_seeds_the_index_with_stored_chunks(tmp_path):
+    registry = VectorIndexRegistry(root=str(tmp_path))
+    tender = uuid4()
+    older = [("old.md", uuid4(), vector) for vector in _vectors()[:2]]
+    new_id = uuid4()
+    registry.replace_document(tender, "new.md", [new_id], _vectors()[3:], rows=older)
+
+    index = VectorIndexRegistry(root=str(tmp_path)).get(tender)
+    assert len(index) == 3
+    assert index.group_keys == ["old.md", "new.md"]
+    assert index.search(np.array([1.0, 0.0, 0.0]), limit=1)[0][0][0] == older[0][1]
+
+def test_memmap_search_bootstraps_tender_without_matrix(tmp_path, monkeypatch):
+    from src.retrieval import search as search_module
+
+    chunk_ids = [uuid4() for _ in range(4)]
+    document_id = uuid4()
+
+    class Result:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def all(self):
+            return self.rows
+
+        def scalars(self):
+            return self
+
+    class FakeSession:
+        async def execute(self, stmt):
+            if "document_id" in stmt.selected_columns.keys():
+                return Result([(document_id, i, v) for i, v in zip(chunk_ids, _vectors())])
+            return Result([SimpleNamespace(id=i) for i in chunk_ids])
+
+    registry = VectorIndexRegistry(root=str(tmp_path))
+    monkeypatch.setattr(search_module, "vector_indexes", registry)
+    tender = uuid4()
+    results = asyncio.run(search_module.SearchEngine()._search_memmap(FakeSession(), [[0.0, 0.0, 1.0]], 1, tender))
+    assert [chunk.id for chunk in results[0]] == [chunk_ids[3]]
+    assert registry.get(tender).group_keys == [str(document_id)]
+
+def test_same_named_documents_keep_their_own_vectors(tmp_path):
+    # Documents are keyed by id: an addendum named like the original doesn't replace it
+    registry = VectorIndexRegistry(root=str(tmp_path))
+    tender = uuid4()
+    original, addendum = str(uuid4()), str(uuid4())
+    original_ids = [uuid4(), uuid4()]
+    registry.replace_document(tender, original, original_ids, _vectors()[:2])
+    registry.replace_document(tender, addendum, [uuid4()], _vectors()[3:])
+
+    index = VectorIndexRegistry(root=str(tmp_path)).get(tender)
+    assert len(index) == 3
+    assert index.group_keys == [original, addendum]
@@ -0,0 +1,72 @@
+import asyncio
+from uuid import uuid4
+import pytest
+from src.db.models import Clause, Chunk
+from src.ingestion.writer import BulkWriter
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, stmt, rows=None):
+        self.calls.append((stmt.table.name, list(rows)))
+
+def test_bulk_writer_batches_and_orders_rows():
+    async def run():
+        session = FakeSession()
+        writer = BulkWriter(session, batch_size=2)
+        doc_id = uuid4()
+        for i in range(3):
+            clause = Clause(document_id=doc_id, clause_number=str(i), content=f"clause {i}")
+            await writer.add_clause(clause)
+            await writer.add_chunk(Chunk(
+                clause_id=clause.id, content=f"clause {i}", chunk_index=i, embedding=[0.0] * 3
+            ))
+        await writer.flush()
+        return session, writer
+
+    session, writer = asyncio.run(run())
+
+    assert writer.stats.clauses == 3
+    assert writer.stats.chunks == 3
+    # Every chunk batch must come after the clause rows it references
+    seen_clauses = set()
+    for table, rows in session.calls:
+        if table == "clause":
+            seen_clauses.update(r["id"] for r in rows)
+        else:
+            assert all(r["clause_id"] in seen_clauses for r in rows)
+    assert max(len(rows) for _, rows in session.calls) <= 2
+
+def test_bulk_writer_updates_existing_clauses_by_id():
+    async def run():
+        session = FakeSession()
+        writer = BulkWriter(session, batch_size=10)
+        clause = Clause(document_id=uuid4(), clause_number="1", content="revised", content_hash="abc")
+        await writer.update_clause(clause)
+        assert writer.pending_clauses == 1
+        await writer.flush()
+        return session, clause
+
+    session, clause = asyncio.run(run())
+    (table, rows), = session.calls
+    assert table == "clause"
+    assert rows[0]["id"] == clause.id and rows[0]["content"] == "revised"
+    assert "document_id" not in rows[0]
+
+def test_bulk_writer_moves_clauses_in_one_round_trip():
+    async def run():
+        session = FakeSession()
+        writer = BulkWriter(session, batch_size=10)
+        moved, renumbered = uuid4(), uuid4()
+        await writer.move_clause(moved, "3.1", "00003.00001", chunk_offset=2)
+        await writer.move_clause(renumbered, "4", "00004", chunk_offset=0)
+        await writer.flush()
+        return session, moved, renumbered
+
+    session, moved, renumbered = asyncio.run(run())
+    # One executemany for the clause rows and one for the chunk shifts
+    (clause_table, clause_rows), (chunk_table, shifts) = session.calls
+    assert clause_table == "clause" and [r["id"] for r in clause_rows] == [moved, renumbered]
+    assert clause_rows[0]["title"] == "Clause 3.1"
+    assert chunk_table == "chunk" and shifts == [{"target_clause_id": moved, "offset": 2}]